@@ -16,6 +16,7 @@ __version__ = "0.1.0"
 
 from .llm_client import (
     llm_query,
+    llm_query_timed,
     validate_configuration,
     get_client,
     ConfigurationError,
@@ -24,6 +25,7 @@ from .llm_client import (
 __all__ = [
     "__version__",
     "llm_query",
+    "llm_query_timed",
     "validate_configuration",
     "get_client",
     "ConfigurationError",
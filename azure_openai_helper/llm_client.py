@@ -7,10 +7,12 @@ Supports multiple model deployments for comparative experiments.
 """
 
 import os
-from typing import Optional, Dict
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 from openai import AzureOpenAI
-from openai import OpenAIError, APIError, APIConnectionError, RateLimitError
+from openai import OpenAIError, APIError, APIConnectionError, BadRequestError, RateLimitError
 
 
 class ConfigurationError(Exception):
@@ -18,6 +20,10 @@ class ConfigurationError(Exception):
     pass
 
 
+# Deployments whose API version rejected stream_options; llm_query_timed stops sending it
+_STREAM_OPTIONS_UNSUPPORTED = set()
+
+
 def _load_configuration() -> dict:
     """
     Load and validate Azure OpenAI configuration from environment variables.
@@ -142,40 +148,25 @@ def get_client(model: Optional[str] = None) -> AzureOpenAI:
     )
 
 
-def llm_query(
+def _prepare_request(
     prompt: str,
-    temperature: Optional[float] = None,
-    max_tokens: Optional[int] = None,
-    system_message: Optional[str] = None,
-    model: Optional[str] = None
-) -> str:
+    temperature: Optional[float],
+    max_tokens: Optional[int],
+    system_message: Optional[str],
+    model: Optional[str]
+) -> Tuple[AzureOpenAI, Dict[str, Any]]:
     """
-    Query Azure OpenAI's ChatCompletion API with a user prompt.
+    Validate query arguments and build the client and ChatCompletion parameters.
     
-    Args:
-        prompt: The user's input prompt to send to the LLM
-        temperature: Controls randomness (0.0-2.0). Lower is more deterministic.
-                    If None, uses the model's default.
-        max_tokens: Maximum number of tokens in the response.
-                   If None, uses the model's default.
-        system_message: Optional system message to set context/behavior.
-                       If None, no system message is included.
-        model: Which model to use. Can be:
-               - None (default): Uses primary model
-               - "primary": Uses primary model (GPT-4o)
-               - "secondary": Uses secondary model (Phi-4-mini-instruct)
-               - Deployment name string: Uses that specific deployment
+    Shared by llm_query and llm_query_timed; the arguments are documented there.
     
     Returns:
-        str: The model's text response
+        Tuple of (AzureOpenAI client, API parameters for chat.completions.create)
         
     Raises:
-        ConfigurationError: If required environment variables are missing
+        ConfigurationError: If required environment variables are missing, the requested
+                            model is not configured, or the client fails to initialize
         ValueError: If prompt is empty or parameters are invalid
-        APIError: If the Azure OpenAI API returns an error
-        APIConnectionError: If there's a connection issue
-        RateLimitError: If rate limits are exceeded
-        OpenAIError: For other API-related errors
     """
     # Validate input
     if not prompt or not prompt.strip():
@@ -255,16 +246,14 @@ def llm_query(
     if max_tokens is not None:
         api_params["max_tokens"] = max_tokens
     
-    # Make API call with error handling
+    return client, api_params
+
+
+@contextmanager
+def _api_errors():
+    """Re-raise errors from an API call with a message naming the failure type."""
     try:
-        response = client.chat.completions.create(**api_params)
-        
-        # Extract and return the response text
-        if response.choices and len(response.choices) > 0:
-            return response.choices[0].message.content
-        else:
-            raise APIError("No response choices returned from the API")
-            
+        yield
     except RateLimitError as e:
         raise RateLimitError(f"Rate limit exceeded: {e}")
     except APIConnectionError as e:
@@ -275,3 +264,132 @@ def llm_query(
         raise OpenAIError(f"OpenAI error: {e}")
     except Exception as e:
         raise Exception(f"Unexpected error during API call: {e}")
+
+
+def llm_query(
+    prompt: str,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    system_message: Optional[str] = None,
+    model: Optional[str] = None
+) -> str:
+    """
+    Query Azure OpenAI's ChatCompletion API with a user prompt.
+    
+    Args:
+        prompt: The user's input prompt to send to the LLM
+        temperature: Controls randomness (0.0-2.0). Lower is more deterministic.
+                    If None, uses the model's default.
+        max_tokens: Maximum number of tokens in the response.
+                   If None, uses the model's default.
+        system_message: Optional system message to set context/behavior.
+                       If None, no system message is included.
+        model: Which model to use. Can be:
+               - None (default): Uses primary model
+               - "primary": Uses primary model (GPT-4o)
+               - "secondary": Uses secondary model (Phi-4-mini-instruct)
+               - Deployment name string: Uses that specific deployment
+    
+    Returns:
+        str: The model's text response
+        
+    Raises:
+        ConfigurationError: If required environment variables are missing
+        ValueError: If prompt is empty or parameters are invalid
+        APIError: If the Azure OpenAI API returns an error
+        APIConnectionError: If there's a connection issue
+        RateLimitError: If rate limits are exceeded
+        OpenAIError: For other API-related errors
+    """
+    client, api_params = _prepare_request(prompt, temperature, max_tokens, system_message, model)
+    
+    # Make API call with error handling
+    with _api_errors():
+        response = client.chat.completions.create(**api_params)
+        
+        # Extract and return the response text
+        if response.choices and len(response.choices) > 0:
+            return response.choices[0].message.content
+        else:
+            raise APIError("No response choices returned from the API")
+
+
+def llm_query_timed(
+    prompt: str,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    system_message: Optional[str] = None,
+    model: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Query the ChatCompletion API with streaming and report timing and usage.
+    
+    Takes the same arguments as llm_query. The response is streamed so the time
+    to the first content token (roughly the prefill cost) can be separated from
+    the time spent generating the rest of the answer.
+    
+    Usage is requested with stream_options, which needs AZURE_OPENAI_API_VERSION
+    2024-09-01-preview or later. If the API version rejects stream_options, the
+    request is retried without it and usage is None; later calls to the same
+    deployment skip stream_options instead of being rejected again.
+    
+    Returns:
+        dict with:
+        - text: The model's text response
+        - first_token_seconds: Time from request to first content token
+        - total_seconds: Time from request to end of stream
+        - usage: dict with prompt_tokens, completion_tokens and cached_tokens
+                 (prompt tokens served from the server-side prompt cache),
+                 or None if the deployment does not report usage for streams
+    
+    Raises:
+        Same exceptions as llm_query
+    """
+    client, api_params = _prepare_request(prompt, temperature, max_tokens, system_message, model)
+    api_params["stream"] = True
+    if api_params["model"] not in _STREAM_OPTIONS_UNSUPPORTED:
+        api_params["stream_options"] = {"include_usage": True}
+    
+    # Make API call with error handling
+    with _api_errors():
+        start_time = time.time()
+        try:
+            stream = client.chat.completions.create(**api_params)
+        except BadRequestError as e:
+            if "stream_options" not in api_params or "stream_options" not in str(e):
+                raise
+            # Older API versions reject stream_options; stream without usage from now on
+            _STREAM_OPTIONS_UNSUPPORTED.add(api_params["model"])
+            del api_params["stream_options"]
+            start_time = time.time()
+            stream = client.chat.completions.create(**api_params)
+        
+        first_token_time = None
+        parts: List[str] = []
+        usage = None
+        
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                if first_token_time is None:
+                    first_token_time = time.time()
+                parts.append(chunk.choices[0].delta.content)
+            
+            if getattr(chunk, "usage", None):
+                details = getattr(chunk.usage, "prompt_tokens_details", None)
+                usage = {
+                    "prompt_tokens": chunk.usage.prompt_tokens,
+                    "completion_tokens": chunk.usage.completion_tokens,
+                    "cached_tokens": getattr(details, "cached_tokens", 0) or 0
+                }
+        
+        end_time = time.time()
+    
+    if first_token_time is None:
+        first_token_time = end_time
+    
+    return {
+        "text": "".join(parts),
+        "first_token_seconds": first_token_time - start_time,
+        "total_seconds": end_time - start_time,
+        "usage": usage
+    }
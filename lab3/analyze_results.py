@@ -44,6 +44,111 @@ def create_comparison_dataframe(results: Dict) -> pd.DataFrame:
     return pd.DataFrame(records)
 
 
+def create_stage_dataframe(results: Dict) -> pd.DataFrame:
+    """
+    Create a long-format DataFrame of per-stage timings.
+    
+    Returns an empty DataFrame for results recorded before stage timers existed.
+    """
+    records = []
+    
+    for result in results["results"]:
+        for mode, key in (("RAG", "rag_timings"), ("Full Context", "full_timings")):
+            for stage, seconds in (result.get(key) or {}).items():
+                records.append({
+                    "question_id": result["question_id"],
+                    "mode": mode,
+                    "stage": stage,
+                    "seconds": seconds
+                })
+    
+    return pd.DataFrame(records, columns=["question_id", "mode", "stage", "seconds"])
+
+
+def generate_stage_table(stage_df: pd.DataFrame) -> str:
+    """Generate a table of average time spent in each stage per mode."""
+    table = []
+    table.append("\n" + "=" * 80)
+    table.append("LATENCY BREAKDOWN BY STAGE")
+    table.append("=" * 80 + "\n")
+    
+    means = stage_df.groupby(["stage", "mode"], sort=False)["seconds"].mean().unstack("mode")
+    totals = means.sum()
+    
+    table.append(f"{'Stage':<30} {'RAG':<20} {'Full Context':<20}")
+    table.append("-" * 80)
+    for stage, row in means.iterrows():
+        cells = []
+        for mode in ("RAG", "Full Context"):
+            value = row.get(mode)
+            if pd.isna(value):
+                cells.append(f"{'-':>8}{'':<12}")
+            else:
+                cells.append(f"{value:>7.3f}s ({value / totals[mode] * 100:>4.1f}%) ")
+        table.append(f"{stage:<30} {cells[0]:<20} {cells[1]:<20}")
+    table.append("-" * 80)
+    table.append(f"{'Total':<30} {totals.get('RAG', 0):>7.3f}s{'':<12} {totals.get('Full Context', 0):>7.3f}s")
+    
+    if "RAG" in means.columns:
+        retrieval = means["RAG"].reindex(["embed_query", "index_search"]).fillna(0).sum()
+        table.append(f"\nRAG time spent in retrieval (embed + search): {retrieval / totals['RAG'] * 100:.1f}%")
+    
+    return "\n".join(table)
+
+
+def generate_cache_summary(results: Dict) -> str:
+    """
+    Summarize server-side prompt cache hits per mode.
+    
+    Returns an empty string when no usage was recorded.
+    """
+    lines = []
+    
+    for mode, key in (("RAG", "rag_usage"), ("Full Context", "full_usage")):
+        usages = [result[key] for result in results["results"] if result.get(key)]
+        if not usages:
+            continue
+        prompt_tokens = sum(usage["prompt_tokens"] for usage in usages)
+        cached_tokens = sum(usage.get("cached_tokens", 0) for usage in usages)
+        lines.append(
+            f"{mode:<15} {prompt_tokens:>14,} {cached_tokens:>12,} "
+            f"{cached_tokens / max(prompt_tokens, 1) * 100:>9.1f}%"
+        )
+    
+    if not lines:
+        return ""
+    
+    layout = results.get("metadata", {}).get("prompt_layout", "inline")
+    header = [
+        "\n" + "=" * 80,
+        f"PROMPT CACHE (full-context layout: {layout})",
+        "=" * 80 + "\n",
+        f"{'Mode':<15} {'Prompt Tokens':>14} {'Cached':>12} {'Hit Rate':>10}",
+        "-" * 80
+    ]
+    return "\n".join(header + lines)
+
+
+def create_stage_visualization(stage_df: pd.DataFrame, output_dir: str):
+    """Plot a stacked bar chart of average per-stage latency for each mode."""
+    means = stage_df.groupby(["mode", "stage"], sort=False)["seconds"].mean().unstack("stage").fillna(0)
+    
+    fig, ax = plt.subplots(figsize=(10, 6))
+    means.plot(kind="bar", stacked=True, ax=ax, colormap="viridis", alpha=0.85)
+    ax.set_ylabel('Average Latency (seconds)', fontsize=12)
+    ax.set_xlabel('')
+    ax.set_title('Where the Time Goes: Latency by Stage', fontsize=14, fontweight='bold')
+    ax.tick_params(axis='x', rotation=0)
+    ax.legend(title='Stage')
+    ax.grid(axis='y', alpha=0.3)
+    
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'latency_breakdown.png'), dpi=300)
+    plt.close()
+    
+    print(f"✓ Saved stage breakdown plot to {output_dir}")
+
+
 def generate_summary_table(df: pd.DataFrame) -> str:
     """Generate summary comparison table."""
     summary = []
@@ -335,7 +440,14 @@ def analyze_results():
     report_parts.append(f"  Retrieval k: {results['metadata']['retrieval_k']}")
     report_parts.append(f"  Total Questions: {results['metadata']['total_questions']}")
     
+    stage_df = create_stage_dataframe(results)
+    
     report_parts.append(generate_summary_table(df))
+    if not stage_df.empty:
+        report_parts.append(generate_stage_table(stage_df))
+    cache_summary = generate_cache_summary(results)
+    if cache_summary:
+        report_parts.append(cache_summary)
     report_parts.append(generate_detailed_table(df))
     report_parts.append(generate_insights(df, results))
     
@@ -350,9 +462,13 @@ def analyze_results():
     print("\n" + "-" * 80)
     print("Generating visualizations...")
     create_visualizations(df, results_dir)
+    if not stage_df.empty:
+        create_stage_visualization(stage_df, results_dir)
     
     # Print summary to console
     print("\n" + generate_summary_table(df))
+    if not stage_df.empty:
+        print("\n" + generate_stage_table(stage_df))
     print("\n" + generate_insights(df, results))
     
     print("\n" + "=" * 80)
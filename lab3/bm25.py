@@ -0,0 +1,190 @@
+"""
+BM25 lexical retrieval and rank fusion for Lab 3.
+
+Lab 3 questions are fact lookups (dosages, legal elements, version numbers)
+where exact term matches are cheap and often more precise than dense
+similarity. BM25Index is an inverted index whose per-posting BM25 weights are
+precomputed at build time, so a query only touches the postings of its own
+terms.
+"""
+
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Keeps numbers and versions such as "7.25", "1nf", "tls" and "covid-19" as single terms
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how in is it its of on or that the "
+    "this to was what when where which who why with".split()
+)
+
+SearchResults = List[List[Tuple[str, float]]]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into index terms, dropping stopwords."""
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 inverted index over a fixed set of texts."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize BM25 index.
+
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization strength
+        """
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def build(self, ids: Sequence[str], texts: Sequence[str]) -> None:
+        """
+        Index texts, replacing any previous contents.
+
+        Args:
+            ids: Identifier per text
+            texts: Texts to index
+        """
+        self.ids = list(ids)
+        term_docs: Dict[str, List[int]] = {}
+        term_freqs: Dict[str, List[int]] = {}
+        doc_lengths = np.zeros(len(texts), dtype=np.float32)
+
+        for doc_idx, text in enumerate(texts):
+            terms = tokenize(text)
+            doc_lengths[doc_idx] = len(terms)
+
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                term_docs.setdefault(term, []).append(doc_idx)
+                term_freqs.setdefault(term, []).append(count)
+
+        num_docs = len(texts)
+        avg_length = float(doc_lengths.mean()) if num_docs else 0.0
+        length_norm = self.k1 * (1 - self.b + self.b * doc_lengths / max(avg_length, 1e-9))
+
+        self.postings = {}
+        for term, docs in term_docs.items():
+            docs = np.asarray(docs, dtype=np.int32)
+            tf = np.asarray(term_freqs[term], dtype=np.float32)
+            idf = math.log(1 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            weights = idf * tf * (self.k1 + 1) / (tf + length_norm[docs])
+            self.postings[term] = (docs, weights.astype(np.float32))
+
+    def search_batch(self, queries: Sequence[str], k: int) -> SearchResults:
+        """
+        Score queries against the index.
+
+        Args:
+            queries: Query strings
+            k: Number of results per query
+
+        Returns:
+            One list of (id, score) pairs per query, best first. Texts that share
+            no terms with the query are not returned.
+        """
+        results = []
+        # One score buffer for the whole batch; after each query only the rows
+        # its postings touched are reset, so a query costs O(postings hit)
+        # rather than O(corpus)
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+
+        for query in queries:
+            touched = []
+            for term in set(tokenize(query)):
+                if term in self.postings:
+                    docs, weights = self.postings[term]
+                    scores[docs] += weights
+                    touched.append(docs)
+
+            if not touched:
+                results.append([])
+                continue
+
+            matched = np.unique(np.concatenate(touched))
+            matched = matched[scores[matched] != 0]
+            if len(matched) > k:
+                matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+            matched = matched[np.argsort(-scores[matched])]
+
+            results.append([(self.ids[idx], float(scores[idx])) for idx in matched])
+            for docs in touched:
+                scores[docs] = 0.0
+
+        return results
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Score a single query (see search_batch)."""
+        return self.search_batch([query], k)[0]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[List[Tuple[str, float]]], k: int,
+                           rrf_k: int = 60, weights: Optional[Sequence[float]] = None
+                           ) -> List[Tuple[str, float]]:
+    """
+    Fuse several rankings with reciprocal rank fusion.
+
+    Each item scores sum(weight / (rrf_k + rank)) over the rankings it appears in.
+
+    Args:
+        rankings: Ranked (id, score) lists, best first
+        k: Number of fused results to return
+        rrf_k: RRF smoothing constant (60 in the original paper)
+        weights: Optional weight per ranking
+
+    Returns:
+        Fused (id, score) list, best first
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[str, float] = {}
+
+    for ranking, weight in zip(rankings, weights):
+        for rank, (item_id, _) in enumerate(ranking, 1):
+            fused[item_id] = fused.get(item_id, 0.0) + weight / (rrf_k + rank)
+
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def weighted_score_fusion(rankings: Sequence[List[Tuple[str, float]]], k: int,
+                          weights: Optional[Sequence[float]] = None
+                          ) -> List[Tuple[str, float]]:
+    """
+    Fuse rankings by a weighted sum of min-max normalized scores.
+
+    Args:
+        rankings: Ranked (id, score) lists, best first
+        k: Number of fused results to return
+        weights: Optional weight per ranking
+
+    Returns:
+        Fused (id, score) list, best first
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[str, float] = {}
+
+    for ranking, weight in zip(rankings, weights):
+        if not ranking:
+            continue
+        scores = [score for _, score in ranking]
+        low, high = min(scores), max(scores)
+        spread = high - low
+        for item_id, score in ranking:
+            normalized = (score - low) / spread if spread > 0 else 1.0
+            fused[item_id] = fused.get(item_id, 0.0) + weight * normalized
+
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
@@ -0,0 +1,129 @@
+"""
+Persistent chunk store for Lab 3.
+
+Chunk boundaries are cached per document, keyed by the document content hash
+and the chunking configuration (chunk size, overlap, encoding). Each entry
+stores token and character offsets rather than decoded chunk strings, so an
+unchanged document never needs to be re-tokenized and chunk text is simply
+sliced out of the original document.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def content_hash(text: str) -> str:
+    """Return a stable SHA-256 hex digest for a piece of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def fixed_window_spans(num_tokens: int, chunk_size: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    Compute [start, end) token spans for fixed-size overlapping windows.
+
+    Args:
+        num_tokens: Total number of tokens in the document
+        chunk_size: Window size in tokens
+        overlap: Number of tokens shared between consecutive windows
+
+    Returns:
+        List of (start, end) token index pairs
+    """
+    spans = []
+    step = chunk_size - overlap
+    start = 0
+
+    while start < num_tokens:
+        spans.append((start, min(start + chunk_size, num_tokens)))
+        start += step
+
+    return spans
+
+
+class ChunkStore:
+    """JSON-backed cache of chunk offsets keyed by (content hash, chunking config)."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize chunk store.
+
+        Args:
+            path: JSON file used for persistence. If None, the store is in-memory only.
+        """
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def config_key(chunk_size: int, overlap: int, encoding_name: str, strategy: str = "fixed") -> str:
+        """Build the configuration part of a store key."""
+        key = f"{chunk_size}:{overlap}:{encoding_name}"
+        return key if strategy == "fixed" else f"{strategy}:{key}"
+
+    @staticmethod
+    def make_key(doc_hash: str, config: str) -> str:
+        """Build a full store key from a document hash and configuration key."""
+        return f"{doc_hash}:{config}"
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for a key, or None."""
+        return self.entries.get(key)
+
+    def put(self, key: str, config: str, token_count: int, spans: List[List[int]]) -> None:
+        """
+        Store chunk offsets for a document.
+
+        Args:
+            key: Full store key (see make_key)
+            config: Configuration key the spans were computed with
+            token_count: Total number of tokens in the document
+            spans: List of [token_start, token_end, char_start, char_end] offsets
+        """
+        self.entries[key] = {
+            "config": config,
+            "token_count": token_count,
+            "spans": spans
+        }
+
+    def retain(self, keys: Iterable[str], config: str) -> int:
+        """
+        Drop entries for a configuration that are no longer referenced.
+
+        Entries written with other configurations are left untouched.
+
+        Returns:
+            Number of entries removed
+        """
+        keep = set(keys)
+        stale = [
+            key for key, entry in self.entries.items()
+            if entry.get("config") == config and key not in keep
+        ]
+        for key in stale:
+            del self.entries[key]
+        return len(stale)
+
+    def save(self) -> None:
+        """Write the store to disk (no-op for in-memory stores)."""
+        if not self.path:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,170 @@
+"""
+Structure-aware chunking strategies for Lab 3.
+
+Every strategy works in token space: it receives the document's token count
+and candidate split points (token indices where a paragraph, line, sentence or
+word begins) and returns (token_start, token_end) spans. DocumentChunker maps
+the spans back to character offsets, so token counts are known without
+re-encoding any chunk.
+
+Strategies:
+- fixed:        fixed windows with token overlap (see chunk_store.fixed_window_spans)
+- sentence:     whole sentences packed up to chunk_size; overlap carries whole
+                trailing sentences
+- recursive:    split at paragraphs, then lines, sentences and words only where
+                a piece is still too large, then pack pieces up to chunk_size
+- parent_child: small sentence-aligned child chunks for retrieval, each linked
+                to the chunk_size parent span that is sent to the LLM
+                ("small-to-big")
+"""
+
+import bisect
+import re
+from typing import List, Sequence, Tuple
+
+from lab3.chunk_store import fixed_window_spans
+
+
+CHUNKING_STRATEGIES = ("fixed", "sentence", "recursive", "parent_child")
+
+Span = Tuple[int, int]
+
+# Split points sit at the start of the whitespace that follows a sentence or
+# paragraph, so the punctuation stays with the preceding chunk
+PARAGRAPH_BOUNDARY = re.compile(r"\n\s*\n")
+LINE_BOUNDARY = re.compile(r"\n")
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+WORD_BOUNDARY = re.compile(r"\s+")
+
+RECURSIVE_BOUNDARIES = (PARAGRAPH_BOUNDARY, LINE_BOUNDARY, SENTENCE_BOUNDARY, WORD_BOUNDARY)
+
+
+def boundary_tokens(text: str, offsets: Sequence[int], pattern: re.Pattern) -> List[int]:
+    """
+    Map the matches of a boundary pattern to token indices.
+
+    Args:
+        text: Document text
+        offsets: Character offset of each token (as from decode_with_offsets)
+        pattern: Regex whose match starts are split points
+
+    Returns:
+        Sorted token indices strictly inside the document where a chunk may start
+    """
+    indices = set()
+    for match in pattern.finditer(text):
+        token = bisect.bisect_left(offsets, match.start())
+        if 0 < token < len(offsets):
+            indices.add(token)
+    return sorted(indices)
+
+
+def split_at(start: int, end: int, boundaries: Sequence[int]) -> List[Span]:
+    """Split [start, end) at the boundaries that fall strictly inside it."""
+    lo = bisect.bisect_right(boundaries, start)
+    hi = bisect.bisect_left(boundaries, end)
+    points = [start] + list(boundaries[lo:hi]) + [end]
+    return [(a, b) for a, b in zip(points, points[1:]) if b > a]
+
+
+def _fit(pieces: Sequence[Span], chunk_size: int) -> List[Span]:
+    """Cut pieces longer than chunk_size into fixed windows."""
+    fitted = []
+    for start, end in pieces:
+        if end - start <= chunk_size:
+            fitted.append((start, end))
+        else:
+            fitted.extend(
+                (start + a, start + b) for a, b in fixed_window_spans(end - start, chunk_size, 0)
+            )
+    return fitted
+
+
+def merge_pieces(pieces: Sequence[Span], chunk_size: int, overlap: int = 0) -> List[Span]:
+    """
+    Greedily pack contiguous pieces into spans of at most chunk_size tokens.
+
+    Each new span starts with the trailing pieces of the previous span that fit
+    in `overlap` tokens, so overlap never cuts a piece in half.
+
+    Args:
+        pieces: Contiguous, ordered spans, each at most chunk_size tokens
+        chunk_size: Maximum tokens per span
+        overlap: Maximum tokens repeated from the previous span
+
+    Returns:
+        Merged spans
+    """
+    spans = []
+    current: List[Span] = []
+
+    for piece in pieces:
+        if current and piece[1] - current[0][0] > chunk_size:
+            spans.append((current[0][0], current[-1][1]))
+
+            carried: List[Span] = []
+            for previous in reversed(current):
+                if previous[1] - previous[0] + sum(b - a for a, b in carried) > overlap:
+                    break
+                if piece[1] - previous[0] > chunk_size:
+                    break
+                carried.insert(0, previous)
+            current = carried
+
+        current.append(piece)
+
+    if current:
+        spans.append((current[0][0], current[-1][1]))
+    return spans
+
+
+def sentence_spans(num_tokens: int, sentence_boundaries: Sequence[int],
+                   chunk_size: int, overlap: int = 0) -> List[Span]:
+    """Pack whole sentences into chunks (sentences longer than a chunk are windowed)."""
+    pieces = _fit(split_at(0, num_tokens, sentence_boundaries), chunk_size)
+    return merge_pieces(pieces, chunk_size, overlap)
+
+
+def recursive_spans(num_tokens: int, boundary_levels: Sequence[Sequence[int]],
+                    chunk_size: int, overlap: int = 0) -> List[Span]:
+    """
+    Split only as finely as needed, preferring coarser boundaries.
+
+    Args:
+        num_tokens: Document length in tokens
+        boundary_levels: Split points per level, coarsest first
+        chunk_size: Maximum tokens per chunk
+        overlap: Maximum tokens repeated from the previous chunk
+
+    Returns:
+        Chunk spans
+    """
+    def split(start: int, end: int, level: int) -> List[Span]:
+        if end - start <= chunk_size:
+            return [(start, end)]
+        if level == len(boundary_levels):
+            return _fit([(start, end)], chunk_size)
+
+        pieces = split_at(start, end, boundary_levels[level])
+        result = []
+        for piece_start, piece_end in pieces:
+            result.extend(split(piece_start, piece_end, level + 1))
+        return result
+
+    return merge_pieces(split(0, num_tokens, 0), chunk_size, overlap)
+
+
+def parent_child_spans(num_tokens: int, sentence_boundaries: Sequence[int],
+                       chunk_size: int, child_size: int) -> List[Tuple[int, int, int, int]]:
+    """
+    Build small child chunks nested inside larger parent chunks.
+
+    Returns:
+        (child_start, child_end, parent_start, parent_end) token spans
+    """
+    spans = []
+    for parent_start, parent_end in sentence_spans(num_tokens, sentence_boundaries, chunk_size):
+        pieces = _fit(split_at(parent_start, parent_end, sentence_boundaries), child_size)
+        for child_start, child_end in merge_pieces(pieces, child_size):
+            spans.append((child_start, child_end, parent_start, parent_end))
+    return spans
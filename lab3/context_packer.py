@@ -0,0 +1,189 @@
+"""
+Token-budgeted context packing for Lab 3 prompts.
+
+Instead of concatenating a fixed number of chunks (RAG) or every document
+(full context), pack_context fills a token budget greedily by score:
+
+- exact duplicate texts are dropped
+- chunks already covered by a selected span of the same document are dropped
+- overlapping or touching chunks of the same document are merged into one
+  span, so shared overlap tokens and per-segment headers are paid once; a merge
+  that does not fit is skipped, so smaller later candidates can still fill
+  the budget
+- the first new segment that no longer fits is truncated to the remaining budget
+
+Token counts come from the candidates (chunks carry token_start/token_end from
+the chunker), so nothing is re-encoded except the single truncated tail.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+from lab3.chunk_store import content_hash
+
+
+# Tokens charged per segment for its header and separator ("[Document i]\n" ... "\n\n")
+DEFAULT_SEGMENT_OVERHEAD = 8
+
+# A truncated tail shorter than this carries too little information to include
+MIN_TAIL_TOKENS = 16
+
+
+def token_truncator(encoding) -> Callable[[str, int], str]:
+    """Build a truncate(text, max_tokens) function from a tiktoken encoding."""
+    def truncate(text: str, max_tokens: int) -> str:
+        return encoding.decode(encoding.encode(text)[:max_tokens])
+    return truncate
+
+
+def _truncate_by_chars(text: str, max_tokens: int, token_count: int) -> str:
+    """Approximate truncation assuming tokens are spread evenly over the text."""
+    return text[:len(text) * max_tokens // max(token_count, 1)]
+
+
+def _token_count(candidate: Dict[str, Any]) -> int:
+    if "token_start" in candidate and "token_end" in candidate:
+        return candidate["token_end"] - candidate["token_start"]
+    return int(candidate["token_count"])
+
+
+def _is_positional(candidate: Dict[str, Any]) -> bool:
+    return candidate.get("doc_id") is not None and all(
+        key in candidate for key in ("token_start", "token_end", "char_start", "char_end")
+    )
+
+
+def _merge_spans(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge overlapping or touching spans of one document into a single span."""
+    spans = sorted(spans, key=lambda span: span["char_start"])
+    merged = dict(spans[0], chunk_ids=list(spans[0]["chunk_ids"]))
+
+    for span in spans[1:]:
+        if span["char_end"] > merged["char_end"]:
+            merged["text"] += span["text"][merged["char_end"] - span["char_start"]:]
+            merged["char_end"] = span["char_end"]
+            merged["token_end"] = span["token_end"]
+        merged["score"] = max(merged["score"], span["score"])
+        merged["chunk_ids"] += span["chunk_ids"]
+
+    merged["token_count"] = merged["token_end"] - merged["token_start"]
+    return merged
+
+
+def pack_context(
+    candidates: List[Dict[str, Any]],
+    token_budget: int,
+    segment_overhead: int = DEFAULT_SEGMENT_OVERHEAD,
+    truncate: Optional[Callable[[str, int], str]] = None
+) -> Dict[str, Any]:
+    """
+    Select and merge candidates into at most token_budget tokens.
+
+    Args:
+        candidates: Dicts with "text", "score" and either "token_count" or
+                    "token_start"/"token_end". Candidates that also have "doc_id"
+                    and "char_start"/"char_end" can be merged with their neighbours.
+                    An optional "chunk_id" is carried through.
+        token_budget: Maximum tokens for the packed context, including segment overhead
+        segment_overhead: Tokens charged per output segment
+        truncate: truncate(text, max_tokens) for the tail; defaults to a
+                  character-proportional cut
+
+    Returns:
+        dict with:
+            segments: Packed spans, best score first, each with text, score,
+                      token_count, chunk_ids and (if positional) doc_id and offsets
+            tokens: Estimated context tokens including overhead
+            duplicates: Candidates dropped as duplicates or already covered
+            truncated: Whether the last segment was cut to fit
+    """
+    spans_by_doc: Dict[str, List[Dict[str, Any]]] = {}
+    standalone: List[Dict[str, Any]] = []
+    seen_hashes = set()
+    used = 0
+    duplicates = 0
+    truncated = False
+
+    for candidate in sorted(candidates, key=lambda c: c["score"], reverse=True):
+        text_hash = content_hash(candidate["text"])
+        if text_hash in seen_hashes:
+            duplicates += 1
+            continue
+
+        span = {
+            "text": candidate["text"],
+            "score": candidate["score"],
+            "token_count": _token_count(candidate),
+            "chunk_ids": [candidate["chunk_id"]] if "chunk_id" in candidate else []
+        }
+
+        if _is_positional(candidate):
+            for key in ("doc_id", "token_start", "token_end", "char_start", "char_end"):
+                span[key] = candidate[key]
+
+            doc_spans = spans_by_doc.get(candidate["doc_id"], [])
+            touching = [
+                existing for existing in doc_spans
+                if existing["char_start"] <= span["char_end"] and span["char_start"] <= existing["char_end"]
+            ]
+            if any(existing["char_start"] <= span["char_start"] and span["char_end"] <= existing["char_end"]
+                   for existing in touching):
+                duplicates += 1
+                continue
+
+            if touching:
+                merged = _merge_spans(touching + [span])
+                # Merging k existing spans into one saves k - 1 segment headers
+                extra = (merged["token_count"] - sum(existing["token_count"] for existing in touching)
+                         - segment_overhead * (len(touching) - 1))
+                if used + extra > token_budget:
+                    continue
+                spans_by_doc[candidate["doc_id"]] = [
+                    existing for existing in doc_spans if existing not in touching
+                ] + [merged]
+                used += extra
+                seen_hashes.add(text_hash)
+                continue
+
+        extra = span["token_count"] + segment_overhead
+        if used + extra > token_budget:
+            remaining = token_budget - used - segment_overhead
+            if remaining >= MIN_TAIL_TOKENS:
+                if truncate is not None:
+                    span["text"] = truncate(span["text"], remaining)
+                else:
+                    span["text"] = _truncate_by_chars(span["text"], remaining, span["token_count"])
+                span["token_count"] = remaining
+                for key in ("token_end", "char_end"):
+                    span.pop(key, None)
+                _add_span(span, spans_by_doc, standalone)
+                used += remaining + segment_overhead
+                truncated = True
+            break
+
+        _add_span(span, spans_by_doc, standalone)
+        used += extra
+        seen_hashes.add(text_hash)
+
+    segments = standalone + [span for spans in spans_by_doc.values() for span in spans]
+    segments.sort(key=lambda span: span["score"], reverse=True)
+
+    return {
+        "segments": segments,
+        "tokens": used,
+        "duplicates": duplicates,
+        "truncated": truncated
+    }
+
+
+def _add_span(span: Dict[str, Any], spans_by_doc: Dict[str, List[Dict[str, Any]]],
+              standalone: List[Dict[str, Any]]) -> None:
+    # Truncated spans lose their end offsets and can no longer be merged
+    if "doc_id" in span and "char_end" in span:
+        spans_by_doc.setdefault(span["doc_id"], []).append(span)
+    else:
+        standalone.append(span)
+
+
+def render_context(segments: List[Dict[str, Any]]) -> str:
+    """Format packed segments the way RAG prompts label retrieved chunks."""
+    return "\n\n".join(f"[Document {i}]\n{segment['text']}" for i, segment in enumerate(segments, 1))
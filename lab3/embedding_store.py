@@ -0,0 +1,257 @@
+"""
+Persistent embedding cache for Lab 3.
+
+Embeddings are keyed by (model, text hash) and stored on disk as memory-mapped
+NumPy segments, optionally scalar-quantized to float16 or int8 (symmetric,
+one scale per row). Each flush writes only the newly added rows as a new
+segment plus a sidecar list of text hashes, so saving costs O(new rows) and
+loading maps existing segments without reading them into RAM.
+
+Layout of a store directory:
+    manifest.json               model, dtype, dim and segment names
+    seg_00000.npy               quantized vectors
+    seg_00000.scales.npy        per-row scales (int8 only)
+    seg_00000.keys.json         text hash per row
+"""
+
+import json
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from lab3.chunk_store import content_hash
+
+
+class EmbeddingStore:
+    """Append-only, memory-mapped store of embeddings keyed by text hash."""
+
+    DTYPES = ("float32", "float16", "int8")
+
+    def __init__(self, store_dir: str, model_name: str, dtype: str = "float32"):
+        """
+        Initialize embedding store.
+
+        Args:
+            store_dir: Root directory for embedding stores
+            model_name: Embedding model the vectors come from (part of the cache key)
+            dtype: On-disk precision: "float32", "float16", or "int8"
+        """
+        if dtype not in self.DTYPES:
+            raise ValueError(f"Unknown dtype: {dtype}. Choose from {list(self.DTYPES)}")
+
+        self.model_name = model_name
+        self.dtype = dtype
+        self.path = os.path.join(store_dir, f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)}-{dtype}")
+        self.dim: Optional[int] = None
+
+        self.segments: List[Tuple[np.ndarray, Optional[np.ndarray]]] = []
+        self.segment_names: List[str] = []
+        self.locations: Dict[str, Tuple[int, int]] = {}
+
+        self._pending_keys: List[str] = []
+        self._pending_vectors: List[np.ndarray] = []
+        self._pending_scales: List[np.ndarray] = []
+
+        self._load()
+
+    def _load(self) -> None:
+        manifest_path = os.path.join(self.path, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return
+
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        if manifest["model"] != self.model_name or manifest["dtype"] != self.dtype:
+            raise ValueError(f"Embedding store at {self.path} was written for a different model or dtype")
+
+        self.dim = manifest["dim"]
+        for name in manifest["segments"]:
+            self._open_segment(name)
+
+    def _open_segment(self, name: str) -> None:
+        vectors = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+        scales = None
+        if self.dtype == "int8":
+            scales = np.load(os.path.join(self.path, f"{name}.scales.npy"))
+
+        with open(os.path.join(self.path, f"{name}.keys.json"), 'r', encoding='utf-8') as f:
+            keys = json.load(f)
+
+        segment_idx = len(self.segments)
+        self.segments.append((vectors, scales))
+        self.segment_names.append(name)
+        for row, key in enumerate(keys):
+            self.locations[key] = (segment_idx, row)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.locations
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Convert float32 vectors to the store's precision.
+
+        Returns:
+            Tuple of (quantized vectors, per-row scales or None)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        if self.dtype == "float16":
+            return vectors.astype(np.float16), None
+        if self.dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+            return quantized, scales.astype(np.float32)
+        return vectors, None
+
+    @staticmethod
+    def dequantize(vectors: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+        """Convert stored vectors back to float32."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if scales is not None:
+            vectors = vectors * scales[:, None]
+        return vectors
+
+    def add(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Buffer new embeddings. Keys already in the store are ignored.
+
+        Call flush() to write buffered embeddings to disk.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        new_rows = [i for i, key in enumerate(keys) if key not in self.locations]
+        if not new_rows:
+            return
+
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+
+        quantized, scales = self.quantize(vectors[new_rows])
+        pending_segment = len(self.segments)
+
+        for offset, row in enumerate(new_rows):
+            key = keys[row]
+            if key in self.locations:
+                continue
+            self.locations[key] = (pending_segment, len(self._pending_keys))
+            self._pending_keys.append(key)
+            self._pending_vectors.append(quantized[offset])
+            if scales is not None:
+                self._pending_scales.append(scales[offset])
+
+    def get(self, keys: Sequence[str]) -> np.ndarray:
+        """
+        Read embeddings for keys that are in the store.
+
+        Returns:
+            float32 array of shape (len(keys), dim)
+        """
+        result = np.zeros((len(keys), self.dim or 0), dtype=np.float32)
+        by_segment: Dict[int, List[Tuple[int, int]]] = {}
+
+        for position, key in enumerate(keys):
+            segment_idx, row = self.locations[key]
+            by_segment.setdefault(segment_idx, []).append((position, row))
+
+        for segment_idx, pairs in by_segment.items():
+            positions = [position for position, _ in pairs]
+            rows = [row for _, row in pairs]
+
+            if segment_idx < len(self.segments):
+                vectors, scales = self.segments[segment_idx]
+                result[positions] = self.dequantize(
+                    vectors[rows], scales[rows] if scales is not None else None
+                )
+            else:
+                result[positions] = self.dequantize(
+                    np.stack([self._pending_vectors[row] for row in rows]),
+                    np.asarray([self._pending_scales[row] for row in rows])
+                    if self._pending_scales else None
+                )
+
+        return result
+
+    def flush(self) -> None:
+        """Write buffered embeddings as a new segment."""
+        if not self._pending_keys:
+            return
+
+        os.makedirs(self.path, exist_ok=True)
+        name = f"seg_{len(self.segments):05d}"
+
+        np.save(os.path.join(self.path, f"{name}.npy"), np.stack(self._pending_vectors))
+        if self.dtype == "int8":
+            np.save(
+                os.path.join(self.path, f"{name}.scales.npy"),
+                np.asarray(self._pending_scales, dtype=np.float32)
+            )
+        with open(os.path.join(self.path, f"{name}.keys.json"), 'w', encoding='utf-8') as f:
+            json.dump(self._pending_keys, f)
+
+        self._pending_keys = []
+        self._pending_vectors = []
+        self._pending_scales = []
+        self._open_segment(name)
+
+        # The manifest is written last so a crash mid-flush never references a partial segment
+        manifest_path = os.path.join(self.path, "manifest.json")
+        with open(manifest_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({
+                "model": self.model_name,
+                "dtype": self.dtype,
+                "dim": self.dim,
+                "segments": self.segment_names
+            }, f, indent=2)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+
+class CachedEmbedder:
+    """Embedder wrapper that serves repeated texts from an EmbeddingStore."""
+
+    def __init__(self, embedder, store: EmbeddingStore):
+        """
+        Initialize cached embedder.
+
+        Args:
+            embedder: Object with embed(texts), model_name and backend attributes
+            store: Embedding store for the same model
+        """
+        self.embedder = embedder
+        self.store = store
+        self.model_name = embedder.model_name
+        self.backend = f"{embedder.backend}, cached as {store.dtype}"
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts, computing only those not already cached.
+
+        Returns:
+            float32 array of shape (len(texts), dim)
+        """
+        keys = [content_hash(text) for text in texts]
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self.store and key not in missing:
+                missing[key] = text
+
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+
+        if missing:
+            vectors = self.embedder.embed(list(missing.values()))
+            self.store.add(list(missing.keys()), vectors)
+
+        return self.store.get(keys)
+
+    def flush(self) -> None:
+        """Persist newly computed embeddings."""
+        self.store.flush()
@@ -0,0 +1,80 @@
+"""
+Local sentence embedding models for Lab 3.
+
+Uses sentence-transformers when it is installed and falls back to ChromaDB's
+bundled ONNX copy of the same default model (all-MiniLM-L6-v2).
+"""
+
+from typing import List
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+try:
+    from chromadb.utils import embedding_functions
+except ImportError:
+    embedding_functions = None
+
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+
+class Embedder:
+    """Embeds batches of texts into float32 vectors."""
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, batch_size: int = 256):
+        """
+        Initialize embedder.
+
+        Args:
+            model_name: sentence-transformers model name
+            batch_size: Number of texts per forward pass
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+
+        if SentenceTransformer is not None:
+            self.backend = "sentence-transformers"
+            self._model = SentenceTransformer(model_name)
+        elif embedding_functions is not None and model_name == DEFAULT_EMBEDDING_MODEL:
+            self.backend = "chromadb-onnx"
+            self._model = embedding_functions.DefaultEmbeddingFunction()
+        else:
+            raise ImportError(
+                "No embedding backend available. Please run: pip install sentence-transformers"
+            )
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Array of shape (len(texts), dim) with dtype float32
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        if self.backend == "sentence-transformers":
+            vectors = self._model.encode(
+                list(texts),
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+        else:
+            vectors = np.concatenate([
+                np.asarray(self._model(list(texts[i:i+self.batch_size])), dtype=np.float32)
+                for i in range(0, len(texts), self.batch_size)
+            ])
+
+        return np.asarray(vectors, dtype=np.float32)
+
+    def flush(self) -> None:
+        """No-op; present so cached and uncached embedders share one interface."""
@@ -11,104 +11,257 @@ Measures: accuracy and latency for both approaches.
 import json
 import os
 import sys
+import threading
 import time
-from typing import List, Dict, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 import tiktoken
 from dotenv import load_dotenv
 from openai import AzureOpenAI
 
 # Add parent directory to path to import azure_openai_helper
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from azure_openai_helper.llm_client import llm_query
-
-try:
-    import chromadb
-    from chromadb.config import Settings
-except ImportError:
-    print("ChromaDB not installed. Please run: pip install chromadb")
-    sys.exit(1)
+from azure_openai_helper.llm_client import llm_query_timed
+from lab3.bm25 import BM25Index, reciprocal_rank_fusion, weighted_score_fusion
+from lab3.chunk_store import ChunkStore, content_hash, fixed_window_spans
+from lab3.chunking import (
+    CHUNKING_STRATEGIES,
+    RECURSIVE_BOUNDARIES,
+    SENTENCE_BOUNDARY,
+    boundary_tokens,
+    parent_child_spans,
+    recursive_spans,
+    sentence_spans
+)
+from lab3.context_packer import pack_context, render_context, token_truncator
+from lab3.embedding_store import CachedEmbedder, EmbeddingStore
+from lab3.embeddings import Embedder
+from lab3.generate_corpus import load_corpus
+from lab3.reranker import Reranker
+from lab3.retrieval_eval import benchmark_retrieval_modes, format_mode_report
+from lab3.vector_index import create_index
 
 # Load environment variables
 load_dotenv()
 
+# Retrieval modes supported by RAGSystem: dense vectors, BM25, and two fusions of both
+RETRIEVAL_MODES = ("dense", "bm25", "rrf", "weighted")
+
+# Per-stage timers recorded for each query (seconds)
+RAG_STAGES = ("embed_query", "index_search", "rerank", "prompt_assembly", "llm_first_token", "llm_generation")
+FULL_CONTEXT_STAGES = ("prompt_assembly", "llm_first_token", "llm_generation")
+
+# Full-context prompt layouts: documents inside the user prompt, or as a shared system-message prefix
+PROMPT_LAYOUTS = ("inline", "prefix")
+
+FULL_CONTEXT_INSTRUCTION = "Answer the following question based on the provided documents. Be concise and specific."
+
 
 class DocumentChunker:
-    """Utility for splitting documents into fixed-size chunks."""
+    """Utility for splitting documents into token-bounded chunks."""
     
-    def __init__(self, chunk_size: int = 500, overlap: int = 50):
+    def __init__(
+        self,
+        chunk_size: int = 500,
+        overlap: int = 50,
+        encoding_name: str = "cl100k_base",
+        store_path: Optional[str] = None,
+        strategy: str = "fixed",
+        child_size: Optional[int] = None
+    ):
         """
         Initialize chunker.
         
         Args:
             chunk_size: Target size of each chunk in tokens
-            overlap: Number of tokens to overlap between chunks
+            overlap: Number of tokens to overlap between chunks. The sentence and
+                     recursive strategies only repeat whole pieces that fit.
+            encoding_name: tiktoken encoding used for token counting
+            store_path: Optional JSON file for the persistent chunk store.
+                        If None, chunk offsets are only cached in memory.
+            strategy: "fixed", "sentence", "recursive", or "parent_child"
+                      (see lab3/chunking.py)
+            child_size: Child chunk size for "parent_child" (default chunk_size // 4);
+                        chunk_size is then the parent size
         """
+        if overlap >= chunk_size:
+            raise ValueError("overlap must be smaller than chunk_size")
+        if strategy not in CHUNKING_STRATEGIES:
+            raise ValueError(f"Unknown chunking strategy: {strategy}. Choose from {list(CHUNKING_STRATEGIES)}")
+        
         self.chunk_size = chunk_size
         self.overlap = overlap
-        self.encoding = tiktoken.get_encoding("cl100k_base")
+        self.strategy = strategy
+        self.child_size = child_size or max(chunk_size // 4, 1)
+        self.encoding_name = encoding_name
+        self.encoding = tiktoken.get_encoding(encoding_name)
+        self.store = ChunkStore(store_path)
+        self.last_stats = {"documents": 0, "rechunked": 0}
     
-    def chunk_text(self, text: str, doc_id: str = None) -> List[Dict[str, Any]]:
+    @property
+    def config_key(self) -> str:
+        """Chunk store configuration key for this chunker."""
+        strategy = f"parent_child-{self.child_size}" if self.strategy == "parent_child" else self.strategy
+        return ChunkStore.config_key(self.chunk_size, self.overlap, self.encoding_name, strategy)
+    
+    def compute_spans(self, tokens: List[int], text: str) -> List[List[int]]:
         """
-        Split text into overlapping chunks.
+        Compute chunk offsets for an already-encoded text.
         
         Args:
-            text: Text to chunk
+            tokens: Token ids of the text
+            text: The text the tokens were produced from
+            
+        Returns:
+            List of [token_start, token_end, char_start, char_end] offsets, followed
+            by the parent's [token_start, token_end, char_start, char_end] for
+            the parent_child strategy
+        """
+        _, offsets = self.encoding.decode_with_offsets(tokens)
+        offsets = list(offsets)
+        num_tokens = len(tokens)
+        
+        if self.strategy == "fixed":
+            spans = fixed_window_spans(num_tokens, self.chunk_size, self.overlap)
+        elif self.strategy == "sentence":
+            spans = sentence_spans(
+                num_tokens, boundary_tokens(text, offsets, SENTENCE_BOUNDARY), self.chunk_size, self.overlap
+            )
+        elif self.strategy == "recursive":
+            levels = [boundary_tokens(text, offsets, pattern) for pattern in RECURSIVE_BOUNDARIES]
+            spans = recursive_spans(num_tokens, levels, self.chunk_size, self.overlap)
+        else:
+            spans = parent_child_spans(
+                num_tokens, boundary_tokens(text, offsets, SENTENCE_BOUNDARY), self.chunk_size, self.child_size
+            )
+        
+        offsets.append(len(text))
+        result = []
+        for span in spans:
+            offset_span = []
+            # Each (token_start, token_end) pair gains its character offsets
+            for start, end in zip(span[::2], span[1::2]):
+                offset_span += [start, end, offsets[start], offsets[end]]
+            result.append(offset_span)
+        
+        return result
+    
+    @staticmethod
+    def build_chunks(text: str, spans: List[List[int]], doc_id: str = None) -> List[Dict[str, Any]]:
+        """
+        Materialize chunk dictionaries by slicing text at stored offsets.
+        
+        Args:
+            text: Full document text
+            spans: Offsets as returned by compute_spans
             doc_id: Optional document identifier
             
         Returns:
             List of chunk dictionaries with text and metadata
         """
-        tokens = self.encoding.encode(text)
         chunks = []
+        parent_ids: Dict[Tuple[int, int], str] = {}
         
-        start = 0
-        chunk_idx = 0
-        
-        while start < len(tokens):
-            end = start + self.chunk_size
-            chunk_tokens = tokens[start:end]
-            chunk_text = self.encoding.decode(chunk_tokens)
-            
-            chunks.append({
-                "text": chunk_text,
+        for chunk_idx, span in enumerate(spans):
+            token_start, token_end, char_start, char_end = span[:4]
+            chunk = {
+                "text": text[char_start:char_end],
                 "chunk_id": f"{doc_id}_chunk_{chunk_idx}" if doc_id else f"chunk_{chunk_idx}",
                 "doc_id": doc_id,
                 "chunk_index": chunk_idx,
-                "token_count": len(chunk_tokens)
-            })
+                "token_count": token_end - token_start,
+                "token_start": token_start,
+                "token_end": token_end,
+                "char_start": char_start,
+                "char_end": char_end
+            }
+            
+            # Small-to-big chunks also carry the parent span sent to the LLM
+            if len(span) == 8:
+                parent_start, parent_end, parent_char_start, parent_char_end = span[4:]
+                parent_key = (parent_start, parent_end)
+                if parent_key not in parent_ids:
+                    parent_ids[parent_key] = f"{doc_id}_parent_{len(parent_ids)}"
+                chunk.update({
+                    "parent_id": parent_ids[parent_key],
+                    "parent_text": text[parent_char_start:parent_char_end],
+                    "parent_token_count": parent_end - parent_start,
+                    "parent_token_start": parent_start,
+                    "parent_token_end": parent_end,
+                    "parent_char_start": parent_char_start,
+                    "parent_char_end": parent_char_end
+                })
             
-            chunk_idx += 1
-            start += (self.chunk_size - self.overlap)
+            chunks.append(chunk)
         
         return chunks
     
+    def chunk_text(self, text: str, doc_id: str = None) -> List[Dict[str, Any]]:
+        """
+        Split text into overlapping chunks.
+        
+        Args:
+            text: Text to chunk
+            doc_id: Optional document identifier
+            
+        Returns:
+            List of chunk dictionaries with text and metadata
+        """
+        tokens = self.encoding.encode(text)
+        return self.build_chunks(text, self.compute_spans(tokens, text), doc_id)
+    
     def chunk_documents(self, documents: List[Dict[str, str]]) -> List[Dict[str, Any]]:
         """
         Chunk multiple documents.
         
+        Documents whose content and chunking configuration are already in the
+        chunk store are not re-tokenized. The remaining documents are encoded
+        together with a single encode_batch call.
+        
         Args:
             documents: List of document dictionaries with 'id' and 'content'
             
         Returns:
             List of all chunks from all documents
         """
-        all_chunks = []
+        config = self.config_key
+        prepared = []
+        missing = {}
         
         for doc in documents:
-            doc_id = doc.get("id", "unknown")
             content = doc.get("content", "")
             title = doc.get("title", "")
-            category = doc.get("category", "")
             
             # Include title in content for better context
             full_text = f"{title}\n\n{content}" if title else content
+            key = ChunkStore.make_key(content_hash(full_text), config)
+            
+            prepared.append((doc, full_text, key))
+            if key not in self.store:
+                missing[key] = full_text
+        
+        if missing:
+            keys = list(missing.keys())
+            texts = [missing[key] for key in keys]
+            token_lists = self.encoding.encode_batch(texts)
             
-            chunks = self.chunk_text(full_text, doc_id)
+            for key, text, tokens in zip(keys, texts, token_lists):
+                self.store.put(key, config, len(tokens), self.compute_spans(tokens, text))
+        
+        self.store.retain([key for _, _, key in prepared], config)
+        self.store.save()
+        self.last_stats = {"documents": len(documents), "rechunked": len(missing)}
+        
+        all_chunks = []
+        
+        for doc, full_text, key in prepared:
+            doc_id = doc.get("id", "unknown")
+            chunks = self.build_chunks(full_text, self.store.get(key)["spans"], doc_id)
             
             # Add document metadata to each chunk
             for chunk in chunks:
-                chunk["title"] = title
-                chunk["category"] = category
+                chunk["title"] = doc.get("title", "")
+                chunk["category"] = doc.get("category", "")
             
             all_chunks.extend(chunks)
         
@@ -116,132 +269,317 @@ class DocumentChunker:
 
 
 class RAGSystem:
-    """RAG system using ChromaDB for vector storage and retrieval."""
+    """RAG system with a pluggable vector index for storage and retrieval."""
     
-    def __init__(self, collection_name: str = "lab3_docs"):
+    def __init__(
+        self,
+        collection_name: str = "lab3_docs",
+        persist_dir: Optional[str] = None,
+        batch_size: int = 256,
+        backend: str = "chroma",
+        embedder: Optional[Embedder] = None,
+        query_embedder: Optional[Embedder] = None,
+        context_budget: Optional[int] = None,
+        pack_candidates: int = 20,
+        reranker: Optional[Reranker] = None,
+        rerank_depth: int = 20
+    ):
         """
         Initialize RAG system.
         
         Args:
-            collection_name: Name for the ChromaDB collection
+            collection_name: Name for the ChromaDB collection (chroma backend only)
+            persist_dir: Optional directory for a persistent ChromaDB index (chroma backend only).
+                         If None, the index is rebuilt on every run.
+            batch_size: Number of chunks embedded per upsert call
+            backend: Vector index backend: "chroma", "numpy", or "hnsw"
+            embedder: Embedding model; defaults to a local all-MiniLM-L6-v2 Embedder
+            query_embedder: Embedding model for queries (default: embedder). Pass the
+                            uncached model when embedding a cached corpus, so the
+                            embed_query stage measures real embedding work.
+            context_budget: Optional token budget for retrieved context. When set,
+                            up to pack_candidates chunks are retrieved and packed
+                            into the budget instead of using exactly k chunks.
+            pack_candidates: Retrieval depth used when packing to a budget
+            reranker: Optional second stage. Retrieval fetches rerank_depth
+                      candidates and the reranker picks the final k.
+            rerank_depth: Number of first-stage candidates passed to the reranker
         """
         self.collection_name = collection_name
+        self.persist_dir = persist_dir
+        self.batch_size = batch_size
+        self.backend = backend
         
-        # Initialize ChromaDB with default embedding function (sentence-transformers)
-        self.chroma_client = chromadb.Client(Settings(
-            anonymized_telemetry=False,
-            allow_reset=True
-        ))
-        
-        # Reset collection if it exists
-        try:
-            self.chroma_client.delete_collection(name=collection_name)
-        except:
-            pass
-        
-        # Create collection - ChromaDB will use default embedding function
-        self.collection = self.chroma_client.create_collection(
-            name=collection_name,
-            metadata={"description": "Lab 3 document chunks"}
-        )
+        if backend == "chroma":
+            self.index = create_index(backend, collection_name=collection_name, persist_dir=persist_dir)
+        else:
+            self.index = create_index(backend)
+        
+        self.embedder = embedder or Embedder(batch_size=batch_size)
+        self.query_embedder = query_embedder or self.embedder
+        
+        self.bm25 = BM25Index()
+        self.fusion_depth = 20
+        
+        self.context_budget = context_budget
+        self.pack_candidates = pack_candidates
+        self.reranker = reranker
+        self.rerank_depth = rerank_depth
+        self._truncate = None
+        self._search_lock = threading.Lock()
         
         self.chunks = []
-        print("✓ Using ChromaDB's default embedding function (sentence-transformers)")
+        self.chunk_lookup: Dict[str, Dict[str, Any]] = {}
+        self._prefetched: Dict[Tuple[str, int, str], Tuple[List[Dict[str, Any]], Dict[str, float]]] = {}
+        self.last_prefetch_timings: Dict[str, float] = {}
+        print(f"✓ Using {self.embedder.model_name} embeddings ({self.embedder.backend})")
+        print(f"✓ Using {self.index.name} vector index ({len(self.index)} chunks stored)")
+        if reranker is not None:
+            print(f"✓ Reranking top {rerank_depth} candidates with {reranker.model_name} ({reranker.backend})")
     
     def add_documents(self, chunks: List[Dict[str, Any]]) -> None:
         """
         Add document chunks to vector store.
         
+        Chunks are upserted by chunk id. A chunk whose content hash matches the
+        one already stored is skipped, so only new or edited chunks are embedded.
+        The hash covers the embedding model name too, so switching models
+        re-embeds every chunk.
+        Chunks left over from previous runs that are no longer present are removed.
+        
         Args:
             chunks: List of chunk dictionaries
         """
-        print(f"Embedding and storing {len(chunks)} chunks...")
-        
         self.chunks = chunks
+        self.chunk_lookup = {chunk["chunk_id"]: chunk for chunk in chunks}
+        self._prefetched = {}
+        
+        # Look up what the index already holds
+        stored_hashes = self.index.stored_hashes()
+        
+        stale_ids = [chunk_id for chunk_id in stored_hashes if chunk_id not in self.chunk_lookup]
+        if stale_ids:
+            self.index.delete(stale_ids)
+        
+        pending = []
+        for chunk in chunks:
+            chunk_hash = content_hash(f"{self.embedder.model_name}\n{chunk['text']}")
+            if stored_hashes.get(chunk["chunk_id"]) != chunk_hash:
+                pending.append((chunk, chunk_hash))
+        
+        print(f"Embedding and storing {len(pending)} chunks "
+              f"({len(chunks) - len(pending)} unchanged, {len(stale_ids)} removed)...")
         
         # Process in batches
-        batch_size = 10
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i:i+batch_size]
+        for i in range(0, len(pending), self.batch_size):
+            batch = pending[i:i+self.batch_size]
             
-            # Prepare data for ChromaDB
-            texts = [chunk["text"] for chunk in batch]
+            vectors = self.embedder.embed([chunk["text"] for chunk, _ in batch])
+            self.index.upsert(
+                ids=[chunk["chunk_id"] for chunk, _ in batch],
+                vectors=vectors,
+                hashes=[chunk_hash for _, chunk_hash in batch]
+            )
             
-            # Prepare metadata
-            metadatas = [
-                {
-                    "chunk_id": chunk["chunk_id"],
-                    "doc_id": chunk["doc_id"],
-                    "title": chunk.get("title", ""),
-                    "category": chunk.get("category", ""),
-                    "chunk_index": str(chunk["chunk_index"]),
-                    "token_count": str(chunk["token_count"])
-                }
-                for chunk in batch
-            ]
+            print(f"  Processed {min(i+self.batch_size, len(pending))}/{len(pending)} chunks")
+        
+        self.embedder.flush()
+        print(f"✓ Vector store holds {len(chunks)} chunks")
+        
+        # Lexical index over the same chunks
+        self.bm25.build([chunk["chunk_id"] for chunk in chunks], [chunk["text"] for chunk in chunks])
+        print(f"✓ BM25 index holds {len(self.bm25)} chunks ({len(self.bm25.postings)} terms)")
+    
+    def _format_result(self, chunk_id: str, score: float, mode: str) -> Dict[str, Any]:
+        """Build a retrieval result dictionary for a stored chunk."""
+        chunk = self.chunk_lookup[chunk_id]
+        return {
+            "chunk_id": chunk_id,
+            "text": chunk["text"],
+            "metadata": {
+                "chunk_id": chunk_id,
+                "doc_id": chunk["doc_id"],
+                "title": chunk.get("title", ""),
+                "category": chunk.get("category", ""),
+                "chunk_index": str(chunk["chunk_index"]),
+                "token_count": str(chunk["token_count"])
+            },
+            "distance": 1.0 - score if mode == "dense" else None,
+            "score": score
+        }
+    
+    def similarity_search_batch(
+        self,
+        queries: List[str],
+        k: int = 3,
+        mode: str = "dense"
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve top-k chunks for many queries at once.
+        
+        All queries are embedded in one forward pass and searched with a single
+        index call.
+        
+        Args:
+            queries: Search queries
+            k: Number of chunks to retrieve per query
+            mode: "dense" (vector index), "bm25" (lexical), or a fusion of both:
+                  "rrf" (reciprocal rank fusion) or "weighted" (normalized score sum)
             
-            # Add to collection - ChromaDB will automatically generate embeddings
-            self.collection.add(
-                documents=texts,
-                metadatas=metadatas,
-                ids=[chunk["chunk_id"] for chunk in batch]
-            )
+        Returns:
+            One list of relevant chunks per query, in query order
+        """
+        return self._search_batch(queries, k, mode)[0]
+    
+    def _search_batch(
+        self,
+        queries: List[str],
+        k: int,
+        mode: str
+    ) -> Tuple[List[List[Dict[str, Any]]], Dict[str, float]]:
+        """Run batched retrieval and time the query embedding, index search and rerank stages."""
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {mode}. Choose from {list(RETRIEVAL_MODES)}")
+        
+        timings = {"embed_query": 0.0, "index_search": 0.0, "rerank": 0.0}
+        if not queries:
+            return [], timings
+        
+        final_k = k
+        if self.reranker is not None:
+            k = max(k, self.rerank_depth)
+        
+        if mode != "bm25":
+            start_time = time.time()
+            query_vectors = self.query_embedder.embed(list(queries))
+            timings["embed_query"] = time.time() - start_time
+        
+        start_time = time.time()
+        if mode == "dense":
+            hits = self.index.search(query_vectors, k)
+        elif mode == "bm25":
+            hits = self.bm25.search_batch(queries, k)
+        else:
+            # Fuse deeper candidate lists from both retrievers
+            depth = max(k, self.fusion_depth)
+            dense_hits = self.index.search(query_vectors, depth)
+            lexical_hits = self.bm25.search_batch(queries, depth)
+            fuse = reciprocal_rank_fusion if mode == "rrf" else weighted_score_fusion
+            hits = [fuse([dense, lexical], k) for dense, lexical in zip(dense_hits, lexical_hits)]
+        timings["index_search"] = time.time() - start_time
+        
+        results = [
+            [self._format_result(chunk_id, score, mode) for chunk_id, score in row]
+            for row in hits
+        ]
+        
+        if self.reranker is not None:
+            start_time = time.time()
+            results = self.reranker.rerank_batch(queries, results, final_k)
+            timings["rerank"] = time.time() - start_time
+        
+        return results, timings
+    
+    def prefetch(self, queries: List[str], k: int = 3, mode: str = "dense") -> float:
+        """
+        Run retrieval for a whole question set up front.
+        
+        Later similarity_search / query_with_rag calls for these queries are
+        served from the prefetched results.
+        
+        Args:
+            queries: Queries that will be asked
+            k: Number of chunks to retrieve per query
+            mode: Retrieval mode (see similarity_search_batch)
             
-            print(f"  Processed {min(i+batch_size, len(chunks))}/{len(chunks)} chunks")
+        Returns:
+            Wall time of the batched retrieval in seconds; the time of each
+            stage (embed_query, index_search, rerank) is kept in
+            last_prefetch_timings
+        """
+        start_time = time.time()
+        results, timings = self._search_batch(queries, k, mode)
+        elapsed = time.time() - start_time
+        self.last_prefetch_timings = timings
+        
+        # Each query is charged an equal share of each batched stage
+        shares = {stage: seconds / max(len(queries), 1) for stage, seconds in timings.items()}
+        for query, retrieved_chunks in zip(queries, results):
+            self._prefetched[(query, k, mode)] = (retrieved_chunks, shares)
         
-        print(f"✓ Added {len(chunks)} chunks to vector store")
+        return elapsed
+    
+    def search_depth(self, k: int) -> int:
+        """Number of chunks query_with_rag retrieves for a requested k."""
+        return max(k, self.pack_candidates) if self.context_budget else k
     
-    def similarity_search(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+    def _retrieve(self, query: str, k: int, mode: str) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+        """Return (chunks, retrieval stage timings), using prefetched results when available."""
+        if (query, k, mode) in self._prefetched:
+            return self._prefetched[(query, k, mode)]
+        # The embedding cache and models are not safe for concurrent use
+        with self._search_lock:
+            results, timings = self._search_batch([query], k, mode)
+        return results[0], timings
+    
+    def similarity_search(self, query: str, k: int = 3, mode: str = "dense") -> List[Dict[str, Any]]:
         """
         Retrieve top-k most relevant chunks for a query.
         
         Args:
             query: Search query
             k: Number of chunks to retrieve
+            mode: Retrieval mode (see similarity_search_batch)
             
         Returns:
             List of relevant chunks with metadata
         """
-        # Search using query text - ChromaDB will embed it automatically
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=k
-        )
-        
-        # Format results
-        retrieved_chunks = []
-        for i in range(len(results["ids"][0])):
-            retrieved_chunks.append({
-                "chunk_id": results["ids"][0][i],
-                "text": results["documents"][0][i],
-                "metadata": results["metadatas"][0][i],
-                "distance": results["distances"][0][i] if "distances" in results else None
-            })
-        
-        return retrieved_chunks
+        return self._retrieve(query, k, mode)[0]
     
-    def query_with_rag(self, query: str, k: int = 3) -> Tuple[str, float, List[Dict]]:
+    def query_with_rag(self, query: str, k: int = 3, mode: str = "dense") -> Tuple[str, float, List[Dict]]:
         """
         Answer query using RAG approach.
         
         Args:
             query: Question to answer
             k: Number of chunks to retrieve
+            mode: Retrieval mode: "dense", "bm25", "rrf", or "weighted"
             
         Returns:
             Tuple of (answer, latency, retrieved_chunks)
         """
-        start_time = time.time()
+        result = self.query_with_rag_timed(query, k=k, mode=mode)
+        return result["answer"], result["latency"], result["retrieved_chunks"]
+    
+    def query_with_rag_timed(self, query: str, k: int = 3, mode: str = "dense") -> Dict[str, Any]:
+        """
+        Answer query using RAG approach, timing each stage separately.
+        
+        If retrieval for the query was prefetched, its share of the batched
+        embedding and search time is reported for those stages. Prefetch with
+        k=search_depth(k) when a context budget is set.
         
+        Args:
+            query: Question to answer
+            k: Number of chunks to retrieve (ignored when packing to a context budget)
+            mode: Retrieval mode: "dense", "bm25", "rrf", or "weighted"
+            
+        Returns:
+            dict with answer, latency (sum of all stages), retrieved_chunks,
+            context_tokens, timings (seconds per stage in RAG_STAGES) and usage
+        """
         # Retrieve relevant chunks
-        retrieved_chunks = self.similarity_search(query, k=k)
+        retrieved_chunks, retrieval_timings = self._retrieve(query, self.search_depth(k), mode)
         
-        # Build context from retrieved chunks
-        context_parts = []
-        for i, chunk in enumerate(retrieved_chunks, 1):
-            context_parts.append(f"[Document {i}]\n{chunk['text']}")
+        start_time = time.time()
         
-        context = "\n\n".join(context_parts)
+        # Build context from retrieved chunks
+        if self.context_budget:
+            retrieved_chunks, context, context_tokens = self._pack(retrieved_chunks)
+        else:
+            candidates = self._context_candidates(retrieved_chunks)
+            context = render_context(candidates)
+            context_tokens = sum(candidate["token_count"] for candidate in candidates)
         
         # Build prompt
         prompt = f"""Answer the following question based ONLY on the provided context. Be concise and specific.
@@ -253,24 +591,108 @@ Question: {query}
 
 Answer:"""
         
-        # Query LLM using function-based API
-        response = llm_query(
+        prompt_seconds = time.time() - start_time
+        
+        # Query LLM with streaming so prefill and generation can be told apart
+        response = llm_query_timed(
             prompt=prompt,
             temperature=0.0,
             max_tokens=200
         )
         
-        latency = time.time() - start_time
+        timings = {
+            "embed_query": retrieval_timings["embed_query"],
+            "index_search": retrieval_timings["index_search"],
+            "rerank": retrieval_timings["rerank"],
+            "prompt_assembly": prompt_seconds,
+            "llm_first_token": response["first_token_seconds"],
+            "llm_generation": response["total_seconds"] - response["first_token_seconds"]
+        }
         
-        return response, latency, retrieved_chunks
+        return {
+            "answer": response["text"],
+            "latency": sum(timings.values()),
+            "retrieved_chunks": retrieved_chunks,
+            "context_tokens": context_tokens,
+            "timings": timings,
+            "usage": response["usage"]
+        }
+    
+    def _context_candidates(self, retrieved_chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Resolve retrieved chunks to the spans placed in the prompt.
+        
+        Small-to-big (parent_child) chunks are replaced by their parent span,
+        once per parent; other chunks are used as they are.
+        """
+        candidates = []
+        seen_parents = set()
+        
+        for chunk in retrieved_chunks:
+            stored = self.chunk_lookup[chunk["chunk_id"]]
+            if "parent_id" not in stored:
+                candidates.append(dict(stored, score=chunk["score"]))
+                continue
+            
+            if stored["parent_id"] in seen_parents:
+                continue
+            seen_parents.add(stored["parent_id"])
+            candidates.append({
+                "chunk_id": stored["chunk_id"],
+                "doc_id": stored["doc_id"],
+                "text": stored["parent_text"],
+                "token_count": stored["parent_token_count"],
+                "token_start": stored["parent_token_start"],
+                "token_end": stored["parent_token_end"],
+                "char_start": stored["parent_char_start"],
+                "char_end": stored["parent_char_end"],
+                "score": chunk["score"]
+            })
+        
+        return candidates
+    
+    def _pack(self, retrieved_chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], str, int]:
+        """
+        Pack retrieved chunks into the context budget.
+        
+        Returns:
+            Tuple of (chunks that made it into the context, rendered context, context tokens)
+        """
+        if self._truncate is None:
+            self._truncate = token_truncator(tiktoken.get_encoding("cl100k_base"))
+        
+        candidates = self._context_candidates(retrieved_chunks)
+        packed = pack_context(candidates, self.context_budget, truncate=self._truncate)
+        
+        used_ids = {chunk_id for segment in packed["segments"] for chunk_id in segment["chunk_ids"]}
+        used_chunks = [chunk for chunk in retrieved_chunks if chunk["chunk_id"] in used_ids]
+        return used_chunks, render_context(packed["segments"]), packed["tokens"]
 
 
 class FullContextSystem:
     """System for querying with full document context."""
     
-    def __init__(self):
-        """Initialize full context system."""
+    def __init__(self, context_budget: Optional[int] = None, layout: str = "inline"):
+        """
+        Initialize full context system.
+        
+        Args:
+            context_budget: Optional token budget for the documents. Documents are
+                            kept in corpus order until the budget is full and the
+                            last one is truncated.
+            layout: "inline" puts the documents in the user prompt after the
+                    instruction. "prefix" sends instruction and documents as a
+                    system message that is identical for every question, so the
+                    server can reuse its cached prefix; only the question varies.
+        """
+        if layout not in PROMPT_LAYOUTS:
+            raise ValueError(f"Unknown prompt layout: {layout}. Choose from {list(PROMPT_LAYOUTS)}")
+        
+        self.context_budget = context_budget
+        self.layout = layout
         self.full_context = ""
+        self.context_tokens = 0
+        self.prefix = None
     
     def set_documents(self, documents: List[Dict[str, str]]) -> None:
         """
@@ -286,11 +708,29 @@ class FullContextSystem:
             doc_text = f"[{title}]\n{content}" if title else content
             context_parts.append(doc_text)
         
-        self.full_context = "\n\n".join(context_parts)
-        
         encoding = tiktoken.get_encoding("cl100k_base")
-        token_count = len(encoding.encode(self.full_context))
-        print(f"✓ Full context prepared: {token_count} tokens")
+        
+        if self.context_budget:
+            # Count each document once; earlier documents score higher so corpus order is kept
+            token_counts = [len(tokens) for tokens in encoding.encode_batch(context_parts)]
+            candidates = [
+                {"text": text, "score": -i, "token_count": count}
+                for i, (text, count) in enumerate(zip(context_parts, token_counts))
+            ]
+            packed = pack_context(
+                candidates, self.context_budget, segment_overhead=2, truncate=token_truncator(encoding)
+            )
+            self.full_context = "\n\n".join(segment["text"] for segment in packed["segments"])
+            self.context_tokens = packed["tokens"]
+            print(f"✓ Full context packed: {len(packed['segments'])}/{len(documents)} documents, "
+                  f"{self.context_tokens} tokens (budget {self.context_budget})")
+        else:
+            self.full_context = "\n\n".join(context_parts)
+            self.context_tokens = len(encoding.encode(self.full_context))
+            print(f"✓ Full context prepared: {self.context_tokens} tokens")
+        
+        # Assembled once; every question reuses the same string
+        self.prefix = f"{FULL_CONTEXT_INSTRUCTION}\n\nDocuments:\n{self.full_context}"
     
     def query_with_full_context(self, query: str) -> Tuple[str, float]:
         """
@@ -302,28 +742,59 @@ class FullContextSystem:
         Returns:
             Tuple of (answer, latency)
         """
+        result = self.query_with_full_context_timed(query)
+        return result["answer"], result["latency"]
+    
+    def query_with_full_context_timed(self, query: str) -> Dict[str, Any]:
+        """
+        Answer query using all documents as context, timing each stage separately.
+        
+        Args:
+            query: Question to answer
+            
+        Returns:
+            dict with answer, latency (sum of all stages), timings (seconds per
+            stage in FULL_CONTEXT_STAGES) and usage (cached_tokens reports
+            prompt tokens served from the server-side prefix cache)
+        """
         start_time = time.time()
         
         # Build prompt with full context
-        prompt = f"""Answer the following question based on the provided documents. Be concise and specific.
+        if self.layout == "prefix":
+            system_message = self.prefix
+            prompt = f"""Question: {query}
 
-Documents:
-{self.full_context}
+Answer:"""
+        else:
+            system_message = None
+            prompt = f"""{self.prefix}
 
 Question: {query}
 
 Answer:"""
         
-        # Query LLM using function-based API
-        response = llm_query(
+        prompt_seconds = time.time() - start_time
+        
+        # Query LLM with streaming so prefill and generation can be told apart
+        response = llm_query_timed(
             prompt=prompt,
             temperature=0.0,
-            max_tokens=200
+            max_tokens=200,
+            system_message=system_message
         )
         
-        latency = time.time() - start_time
+        timings = {
+            "prompt_assembly": prompt_seconds,
+            "llm_first_token": response["first_token_seconds"],
+            "llm_generation": response["total_seconds"] - response["first_token_seconds"]
+        }
         
-        return response, latency
+        return {
+            "answer": response["text"],
+            "latency": sum(timings.values()),
+            "timings": timings,
+            "usage": response["usage"]
+        }
 
 
 def evaluate_answer(answer: str, expected: str) -> bool:
@@ -340,51 +811,62 @@ def evaluate_answer(answer: str, expected: str) -> bool:
     return expected.lower() in answer.lower()
 
 
-def compare_modes(
+def summarize_comparison(
     query: str,
     expected_answer: str,
-    rag_system: RAGSystem,
-    full_context_system: FullContextSystem,
-    k: int = 3
+    rag_result: Dict[str, Any],
+    full_result: Dict[str, Any],
+    full_context_tokens: int = None
 ) -> Dict[str, Any]:
     """
-    Compare RAG and Full Context modes for a single query.
+    Score and print one question's RAG and full-context results.
+    
+    The report is printed in one call so output from concurrent questions
+    does not interleave.
     
     Args:
-        query: Question to ask
+        query: Question that was asked
         expected_answer: Expected answer for evaluation
-        rag_system: RAG system instance
-        full_context_system: Full context system instance
-        k: Number of chunks to retrieve for RAG
+        rag_result: Output of RAGSystem.query_with_rag_timed
+        full_result: Output of FullContextSystem.query_with_full_context_timed
+        full_context_tokens: Size of the full-context document block
         
     Returns:
         Dictionary with comparison results
     """
-    print(f"\nQuery: {query}")
-    
-    # RAG mode
-    print("  Running RAG mode...")
-    rag_answer, rag_latency, retrieved_chunks = rag_system.query_with_rag(query, k=k)
+    rag_answer, rag_latency = rag_result["answer"], rag_result["latency"]
+    retrieved_chunks = rag_result["retrieved_chunks"]
     rag_correct = evaluate_answer(rag_answer, expected_answer)
     
-    print(f"    Latency: {rag_latency:.2f}s")
-    print(f"    Correct: {rag_correct}")
-    print(f"    Answer: {rag_answer[:100]}...")
-    
-    # Full Context mode
-    print("  Running Full Context mode...")
-    full_answer, full_latency = full_context_system.query_with_full_context(query)
+    full_answer, full_latency = full_result["answer"], full_result["latency"]
     full_correct = evaluate_answer(full_answer, expected_answer)
     
-    print(f"    Latency: {full_latency:.2f}s")
-    print(f"    Correct: {full_correct}")
-    print(f"    Answer: {full_answer[:100]}...")
+    lines = [f"Query: {query}"]
+    
+    lines.append("  RAG mode:")
+    lines.append(f"    Latency: {rag_latency:.2f}s")
+    lines.append("    Stages:  " + ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in rag_result["timings"].items()))
+    lines.append(f"    Correct: {rag_correct}")
+    lines.append(f"    Answer: {rag_answer[:100]}...")
+    
+    lines.append("  Full Context mode:")
+    lines.append(f"    Latency: {full_latency:.2f}s")
+    lines.append("    Stages:  " + ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in full_result["timings"].items()))
+    if full_result["usage"]:
+        lines.append(f"    Cached:  {full_result['usage']['cached_tokens']}/{full_result['usage']['prompt_tokens']} prompt tokens")
+    lines.append(f"    Correct: {full_correct}")
+    lines.append(f"    Answer: {full_answer[:100]}...")
+    
+    print("\n".join(lines))
     
     return {
         "query": query,
         "expected_answer": expected_answer,
         "rag_answer": rag_answer,
         "rag_latency": rag_latency,
+        "rag_timings": rag_result["timings"],
+        "rag_usage": rag_result["usage"],
+        "rag_context_tokens": rag_result["context_tokens"],
         "rag_correct": rag_correct,
         "rag_retrieved_chunks": [
             {
@@ -396,12 +878,161 @@ def compare_modes(
         ],
         "full_answer": full_answer,
         "full_latency": full_latency,
+        "full_timings": full_result["timings"],
+        "full_usage": full_result["usage"],
+        "full_context_tokens": full_context_tokens,
         "full_correct": full_correct
     }
 
 
-def run_experiment():
-    """Main experiment runner."""
+def compare_modes(
+    query: str,
+    expected_answer: str,
+    rag_system: RAGSystem,
+    full_context_system: FullContextSystem,
+    k: int = 3,
+    retrieval_mode: str = "dense"
+) -> Dict[str, Any]:
+    """
+    Compare RAG and Full Context modes for a single query.
+    
+    Both modes are dispatched concurrently. Each mode's latency is timed
+    inside its own call, so it does not include time spent waiting on the other.
+    
+    Args:
+        query: Question to ask
+        expected_answer: Expected answer for evaluation
+        rag_system: RAG system instance
+        full_context_system: Full context system instance
+        k: Number of chunks to retrieve for RAG
+        retrieval_mode: RAG retrieval mode (see RAGSystem.similarity_search_batch)
+        
+    Returns:
+        Dictionary with comparison results
+    """
+    return compare_modes_batch(
+        [{"question": query, "expected_answer": expected_answer}],
+        rag_system,
+        full_context_system,
+        k=k,
+        retrieval_mode=retrieval_mode,
+        max_workers=2
+    )[0]
+
+
+def compare_modes_batch(
+    questions: List[Dict[str, Any]],
+    rag_system: RAGSystem,
+    full_context_system: FullContextSystem,
+    k: int = 3,
+    retrieval_mode: str = "dense",
+    max_workers: int = 8
+) -> List[Dict[str, Any]]:
+    """
+    Compare both modes for many questions concurrently.
+    
+    Every (question, mode) call is submitted to one thread pool, so the whole
+    evaluation takes roughly as long as its slowest calls rather than the sum
+    of all of them. Per-mode latency is still timed inside each call. Results
+    are printed and returned in question order.
+    
+    Args:
+        questions: Question dictionaries with 'question' and 'expected_answer'
+                   ('id' and 'relevant_doc' are copied into the results if present)
+        rag_system: RAG system instance
+        full_context_system: Full context system instance
+        k: Number of chunks to retrieve for RAG
+        retrieval_mode: RAG retrieval mode (see RAGSystem.similarity_search_batch)
+        max_workers: Concurrent LLM calls; lower it if the deployment rate-limits
+        
+    Returns:
+        List of comparison result dictionaries, one per question
+    """
+    results = []
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            (
+                executor.submit(rag_system.query_with_rag_timed, question["question"], k, retrieval_mode),
+                executor.submit(full_context_system.query_with_full_context_timed, question["question"])
+            )
+            for question in questions
+        ]
+        
+        for i, (question, (rag_future, full_future)) in enumerate(zip(questions, futures), 1):
+            if len(questions) > 1:
+                print(f"\n[{i}/{len(questions)}]")
+            
+            result = summarize_comparison(
+                question["question"],
+                question["expected_answer"],
+                rag_future.result(),
+                full_future.result(),
+                full_context_tokens=full_context_system.context_tokens
+            )
+            
+            if "id" in question:
+                result["question_id"] = question["id"]
+            if "relevant_doc" in question:
+                result["relevant_doc"] = question["relevant_doc"]
+            results.append(result)
+    
+    return results
+
+
+def run_experiment(
+    persist_index: bool = False,
+    index_backend: str = "chroma",
+    embedding_dtype: str = "float32",
+    retrieval_mode: str = "dense",
+    retrieval_only: bool = False,
+    corpus_dir: str = None,
+    corpus_limit: int = None,
+    context_budget: int = None,
+    prompt_layout: str = "inline",
+    max_workers: int = 1,
+    rerank: str = None,
+    chunking: str = "fixed"
+):
+    """
+    Main experiment runner.
+    
+    Args:
+        persist_index: Keep the ChromaDB index in lab3/data/chroma between runs
+                       and only embed chunks that changed (default: rebuild
+                       the index on every run).
+        index_backend: Vector index backend: "chroma", "numpy", or "hnsw".
+                       "numpy" and "hnsw" run without ChromaDB.
+        embedding_dtype: Precision of the on-disk embedding cache in lab3/data/embeddings:
+                         "float32", "float16", or "int8".
+        retrieval_mode: Retriever used for the RAG answers: "dense", "bm25",
+                        "rrf", or "weighted". All modes are benchmarked for
+                        latency and recall after the LLM comparison.
+        retrieval_only: Stop after the retrieval benchmark (recall@k, MRR, nDCG)
+                        without making any LLM calls. See retrieval_eval.py for
+                        sweeps over chunk sizes, overlaps, k and backends.
+        corpus_dir: Load a corpus written by generate_corpus.py instead of
+                    data/documents.json and data/questions.json. Full-context
+                    mode fails once the corpus exceeds the model's context window.
+        corpus_limit: Only use the first corpus_limit documents of corpus_dir
+                      (and the questions about them).
+        context_budget: Optional token budget for the context of both modes.
+                        RAG packs the best of its top candidates into it and
+                        full context keeps documents in order until it is full.
+        prompt_layout: Full-context prompt layout: "inline" (documents inside
+                       each user prompt) or "prefix" (documents in a shared
+                       system message, eligible for prompt caching).
+        max_workers: Number of concurrent LLM calls during evaluation.
+                     Retrieval for all questions is always prefetched in one
+                     batched embed + search call. The default of 1 then makes
+                     the LLM calls serially, so their stage timings are measured
+                     without contention; higher values overlap them, trading
+                     per-stage accuracy for wall time.
+        rerank: Optional rerank backend for RAG: "auto", "cross-encoder" or
+                "lexical". The top 20 candidates are reranked down to k.
+        chunking: Chunking strategy: "fixed", "sentence", "recursive", or
+                  "parent_child" (retrieve small chunks, send their parents).
+    """
     print("=" * 80)
     print("Lab 3: RAG vs Full Context Experiment")
     print("=" * 80)
@@ -411,19 +1042,22 @@ def run_experiment():
     docs_path = os.path.join(data_dir, "documents.json")
     questions_path = os.path.join(data_dir, "questions.json")
     
-    if not os.path.exists(docs_path):
-        print(f"\nError: {docs_path} not found.")
-        print("Run generate_documents.py first to create the dataset.")
-        return
-    
-    with open(docs_path, 'r', encoding='utf-8') as f:
-        docs_data = json.load(f)
-    
-    with open(questions_path, 'r', encoding='utf-8') as f:
-        questions_data = json.load(f)
-    
-    documents = docs_data["documents"]
-    questions = questions_data["questions"]
+    if corpus_dir:
+        documents, questions = load_corpus(corpus_dir, limit=corpus_limit)
+    else:
+        if not os.path.exists(docs_path):
+            print(f"\nError: {docs_path} not found.")
+            print("Run generate_documents.py first to create the dataset.")
+            return
+        
+        with open(docs_path, 'r', encoding='utf-8') as f:
+            docs_data = json.load(f)
+        
+        with open(questions_path, 'r', encoding='utf-8') as f:
+            questions_data = json.load(f)
+        
+        documents = docs_data["documents"]
+        questions = questions_data["questions"]
     
     print(f"\n✓ Loaded {len(documents)} documents")
     print(f"✓ Loaded {len(questions)} evaluation questions")
@@ -431,42 +1065,99 @@ def run_experiment():
     # Setup chunking
     print("\n" + "-" * 80)
     print("Chunking documents...")
-    chunker = DocumentChunker(chunk_size=500, overlap=50)
+    chunker = DocumentChunker(
+        chunk_size=500,
+        overlap=50,
+        store_path=os.path.join(data_dir, "chunk_store.json"),
+        strategy=chunking
+    )
     chunks = chunker.chunk_documents(documents)
     print(f"✓ Created {len(chunks)} chunks from {len(documents)} documents")
+    print(f"  Re-chunked {chunker.last_stats['rechunked']}/{len(documents)} documents (rest from chunk store)")
     
     # Setup RAG system
     print("\n" + "-" * 80)
     print("Setting up RAG system...")
-    rag_system = RAGSystem()
+    base_embedder = Embedder()
+    embedder = CachedEmbedder(
+        base_embedder,
+        EmbeddingStore(os.path.join(data_dir, "embeddings"), base_embedder.model_name, dtype=embedding_dtype)
+    )
+    # Queries bypass the cache, so embed_query is timed on real embedding work
+    base_embedder.embed(["warm-up"])
+    rag_system = RAGSystem(
+        persist_dir=os.path.join(data_dir, "chroma") if persist_index else None,
+        backend=index_backend,
+        embedder=embedder,
+        query_embedder=base_embedder,
+        context_budget=context_budget,
+        reranker=Reranker(backend=rerank) if rerank else None
+    )
     rag_system.add_documents(chunks)
     
     # Setup Full Context system
     print("\n" + "-" * 80)
     print("Setting up Full Context system...")
-    full_context_system = FullContextSystem()
+    full_context_system = FullContextSystem(context_budget=context_budget, layout=prompt_layout)
     full_context_system.set_documents(documents)
     
+    if retrieval_only:
+        # Compare retrievers on latency and recall without any LLM calls
+        print("\n" + "-" * 80)
+        print("Benchmarking retrieval modes...")
+        mode_report = benchmark_retrieval_modes(rag_system, questions, RETRIEVAL_MODES, k=3)
+        print(format_mode_report(mode_report, k=3))
+        
+        embedder.flush()
+        results_dir = os.path.join(os.path.dirname(__file__), "results")
+        os.makedirs(results_dir, exist_ok=True)
+        output_path = os.path.join(results_dir, "retrieval_modes.json")
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "total_questions": len(questions),
+                "total_chunks": len(chunks),
+                "retrieval_k": 3,
+                "index_backend": index_backend,
+                "retrieval_modes": mode_report
+            }, f, indent=2)
+        print(f"\n✓ Retrieval-only results saved to {output_path}")
+        return
+    
     # Run comparisons
     print("\n" + "=" * 80)
     print("Running Comparisons")
     print("=" * 80)
     
-    results = []
-    for i, question in enumerate(questions, 1):
-        print(f"\n[{i}/{len(questions)}]")
-        
-        result = compare_modes(
-            query=question["question"],
-            expected_answer=question["expected_answer"],
-            rag_system=rag_system,
-            full_context_system=full_context_system,
-            k=3
-        )
-        
-        result["question_id"] = question["id"]
-        result["relevant_doc"] = question["relevant_doc"]
-        results.append(result)
+    # Retrieve for every question in one batched embed + index call; each query's
+    # embed_query and index_search report an equal share of the batched stages
+    prefetch_seconds = rag_system.prefetch(
+        [question["question"] for question in questions], k=rag_system.search_depth(3), mode=retrieval_mode
+    )
+    prefetch_timings = rag_system.last_prefetch_timings
+    print(f"\n✓ Prefetched retrieval for {len(questions)} questions in {prefetch_seconds:.3f}s "
+          f"(embed {prefetch_timings['embed_query']:.3f}s, search {prefetch_timings['index_search']:.3f}s)")
+    
+    start_time = time.time()
+    results = compare_modes_batch(
+        questions,
+        rag_system,
+        full_context_system,
+        k=3,
+        retrieval_mode=retrieval_mode,
+        max_workers=max_workers
+    )
+    evaluation_seconds = time.time() - start_time
+    print(f"\n✓ Evaluated {len(questions)} questions in {evaluation_seconds:.2f}s ({max_workers} workers)")
+    
+    # Compare retrievers on latency and recall; this runs after the timed
+    # queries so it cannot warm anything they measure
+    print("\n" + "-" * 80)
+    print("Benchmarking retrieval modes...")
+    mode_report = benchmark_retrieval_modes(rag_system, questions, RETRIEVAL_MODES, k=3)
+    print(format_mode_report(mode_report, k=3))
+    
+    # Keep new chunk embeddings for the next run
+    embedder.flush()
     
     # Save results
     results_dir = os.path.join(os.path.dirname(__file__), "results")
@@ -479,7 +1170,22 @@ def run_experiment():
             "total_chunks": len(chunks),
             "chunk_size": 500,
             "overlap": 50,
-            "retrieval_k": 3
+            "chunking": chunking,
+            "retrieval_k": 3,
+            "index_backend": index_backend,
+            "embedding_dtype": embedding_dtype,
+            "embedding_cache_hits": embedder.hits,
+            "embedding_cache_misses": embedder.misses,
+            "retrieval_prefetch_seconds": prefetch_seconds,
+            "retrieval_prefetch_timings": prefetch_timings,
+            "retrieval_mode": retrieval_mode,
+            "retrieval_modes": mode_report,
+            "corpus_dir": corpus_dir,
+            "context_budget": context_budget,
+            "prompt_layout": prompt_layout,
+            "max_workers": max_workers,
+            "evaluation_seconds": evaluation_seconds,
+            "reranker": rag_system.reranker.model_name if rag_system.reranker else None
         },
         "results": results
     }
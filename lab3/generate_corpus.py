@@ -0,0 +1,423 @@
+"""
+Generate large synthetic corpora for Lab 3 scaling experiments.
+
+generate_documents.py writes ~20 hand-written documents, which is too small to
+show how chunking, embedding, retrieval or full-context prompting scale. This
+script composes corpora of any size (10K-1M documents) from:
+
+- the hand-written base documents and their questions
+- fact documents: a fact template instantiated for a unique synthetic entity,
+  padded with number-free sentences from base documents of the same category
+- distractor documents: either the same entity with unrelated details (a
+  lexical hard negative) or a base document with perturbed numbers labelled
+  as superseded guidance
+
+Every fact document can carry an auto-generated question whose expected answer
+appears only in that document. Documents and questions are streamed to JSONL,
+so memory stays flat regardless of corpus size, and output depends only on the
+seed and parameters.
+
+Distractors and questions are spread evenly through the stream, so any prefix
+of a large corpus is itself a valid smaller corpus (see load_corpus(limit=...)).
+
+Usage:
+    python generate_corpus.py --num-documents 100000 --num-questions 200 --seed 42
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Allow running as a script from the lab3 directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lab3.generate_documents import generate_all_documents, generate_evaluation_questions
+
+
+SYLLABLES = [
+    "ba", "co", "da", "fe", "gi", "ka", "lo", "mi", "na", "pe", "qu", "ra",
+    "so", "ta", "vi", "xe", "yo", "za", "lu", "mo"
+]
+
+NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+
+
+def entity_name(index: int, min_syllables: int = 3) -> str:
+    """
+    Build a unique pronounceable name for an entity index.
+
+    The index is written in base len(SYLLABLES), so distinct indexes always
+    produce distinct names.
+    """
+    parts = []
+    while index or len(parts) < min_syllables:
+        index, digit = divmod(index, len(SYLLABLES))
+        parts.append(SYLLABLES[digit])
+    return "".join(reversed(parts)).capitalize()
+
+
+# Each fact template defines one answerable fact plus an unrelated detail used
+# by entity distractors. `values` draws the template fields from the seeded RNG.
+FACT_TEMPLATES: List[Dict[str, Any]] = [
+    {
+        "category": "health",
+        "title": "{name}ex Dosage Guidelines",
+        "fact": "{name}ex is prescribed for {condition}. The standard adult dose of {name}ex is {dose} mg taken {times} times daily.",
+        "question": "What is the standard adult dose of {name}ex?",
+        "answer": "{dose} mg",
+        "detail": "{name}ex is manufactured in tablet form and should be stored below 25 degrees Celsius, away from direct light.",
+        "values": lambda rng: {
+            "condition": rng.choice(["hypertension", "migraine", "seasonal allergies", "acid reflux", "insomnia"]),
+            "dose": rng.randrange(5, 1000, 5),
+            "times": rng.randint(1, 4)
+        }
+    },
+    {
+        "category": "health",
+        "title": "{name} Syndrome Overview",
+        "fact": "{name} syndrome is a rare {system} disorder. Its average incubation period is {days} days, and it affects roughly {rate} in 100,000 people.",
+        "question": "What is the average incubation period of {name} syndrome?",
+        "answer": "{days} days",
+        "detail": "{name} syndrome was named after the clinic where it was first documented and is studied by several research hospitals.",
+        "values": lambda rng: {
+            "system": rng.choice(["respiratory", "neurological", "digestive", "skin", "immune"]),
+            "days": rng.randint(2, 60),
+            "rate": rng.randint(1, 50)
+        }
+    },
+    {
+        "category": "law",
+        "title": "The {name} Tenancy Act",
+        "fact": "Under the {name} Tenancy Act, a landlord must return a security deposit within {days} days of the lease ending. Late returns incur a penalty of {penalty} times the deposit.",
+        "question": "Within how many days must a landlord return a security deposit under the {name} Tenancy Act?",
+        "answer": "{days} days",
+        "detail": "The {name} Tenancy Act was debated over several legislative sessions and is frequently cited in housing court.",
+        "values": lambda rng: {
+            "days": rng.randint(7, 90),
+            "penalty": rng.randint(2, 4)
+        }
+    },
+    {
+        "category": "law",
+        "title": "{name} Filing Requirements",
+        "fact": "A claim under the {name} Commerce Code must be filed within {months} months of the disputed transaction. Claims above ${threshold} require a sworn affidavit.",
+        "question": "Within how many months must a claim under the {name} Commerce Code be filed?",
+        "answer": "{months} months",
+        "detail": "The {name} Commerce Code is published by the state legislature and is available in most law libraries.",
+        "values": lambda rng: {
+            "months": rng.randint(3, 48),
+            "threshold": rng.randrange(1000, 100000, 500)
+        }
+    },
+    {
+        "category": "technology",
+        "title": "{name}DB Configuration",
+        "fact": "{name}DB is a {kind} database. By default {name}DB listens on port {port} and keeps {replicas} replicas of every shard.",
+        "question": "On which port does {name}DB listen by default?",
+        "answer": "{port}",
+        "detail": "{name}DB has an active open source community and publishes release notes for every version.",
+        "values": lambda rng: {
+            "kind": rng.choice(["document", "key-value", "time-series", "graph", "columnar"]),
+            "port": rng.randint(1024, 65535),
+            "replicas": rng.randint(2, 7)
+        }
+    },
+    {
+        "category": "technology",
+        "title": "The {name} Protocol",
+        "fact": "The {name} protocol is used for {purpose}. It uses a maximum frame size of {frame} bytes and a handshake timeout of {timeout} seconds.",
+        "question": "What is the maximum frame size of the {name} protocol?",
+        "answer": "{frame} bytes",
+        "detail": "The {name} protocol is described in a public specification maintained by a working group of network engineers.",
+        "values": lambda rng: {
+            "purpose": rng.choice(["message queuing", "file synchronization", "service discovery", "telemetry", "remote procedure calls"]),
+            "frame": rng.randrange(512, 1048576, 512),
+            "timeout": rng.randint(1, 120)
+        }
+    },
+]
+
+
+def filler_sentences_by_category(documents: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    Collect number-free sentences from base documents, grouped by category.
+
+    Sentences with numbers are skipped so padding never contradicts a fact.
+    """
+    fillers: Dict[str, List[str]] = {}
+    for doc in documents:
+        for sentence in re.split(r"(?<=\.)\s+", doc["content"]):
+            if sentence and not NUMBER_PATTERN.search(sentence):
+                fillers.setdefault(doc["category"], []).append(sentence)
+    return fillers
+
+
+def perturb_numbers(text: str, rng: random.Random) -> str:
+    """Replace every number in text with a nearby but different value."""
+    def replace(match: re.Match) -> str:
+        value = float(match.group())
+        factor = rng.choice([0.5, 0.75, 1.25, 1.5, 2.0])
+        if "." in match.group():
+            return f"{value * factor:.2f}"
+        return str(max(int(round(value * factor)), int(value) + 1))
+    return NUMBER_PATTERN.sub(replace, text)
+
+
+def is_spread_slot(index: int, count: int, total: int) -> bool:
+    """
+    Whether position `index` of `total` is one of `count` evenly spaced slots.
+
+    Used instead of random sampling so selection needs no memory and every
+    prefix of the stream keeps the same proportions.
+    """
+    if total <= 0:
+        return False
+    return (index + 1) * count // total > index * count // total
+
+
+def iter_corpus(
+    num_documents: int,
+    num_questions: int = 100,
+    seed: int = 42,
+    distractor_ratio: float = 0.3,
+    filler_sentences: int = 3,
+    include_base: bool = True
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream a synthetic corpus.
+
+    Args:
+        num_documents: Total number of documents, including base documents
+        num_questions: Number of generated questions (base questions are added on top)
+        seed: Random seed; identical arguments always yield identical output
+        distractor_ratio: Fraction of generated documents that are distractors
+        filler_sentences: Number-free base sentences appended to each fact document
+        include_base: Start with the hand-written documents and questions
+
+    Yields:
+        ("document", document) and ("question", question) pairs. A question is
+        yielded right after the document it refers to.
+    """
+    rng = random.Random(seed)
+    base_documents = generate_all_documents()
+    fillers = filler_sentences_by_category(base_documents)
+
+    if include_base:
+        base_documents = base_documents[:num_documents]
+        for doc in base_documents:
+            yield "document", dict(doc, kind="base")
+        base_ids = {doc["id"] for doc in base_documents}
+        for question in generate_evaluation_questions():
+            if question["relevant_doc"] in base_ids:
+                yield "question", question
+    else:
+        base_documents = []
+
+    num_generated = num_documents - len(base_documents)
+    num_distractors = int(round(num_generated * distractor_ratio))
+    num_facts = num_generated - num_distractors
+    num_questions = min(num_questions, num_facts)
+
+    fact_index = 0
+    for slot in range(num_generated):
+        if is_spread_slot(slot, num_distractors, num_generated):
+            yield "document", _distractor_document(slot, fact_index, rng, base_documents)
+            continue
+
+        template = FACT_TEMPLATES[fact_index % len(FACT_TEMPLATES)]
+        fields = dict(template["values"](rng), name=entity_name(fact_index))
+        doc_id = f"{template['category']}_syn_{fact_index:07d}"
+
+        sentences = [template["fact"].format(**fields)]
+        pool = fillers.get(template["category"], [])
+        if pool and filler_sentences:
+            sentences += rng.sample(pool, min(filler_sentences, len(pool)))
+
+        yield "document", {
+            "id": doc_id,
+            "title": template["title"].format(**fields),
+            "content": " ".join(sentences),
+            "category": template["category"],
+            "kind": "fact"
+        }
+
+        if is_spread_slot(fact_index, num_questions, num_facts):
+            yield "question", {
+                "id": f"syn_q{fact_index:07d}",
+                "question": template["question"].format(**fields),
+                "expected_answer": template["answer"].format(**fields),
+                "relevant_doc": doc_id
+            }
+
+        fact_index += 1
+
+
+def _distractor_document(slot: int, facts_so_far: int, rng: random.Random,
+                         base_documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build an entity distractor for an earlier fact, or a superseded base document."""
+    if facts_so_far and (not base_documents or rng.random() < 0.5):
+        target = rng.randrange(facts_so_far)
+        template = FACT_TEMPLATES[target % len(FACT_TEMPLATES)]
+        name = entity_name(target)
+        return {
+            "id": f"{template['category']}_dis_{slot:07d}",
+            "title": f"{template['title'].format(name=name)} - Background",
+            "content": template["detail"].format(name=name),
+            "category": template["category"],
+            "kind": "distractor"
+        }
+
+    if not base_documents:
+        template = FACT_TEMPLATES[slot % len(FACT_TEMPLATES)]
+        return {
+            "id": f"{template['category']}_dis_{slot:07d}",
+            "title": f"{template['category'].capitalize()} Notes",
+            "content": " ".join(rng.sample(SYLLABLES, 8)),
+            "category": template["category"],
+            "kind": "distractor"
+        }
+
+    source = rng.choice(base_documents)
+    return {
+        "id": f"{source['category']}_dis_{slot:07d}",
+        "title": f"{source['title']} (Superseded Guidance)",
+        "content": "The figures below come from an outdated edition and no longer apply. "
+                   + perturb_numbers(source["content"], rng),
+        "category": source["category"],
+        "kind": "distractor"
+    }
+
+
+def generate_corpus(
+    output_dir: str,
+    num_documents: int,
+    num_questions: int = 100,
+    seed: int = 42,
+    distractor_ratio: float = 0.3,
+    filler_sentences: int = 3,
+    include_base: bool = True,
+    progress_every: int = 100000
+) -> Dict[str, Any]:
+    """
+    Write a synthetic corpus to output_dir as documents.jsonl and questions.jsonl.
+
+    Args:
+        output_dir: Directory to write into (created if missing)
+        num_documents: Total number of documents
+        num_questions: Number of generated questions
+        seed: Random seed
+        distractor_ratio: Fraction of generated documents that are distractors
+        filler_sentences: Padding sentences per fact document
+        include_base: Include the hand-written documents and questions
+        progress_every: Print progress every this many documents (0 disables)
+
+    Returns:
+        Manifest with the parameters and per-kind document counts (also saved as manifest.json)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    counts = {"base": 0, "fact": 0, "distractor": 0}
+    total_questions = 0
+
+    with open(os.path.join(output_dir, "documents.jsonl"), 'w', encoding='utf-8') as docs_file, \
+            open(os.path.join(output_dir, "questions.jsonl"), 'w', encoding='utf-8') as questions_file:
+        for record_type, record in iter_corpus(
+            num_documents, num_questions, seed, distractor_ratio, filler_sentences, include_base
+        ):
+            if record_type == "document":
+                docs_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                counts[record["kind"]] += 1
+                written = sum(counts.values())
+                if progress_every and written % progress_every == 0:
+                    print(f"  {written:,}/{num_documents:,} documents")
+            else:
+                questions_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                total_questions += 1
+
+    manifest = {
+        "seed": seed,
+        "num_documents": sum(counts.values()),
+        "num_questions": total_questions,
+        "distractor_ratio": distractor_ratio,
+        "filler_sentences": filler_sentences,
+        "include_base": include_base,
+        "documents_by_kind": counts
+    }
+    with open(os.path.join(output_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield one record per non-empty line of a JSONL file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_corpus(corpus_dir: str, limit: Optional[int] = None
+                ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Load a generated corpus, optionally only its first `limit` documents.
+
+    Questions whose relevant document falls outside the loaded prefix are dropped.
+
+    Returns:
+        Tuple of (documents, questions)
+    """
+    documents = []
+    for doc in iter_jsonl(os.path.join(corpus_dir, "documents.jsonl")):
+        if limit is not None and len(documents) >= limit:
+            break
+        documents.append(doc)
+
+    doc_ids = {doc["id"] for doc in documents}
+    questions = [
+        question for question in iter_jsonl(os.path.join(corpus_dir, "questions.jsonl"))
+        if question["relevant_doc"] in doc_ids
+    ]
+    return documents, questions
+
+
+def main():
+    """Generate a corpus from the command line."""
+    parser = argparse.ArgumentParser(description="Generate a large synthetic Lab 3 corpus")
+    parser.add_argument("--num-documents", type=int, default=10000)
+    parser.add_argument("--num-questions", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--distractor-ratio", type=float, default=0.3)
+    parser.add_argument("--filler-sentences", type=int, default=3)
+    parser.add_argument("--no-base", action="store_true", help="Skip the hand-written documents")
+    parser.add_argument("--output-dir", default=None,
+                        help="Defaults to lab3/data/corpus_<num-documents>")
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "data", f"corpus_{args.num_documents}"
+    )
+
+    print(f"Generating {args.num_documents:,} documents (seed {args.seed})...")
+    manifest = generate_corpus(
+        output_dir,
+        num_documents=args.num_documents,
+        num_questions=args.num_questions,
+        seed=args.seed,
+        distractor_ratio=args.distractor_ratio,
+        filler_sentences=args.filler_sentences,
+        include_base=not args.no_base
+    )
+
+    print(f"✓ Generated {manifest['num_documents']:,} documents")
+    for kind, count in manifest["documents_by_kind"].items():
+        print(f"  - {kind.capitalize()}: {count:,}")
+    print(f"✓ Generated {manifest['num_questions']} questions")
+    print(f"✓ Saved to {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Second-stage reranking for Lab 3 retrieval.
+
+RAGSystem can retrieve a wide candidate set cheaply (bi-encoder / BM25) and
+let a Reranker reorder it before the top k go to the LLM. The reranker scores
+every (query, chunk) pair jointly:
+
+- "cross-encoder": a local sentence-transformers CrossEncoder (CPU is fine
+  for a few hundred pairs); all pairs of a batch of queries go through one
+  predict call
+- "lexical": query-term and bigram overlap, used when no model is installed
+"""
+
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from lab3.bm25 import tokenize
+
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:
+    CrossEncoder = None
+
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+RERANK_BACKENDS = ("auto", "cross-encoder", "lexical")
+
+
+def lexical_overlap_scores(query: str, passages: Sequence[str]) -> np.ndarray:
+    """
+    Score passages by how much of the query they cover.
+
+    Score = fraction of query terms present + 0.5 * fraction of query bigrams
+    present, so passages that repeat the query's phrasing rank first.
+    """
+    terms = tokenize(query)
+    unique_terms = set(terms)
+    bigrams = set(zip(terms, terms[1:]))
+    scores = np.zeros(len(passages), dtype=np.float32)
+
+    if not unique_terms:
+        return scores
+
+    for i, passage in enumerate(passages):
+        passage_terms = tokenize(passage)
+        scores[i] = len(unique_terms.intersection(passage_terms)) / len(unique_terms)
+        if bigrams:
+            passage_bigrams = set(zip(passage_terms, passage_terms[1:]))
+            scores[i] += 0.5 * len(bigrams & passage_bigrams) / len(bigrams)
+
+    return scores
+
+
+class Reranker:
+    """Reorders retrieved chunks by a joint query-passage relevance score."""
+
+    def __init__(self, model_name: str = DEFAULT_RERANK_MODEL, backend: str = "auto", batch_size: int = 64):
+        """
+        Initialize reranker.
+
+        Args:
+            model_name: sentence-transformers CrossEncoder model name
+            backend: "cross-encoder", "lexical", or "auto" (cross-encoder if
+                     sentence-transformers is installed, otherwise lexical)
+            batch_size: Pairs per cross-encoder forward pass
+        """
+        if backend not in RERANK_BACKENDS:
+            raise ValueError(f"Unknown rerank backend: {backend}. Choose from {list(RERANK_BACKENDS)}")
+
+        if backend == "auto":
+            backend = "cross-encoder" if CrossEncoder is not None else "lexical"
+
+        self.model_name = model_name if backend == "cross-encoder" else "lexical-overlap"
+        self.backend = backend
+        self.batch_size = batch_size
+        self._model = None
+
+        if backend == "cross-encoder":
+            if CrossEncoder is None:
+                raise ImportError(
+                    "sentence-transformers is required for cross-encoder reranking. "
+                    "Please run: pip install sentence-transformers"
+                )
+            self._model = CrossEncoder(model_name, device="cpu")
+
+    def score_batch(self, queries: Sequence[str], passages: Sequence[Sequence[str]]) -> List[np.ndarray]:
+        """
+        Score each query's candidate passages.
+
+        Args:
+            queries: Query strings
+            passages: Candidate passages per query
+
+        Returns:
+            One float32 score array per query, aligned with its passages
+        """
+        if self.backend == "lexical":
+            return [lexical_overlap_scores(query, texts) for query, texts in zip(queries, passages)]
+
+        pairs = [(query, text) for query, texts in zip(queries, passages) for text in texts]
+        if not pairs:
+            return [np.zeros(0, dtype=np.float32) for _ in queries]
+
+        flat_scores = np.asarray(
+            self._model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False),
+            dtype=np.float32
+        )
+
+        scores, offset = [], 0
+        for texts in passages:
+            scores.append(flat_scores[offset:offset + len(texts)])
+            offset += len(texts)
+        return scores
+
+    def rerank_batch(self, queries: Sequence[str], candidates: Sequence[List[Dict[str, Any]]],
+                     k: int) -> List[List[Dict[str, Any]]]:
+        """
+        Rerank retrieved chunks and keep the top k per query.
+
+        Args:
+            queries: Query strings
+            candidates: Retrieved chunk dicts (with "text" and "score") per query
+            k: Number of chunks to keep per query
+
+        Returns:
+            Reranked chunk dicts per query. "score" holds the rerank score and
+            "retrieval_score" the first-stage score.
+        """
+        scores = self.score_batch(queries, [[chunk["text"] for chunk in chunks] for chunks in candidates])
+        results = []
+
+        for chunks, chunk_scores in zip(candidates, scores):
+            # Stable sort keeps first-stage order among ties (common for lexical scores)
+            order = np.argsort(-chunk_scores, kind="stable")[:k]
+            results.append([
+                dict(chunks[i], score=float(chunk_scores[i]), retrieval_score=chunks[i]["score"])
+                for i in order
+            ])
+
+        return results
@@ -0,0 +1,318 @@
+"""
+Retrieval-only evaluation for Lab 3.
+
+Scores retrieved chunks against each question's `relevant_doc` without
+calling the LLM, so the retrieval stack (chunk size, overlap, k, index
+backend, retrieval mode) can be tuned in seconds.
+
+Metrics use the rank of the first retrieved chunk from the relevant document:
+- recall@k: relevant document appears in the top k
+- MRR@k:    mean of 1 / rank (0 if not in the top k)
+- nDCG@k:   mean of 1 / log2(rank + 1) (single relevant document, so IDCG = 1)
+
+Usage:
+    python retrieval_eval.py --chunk-sizes 100 250 500 --overlaps 0 50 --k 1 3 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from itertools import product
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+# Allow running as a script from the lab3 directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def retrieved_doc_ids(retrieved_chunks: List[Dict[str, Any]]) -> List[str]:
+    """Return the document id of each retrieved chunk, in rank order."""
+    return [chunk["metadata"]["doc_id"] for chunk in retrieved_chunks]
+
+
+def first_relevant_ranks(rankings: Sequence[Sequence[str]], relevant_docs: Sequence[str]) -> np.ndarray:
+    """
+    Find the 1-based rank of the first relevant item per query.
+
+    Args:
+        rankings: Retrieved document ids per query
+        relevant_docs: Relevant document id per query
+
+    Returns:
+        Integer array with one rank per query (0 if the relevant document was not retrieved)
+    """
+    ranks = np.zeros(len(relevant_docs), dtype=np.int64)
+    for i, (ranking, relevant) in enumerate(zip(rankings, relevant_docs)):
+        for rank, doc_id in enumerate(ranking, 1):
+            if doc_id == relevant:
+                ranks[i] = rank
+                break
+    return ranks
+
+
+def ranking_metrics(ranks: np.ndarray, k_values: Sequence[int]) -> Dict[int, Dict[str, float]]:
+    """
+    Compute recall@k, MRR@k and nDCG@k for several k at once.
+
+    Args:
+        ranks: Output of first_relevant_ranks
+        k_values: Cutoffs to evaluate
+
+    Returns:
+        Mapping of k -> {"recall", "mrr", "ndcg"}
+    """
+    ranks = np.asarray(ranks)
+    if ranks.size == 0:
+        return {k: {"recall": 0.0, "mrr": 0.0, "ndcg": 0.0} for k in k_values}
+
+    cutoffs = np.asarray(k_values)[:, None]
+    hits = (ranks > 0) & (ranks <= cutoffs)
+    safe_ranks = np.maximum(ranks, 1)
+
+    recall = hits.mean(axis=1)
+    mrr = np.where(hits, 1.0 / safe_ranks, 0.0).mean(axis=1)
+    ndcg = np.where(hits, 1.0 / np.log2(safe_ranks + 1), 0.0).mean(axis=1)
+
+    return {
+        int(k): {"recall": float(recall[i]), "mrr": float(mrr[i]), "ndcg": float(ndcg[i])}
+        for i, k in enumerate(k_values)
+    }
+
+
+def recall_at_k(rankings: Sequence[Sequence[str]], relevant_docs: Sequence[str]) -> float:
+    """
+    Fraction of queries whose relevant document appears in the retrieved list.
+
+    Args:
+        rankings: Retrieved document ids per query
+        relevant_docs: Relevant document id per query
+
+    Returns:
+        Recall between 0.0 and 1.0
+    """
+    if not relevant_docs:
+        return 0.0
+    return float((first_relevant_ranks(rankings, relevant_docs) > 0).mean())
+
+
+def benchmark_retrieval_modes(rag_system, questions: List[Dict[str, Any]], modes: Sequence[str],
+                              k: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    Time and score each retrieval mode on a question set.
+
+    Each mode retrieves for all questions with one batched call.
+
+    Args:
+        rag_system: RAGSystem with documents already added
+        questions: Question dictionaries with 'question' and 'relevant_doc'
+        modes: Retrieval modes to compare
+        k: Number of chunks retrieved per question
+
+    Returns:
+        Mapping of mode -> {"recall_at_k", "mrr", "ndcg", "total_seconds", "avg_latency_ms"}
+    """
+    queries = [question["question"] for question in questions]
+    relevant_docs = [question["relevant_doc"] for question in questions]
+    report = {}
+
+    for mode in modes:
+        start_time = time.time()
+        results = rag_system.similarity_search_batch(queries, k=k, mode=mode)
+        elapsed = time.time() - start_time
+
+        ranks = first_relevant_ranks([retrieved_doc_ids(chunks) for chunks in results], relevant_docs)
+        metrics = ranking_metrics(ranks, [k])[k]
+
+        report[mode] = {
+            "recall_at_k": metrics["recall"],
+            "mrr": metrics["mrr"],
+            "ndcg": metrics["ndcg"],
+            "total_seconds": elapsed,
+            "avg_latency_ms": elapsed / max(len(queries), 1) * 1000
+        }
+
+    return report
+
+
+def format_mode_report(report: Dict[str, Dict[str, float]], k: int) -> str:
+    """Render a benchmark_retrieval_modes report as a text table."""
+    lines = [
+        f"{'Mode':<12} {f'Recall@{k}':<12} {f'MRR@{k}':<10} {f'nDCG@{k}':<10} {'Avg Latency':<14}",
+        "-" * 62
+    ]
+    for mode, stats in report.items():
+        lines.append(
+            f"{mode:<12} {stats['recall_at_k']*100:>6.1f}%{'':<5} "
+            f"{stats['mrr']:>6.3f}{'':<4} {stats['ndcg']:>6.3f}{'':<4} "
+            f"{stats['avg_latency_ms']:>8.2f} ms"
+        )
+    return "\n".join(lines)
+
+
+def sweep_retrieval(
+    documents: List[Dict[str, Any]],
+    questions: List[Dict[str, Any]],
+    embedder,
+    chunk_sizes: Sequence[int] = (100, 250, 500),
+    overlaps: Sequence[int] = (0, 50),
+    k_values: Sequence[int] = (1, 3, 5, 10),
+    backends: Sequence[str] = ("numpy",),
+    modes: Sequence[str] = ("dense", "bm25", "rrf", "weighted"),
+    store_dir: str = None,
+    reranker=None,
+    strategies: Sequence[str] = ("fixed",)
+) -> List[Dict[str, Any]]:
+    """
+    Evaluate retrieval over a grid of configurations without any LLM calls.
+
+    Each (strategy, chunk size, overlap, backend, mode) cell runs one batched search at
+    the largest k; metrics for every smaller k are derived from the same ranks.
+
+    Args:
+        documents: Corpus documents
+        questions: Question dictionaries with 'question' and 'relevant_doc'
+        embedder: Embedder (ideally a CachedEmbedder, so repeated chunks are free)
+        chunk_sizes: Chunk sizes in tokens
+        overlaps: Overlaps in tokens (combinations with overlap >= chunk size are skipped)
+        k_values: Retrieval cutoffs
+        backends: Vector index backends
+        modes: Retrieval modes
+        store_dir: Optional directory for chunk stores
+        reranker: Optional Reranker applied on top of every mode
+        strategies: Chunking strategies (see lab3/chunking.py)
+
+    Returns:
+        One row per (chunking, chunk_size, overlap, backend, mode, k)
+    """
+    from lab3.experiment import DocumentChunker, RAGSystem
+
+    queries = [question["question"] for question in questions]
+    relevant_docs = [question["relevant_doc"] for question in questions]
+    max_k = max(k_values)
+    rows = []
+
+    for strategy, chunk_size, overlap in product(strategies, chunk_sizes, overlaps):
+        if overlap >= chunk_size:
+            continue
+
+        store_path = os.path.join(store_dir, "chunk_store.json") if store_dir else None
+        chunker = DocumentChunker(
+            chunk_size=chunk_size, overlap=overlap, store_path=store_path, strategy=strategy
+        )
+        chunks = chunker.chunk_documents(documents)
+
+        for backend in backends:
+            rag_system = RAGSystem(backend=backend, embedder=embedder, reranker=reranker)
+            rag_system.add_documents(chunks)
+
+            for mode in modes:
+                start_time = time.time()
+                results = rag_system.similarity_search_batch(queries, k=max_k, mode=mode)
+                elapsed = time.time() - start_time
+
+                ranks = first_relevant_ranks(
+                    [retrieved_doc_ids(chunks_for_query) for chunks_for_query in results],
+                    relevant_docs
+                )
+
+                for k, metrics in ranking_metrics(ranks, k_values).items():
+                    rows.append({
+                        "chunking": strategy,
+                        "chunk_size": chunk_size,
+                        "overlap": overlap,
+                        "num_chunks": len(chunks),
+                        "backend": backend,
+                        "mode": mode,
+                        "reranker": reranker.model_name if reranker else None,
+                        "k": k,
+                        "recall": metrics["recall"],
+                        "mrr": metrics["mrr"],
+                        "ndcg": metrics["ndcg"],
+                        "avg_latency_ms": elapsed / max(len(queries), 1) * 1000
+                    })
+
+    return rows
+
+
+def main():
+    """Run a retrieval sweep on the Lab 3 dataset and save the results."""
+    import pandas as pd
+    from lab3.embedding_store import CachedEmbedder, EmbeddingStore
+    from lab3.embeddings import Embedder
+    from lab3.generate_corpus import load_corpus
+    from lab3.reranker import Reranker
+
+    parser = argparse.ArgumentParser(description="Lab 3 retrieval-only benchmark (no LLM calls)")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[100, 250, 500])
+    parser.add_argument("--overlaps", type=int, nargs="+", default=[0, 50])
+    parser.add_argument("--chunking", nargs="+", default=["fixed"],
+                        help="Chunking strategies: fixed, sentence, recursive, parent_child")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--backends", nargs="+", default=["numpy"])
+    parser.add_argument("--modes", nargs="+", default=["dense", "bm25", "rrf", "weighted"])
+    parser.add_argument("--embedding-dtype", default="float32")
+    parser.add_argument("--corpus-dir", default=None,
+                        help="Corpus written by generate_corpus.py (default: data/documents.json)")
+    parser.add_argument("--corpus-limit", type=int, default=None,
+                        help="Only use the first N documents of --corpus-dir")
+    parser.add_argument("--rerank", choices=["auto", "cross-encoder", "lexical"], default=None,
+                        help="Rerank the top 20 candidates of every mode")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("Lab 3: Retrieval-Only Benchmark")
+    print("=" * 80)
+
+    lab3_dir = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.join(lab3_dir, "data")
+
+    if args.corpus_dir:
+        documents, questions = load_corpus(args.corpus_dir, limit=args.corpus_limit)
+    else:
+        with open(os.path.join(data_dir, "documents.json"), 'r', encoding='utf-8') as f:
+            documents = json.load(f)["documents"]
+        with open(os.path.join(data_dir, "questions.json"), 'r', encoding='utf-8') as f:
+            questions = json.load(f)["questions"]
+
+    base_embedder = Embedder()
+    embedder = CachedEmbedder(
+        base_embedder,
+        EmbeddingStore(os.path.join(data_dir, "embeddings"), base_embedder.model_name, dtype=args.embedding_dtype)
+    )
+
+    rows = sweep_retrieval(
+        documents,
+        questions,
+        embedder,
+        chunk_sizes=args.chunk_sizes,
+        overlaps=args.overlaps,
+        k_values=args.k,
+        backends=args.backends,
+        modes=args.modes,
+        store_dir=data_dir,
+        reranker=Reranker(backend=args.rerank) if args.rerank else None,
+        strategies=args.chunking
+    )
+    embedder.flush()
+
+    results_dir = os.path.join(lab3_dir, "results")
+    os.makedirs(results_dir, exist_ok=True)
+    output_path = os.path.join(results_dir, "retrieval_benchmark.json")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "total_questions": len(questions),
+            "total_documents": len(documents),
+            "corpus_dir": args.corpus_dir,
+            "rows": rows
+        }, f, indent=2)
+
+    df = pd.DataFrame(rows)
+    print("\n" + df.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    print(f"\n✓ Results saved to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
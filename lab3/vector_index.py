@@ -0,0 +1,349 @@
+"""
+Vector index backends for Lab 3.
+
+All backends implement the same small VectorIndex interface, so RAGSystem can
+switch between them and retrieval latency/recall can be compared across
+index types:
+
+- NumpyIndex: exact brute-force search over a normalized float32 matrix
+- HNSWIndex: approximate nearest-neighbour search (requires hnswlib)
+- ChromaIndex: ChromaDB collection, optionally persisted to disk (requires chromadb)
+
+Scores are cosine similarities (higher is more similar).
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+try:
+    import chromadb
+    from chromadb.config import Settings
+except ImportError:
+    chromadb = None
+
+
+SearchResults = List[List[Tuple[str, float]]]
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Return float32 copies of vectors scaled to unit L2 norm."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorIndex:
+    """Interface shared by all vector index backends."""
+
+    name = "base"
+
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray, hashes: Sequence[str]) -> None:
+        """
+        Insert or replace vectors.
+
+        Args:
+            ids: Unique identifier per vector
+            vectors: Array of shape (len(ids), dim)
+            hashes: Content hash per vector, used to skip unchanged items
+        """
+        raise NotImplementedError
+
+    def delete(self, ids: Sequence[str]) -> None:
+        """Remove vectors by id."""
+        raise NotImplementedError
+
+    def stored_hashes(self) -> Dict[str, str]:
+        """Return a mapping of stored id -> content hash."""
+        raise NotImplementedError
+
+    def search(self, query_vectors: np.ndarray, k: int) -> SearchResults:
+        """
+        Find the k nearest stored vectors for each query.
+
+        Args:
+            query_vectors: Array of shape (num_queries, dim)
+            k: Number of neighbours per query
+
+        Returns:
+            One list of (id, score) pairs per query, best first
+        """
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class NumpyIndex(VectorIndex):
+    """Exact search with a single matrix product over normalized float32 vectors."""
+
+    name = "numpy"
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.id_to_row: Dict[str, int] = {}
+        self.hashes: Dict[str, str] = {}
+        self.matrix: Optional[np.ndarray] = None
+
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray, hashes: Sequence[str]) -> None:
+        vectors = normalize_rows(vectors)
+        if self.matrix is None:
+            self.matrix = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+
+        new_rows = []
+        for item_id, vector, item_hash in zip(ids, vectors, hashes):
+            row = self.id_to_row.get(item_id)
+            if row is None:
+                self.id_to_row[item_id] = len(self.ids)
+                self.ids.append(item_id)
+                new_rows.append(vector)
+            elif row >= len(self.matrix):
+                # Repeated within this batch: replace the pending row
+                new_rows[row - len(self.matrix)] = vector
+            else:
+                self.matrix[row] = vector
+            self.hashes[item_id] = item_hash
+
+        if new_rows:
+            self.matrix = np.vstack([self.matrix, np.stack(new_rows)])
+
+    def delete(self, ids: Sequence[str]) -> None:
+        remove = {item_id for item_id in ids if item_id in self.id_to_row}
+        if not remove:
+            return
+
+        keep = [row for row, item_id in enumerate(self.ids) if item_id not in remove]
+        self.matrix = self.matrix[keep]
+        self.ids = [self.ids[row] for row in keep]
+        self.id_to_row = {item_id: row for row, item_id in enumerate(self.ids)}
+        for item_id in remove:
+            self.hashes.pop(item_id, None)
+
+    def stored_hashes(self) -> Dict[str, str]:
+        return dict(self.hashes)
+
+    def search(self, query_vectors: np.ndarray, k: int) -> SearchResults:
+        queries = normalize_rows(query_vectors)
+        if not self.ids or k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        scores = queries @ self.matrix.T
+        k = min(k, len(self.ids))
+
+        # argpartition finds the top-k in O(n); only those k are sorted
+        if k < len(self.ids):
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(len(self.ids)), (len(queries), 1))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return [
+            [(self.ids[row], float(score)) for row, score in zip(rows, row_scores)]
+            for rows, row_scores in zip(top, top_scores)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class HNSWIndex(VectorIndex):
+    """Approximate search with an hnswlib HNSW graph (cosine space)."""
+
+    name = "hnsw"
+
+    def __init__(self, m: int = 16, ef_construction: int = 200, ef_search: int = 64,
+                 initial_capacity: int = 1024):
+        """
+        Initialize HNSW index.
+
+        Args:
+            m: Graph degree (higher = better recall, more memory)
+            ef_construction: Candidate list size while building the graph
+            ef_search: Candidate list size while searching (raised to k if smaller)
+            initial_capacity: Number of elements allocated up front; grows by doubling
+        """
+        if hnswlib is None:
+            raise ImportError("hnswlib not installed. Please run: pip install hnswlib")
+
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.capacity = initial_capacity
+        self.index = None
+        self.id_to_label: Dict[str, int] = {}
+        self.label_to_id: Dict[int, str] = {}
+        self.hashes: Dict[str, str] = {}
+        self.next_label = 0
+
+    def _ensure_index(self, dim: int, needed: int) -> None:
+        if self.index is None:
+            self.capacity = max(self.capacity, needed)
+            self.index = hnswlib.Index(space="cosine", dim=dim)
+            self.index.init_index(
+                max_elements=self.capacity,
+                ef_construction=self.ef_construction,
+                M=self.m
+            )
+        elif needed > self.capacity:
+            while self.capacity < needed:
+                self.capacity *= 2
+            self.index.resize_index(self.capacity)
+
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray, hashes: Sequence[str]) -> None:
+        vectors = normalize_rows(vectors)
+        labels = []
+        for item_id, item_hash in zip(ids, hashes):
+            label = self.id_to_label.get(item_id)
+            if label is None:
+                label = self.next_label
+                self.next_label += 1
+                self.id_to_label[item_id] = label
+                self.label_to_id[label] = item_id
+            labels.append(label)
+            self.hashes[item_id] = item_hash
+
+        self._ensure_index(vectors.shape[1], self.next_label)
+        self.index.add_items(vectors, np.asarray(labels))
+
+    def delete(self, ids: Sequence[str]) -> None:
+        for item_id in ids:
+            label = self.id_to_label.pop(item_id, None)
+            if label is not None:
+                self.index.mark_deleted(label)
+                del self.label_to_id[label]
+                self.hashes.pop(item_id, None)
+
+    def stored_hashes(self) -> Dict[str, str]:
+        return dict(self.hashes)
+
+    def search(self, query_vectors: np.ndarray, k: int) -> SearchResults:
+        queries = normalize_rows(query_vectors)
+        k = min(k, len(self))
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        self.index.set_ef(max(self.ef_search, k))
+        labels, distances = self.index.knn_query(queries, k=k)
+
+        return [
+            [(self.label_to_id[int(label)], 1.0 - float(distance))
+             for label, distance in zip(row_labels, row_distances)]
+            for row_labels, row_distances in zip(labels, distances)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.id_to_label)
+
+
+class ChromaIndex(VectorIndex):
+    """ChromaDB collection storing precomputed embeddings (in-memory or persistent)."""
+
+    name = "chroma"
+
+    def __init__(self, collection_name: str = "lab3_docs", persist_dir: Optional[str] = None):
+        """
+        Initialize ChromaDB index.
+
+        Args:
+            collection_name: Name for the ChromaDB collection
+            persist_dir: Optional directory for a persistent collection.
+                         If None, an in-memory collection is rebuilt on every run.
+        """
+        if chromadb is None:
+            raise ImportError("ChromaDB not installed. Please run: pip install chromadb")
+
+        settings = Settings(
+            anonymized_telemetry=False,
+            allow_reset=True
+        )
+        metadata = {"description": "Lab 3 document chunks", "hnsw:space": "cosine"}
+
+        if persist_dir:
+            # Persistent mode: keep the collection (and its embeddings) between runs
+            self.client = chromadb.PersistentClient(path=persist_dir, settings=settings)
+            self.collection = self.client.get_or_create_collection(
+                name=collection_name,
+                metadata=metadata
+            )
+        else:
+            self.client = chromadb.Client(settings)
+
+            # Reset collection if it exists
+            try:
+                self.client.delete_collection(name=collection_name)
+            except Exception:
+                pass
+
+            self.collection = self.client.create_collection(
+                name=collection_name,
+                metadata=metadata
+            )
+
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray, hashes: Sequence[str]) -> None:
+        self.collection.upsert(
+            ids=list(ids),
+            embeddings=normalize_rows(vectors).tolist(),
+            metadatas=[{"content_hash": item_hash} for item_hash in hashes]
+        )
+
+    def delete(self, ids: Sequence[str]) -> None:
+        if ids:
+            self.collection.delete(ids=list(ids))
+
+    def stored_hashes(self) -> Dict[str, str]:
+        existing = self.collection.get(include=["metadatas"])
+        return {
+            item_id: (metadata or {}).get("content_hash")
+            for item_id, metadata in zip(existing["ids"], existing["metadatas"])
+        }
+
+    def search(self, query_vectors: np.ndarray, k: int) -> SearchResults:
+        queries = normalize_rows(query_vectors)
+        k = min(k, len(self))
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        results = self.collection.query(query_embeddings=queries.tolist(), n_results=k)
+
+        return [
+            [(item_id, 1.0 - float(distance)) for item_id, distance in zip(row_ids, row_distances)]
+            for row_ids, row_distances in zip(results["ids"], results["distances"])
+        ]
+
+    def __len__(self) -> int:
+        return self.collection.count()
+
+
+INDEX_BACKENDS = {
+    "numpy": NumpyIndex,
+    "hnsw": HNSWIndex,
+    "chroma": ChromaIndex,
+}
+
+
+def create_index(backend: str = "numpy", **kwargs) -> VectorIndex:
+    """
+    Factory function to create vector index instances.
+
+    Args:
+        backend: "numpy", "hnsw", or "chroma"
+        **kwargs: Backend-specific parameters
+
+    Returns:
+        VectorIndex instance
+    """
+    if backend.lower() not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown index backend: {backend}. Choose from {list(INDEX_BACKENDS.keys())}")
+
+    return INDEX_BACKENDS[backend.lower()](**kwargs)
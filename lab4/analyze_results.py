@@ -13,6 +13,65 @@ import numpy as np
 sns.set_style("whitegrid")
 plt.rcParams['figure.figsize'] = (12, 6)
 
+# Plot style per strategy; strategies not listed here get a color from the palette
+STRATEGY_COLORS = {'select': '#2ecc71', 'compress': '#3498db', 'write': '#e74c3c',
+                   'hybrid': '#9b59b6', 'tiered': '#f39c12', 'isolate': '#1abc9c'}
+STRATEGY_MARKERS = {'select': 'o', 'compress': 's', 'write': '^',
+                    'hybrid': 'D', 'tiered': 'v', 'isolate': 'P'}
+FALLBACK_COLORS = ['#34495e', '#7f8c8d', '#d35400', '#c0392b', '#16a085', '#8e44ad']
+FALLBACK_MARKERS = ['X', '*', 'h', '<', '>', 'p']
+
+STRATEGY_TRADEOFFS = {
+    'select': ("SELECT (RAG-based retrieval):", [
+        "✓ Retrieves only relevant context",
+        "✓ Good for focused questions",
+        "✗ Requires embedding infrastructure",
+        "✗ May miss connections between distant facts",
+    ]),
+    'compress': ("COMPRESS (Summarization):", [
+        "✓ Simple to implement",
+        "✓ Handles long histories",
+        "✗ May lose important details in summary",
+        "✗ Summary quality depends on LLM",
+    ]),
+    'write': ("WRITE (External scratchpad):", [
+        "✓ Maintains structured facts",
+        "✓ Good for accumulating knowledge",
+        "✗ Requires fact extraction step",
+        "✗ Fact quality depends on extraction accuracy",
+    ]),
+    'hybrid': ("HYBRID (Budgeted mix of select, compress and write):", [
+        "✓ Never exceeds its token budget",
+        "✓ Learns which source answers best",
+        "✗ Pays the processing cost of all three sources",
+        "✗ Budget split needs feedback to settle",
+    ]),
+    'tiered': ("TIERED (Working, episodic and archival memory):", [
+        "✓ Bounded memory regardless of history length",
+        "✓ Recalled material is promoted for the next question",
+        "✗ Episodic summaries are coarse",
+        "✗ Archival recall depends on lexical overlap",
+    ]),
+    'isolate': ("ISOLATE (Map-reduce over history shards):", [
+        "✓ Reads the whole history without truncation",
+        "✓ Shards are queried in parallel",
+        "✗ One LLM call per shard per question",
+        "✗ Facts split across shards must be joined in the reduce step",
+    ]),
+}
+
+
+def strategy_names(df):
+    """Strategies present in the results, in the order they were benchmarked."""
+    return list(df['strategy'].unique())
+
+
+def strategy_style(strategy, index):
+    """Color and marker for a strategy; index picks a fallback for unknown names."""
+    color = STRATEGY_COLORS.get(strategy, FALLBACK_COLORS[index % len(FALLBACK_COLORS)])
+    marker = STRATEGY_MARKERS.get(strategy, FALLBACK_MARKERS[index % len(FALLBACK_MARKERS)])
+    return color, marker
+
 
 def load_latest_results(results_dir="lab4/results"):
     """Load the most recent experiment results."""
@@ -39,21 +98,18 @@ def results_to_dataframe(results_data):
     for step_result in results_data['results']:
         step = step_result['step']
         
-        for strategy_name in ['select', 'compress', 'write']:
-            if strategy_name in step_result['strategies']:
-                strategy_data = step_result['strategies'][strategy_name]
-                
-                rows.append({
-                    'step': step,
-                    'strategy': strategy_name,
-                    'is_correct': strategy_data.get('is_correct', False),
-                    'accuracy': 1 if strategy_data.get('is_correct', False) else 0,
-                    'context_tokens': strategy_data.get('context_tokens', 0),
-                    'time_seconds': strategy_data.get('time_seconds', 0),
-                    'answer': strategy_data.get('answer', ''),
-                    'question': step_result['question'],
-                    'ground_truth': step_result['ground_truth']
-                })
+        for strategy_name, strategy_data in step_result['strategies'].items():
+            rows.append({
+                'step': step,
+                'strategy': strategy_name,
+                'is_correct': strategy_data.get('is_correct', False),
+                'accuracy': 1 if strategy_data.get('is_correct', False) else 0,
+                'context_tokens': strategy_data.get('context_tokens', 0),
+                'time_seconds': strategy_data.get('time_seconds', 0),
+                'answer': strategy_data.get('answer', ''),
+                'question': step_result['question'],
+                'ground_truth': step_result['ground_truth']
+            })
     
     return pd.DataFrame(rows)
 
@@ -62,15 +118,12 @@ def plot_accuracy_over_time(df, output_dir="lab4/results"):
     """Plot accuracy for each strategy over time."""
     fig, ax = plt.subplots(figsize=(12, 6))
     
-    strategies = ['select', 'compress', 'write']
-    colors = {'select': '#2ecc71', 'compress': '#3498db', 'write': '#e74c3c'}
-    markers = {'select': 'o', 'compress': 's', 'write': '^'}
-    
-    for strategy in strategies:
+    for i, strategy in enumerate(strategy_names(df)):
+        color, marker = strategy_style(strategy, i)
         strategy_data = df[df['strategy'] == strategy].sort_values('step')
         ax.plot(strategy_data['step'], strategy_data['accuracy'], 
-                marker=markers[strategy], label=strategy.upper(), 
-                color=colors[strategy], linewidth=2, markersize=8)
+                marker=marker, label=strategy.upper(), 
+                color=color, linewidth=2, markersize=8)
     
     ax.set_xlabel('Step', fontsize=12, fontweight='bold')
     ax.set_ylabel('Accuracy (1=Correct, 0=Incorrect)', fontsize=12, fontweight='bold')
@@ -90,15 +143,12 @@ def plot_context_tokens_over_time(df, output_dir="lab4/results"):
     """Plot context token usage for each strategy over time."""
     fig, ax = plt.subplots(figsize=(12, 6))
     
-    strategies = ['select', 'compress', 'write']
-    colors = {'select': '#2ecc71', 'compress': '#3498db', 'write': '#e74c3c'}
-    markers = {'select': 'o', 'compress': 's', 'write': '^'}
-    
-    for strategy in strategies:
+    for i, strategy in enumerate(strategy_names(df)):
+        color, marker = strategy_style(strategy, i)
         strategy_data = df[df['strategy'] == strategy].sort_values('step')
         ax.plot(strategy_data['step'], strategy_data['context_tokens'], 
-                marker=markers[strategy], label=strategy.upper(), 
-                color=colors[strategy], linewidth=2, markersize=8)
+                marker=marker, label=strategy.upper(), 
+                color=color, linewidth=2, markersize=8)
     
     ax.set_xlabel('Step', fontsize=12, fontweight='bold')
     ax.set_ylabel('Context Tokens', fontsize=12, fontweight='bold')
@@ -115,10 +165,9 @@ def plot_context_tokens_over_time(df, output_dir="lab4/results"):
 
 def plot_overall_comparison(df, output_dir="lab4/results"):
     """Create a comparison chart of overall strategy performance."""
-    fig, axes = plt.subplots(1, 3, figsize=(15, 5))
-    
-    strategies = ['select', 'compress', 'write']
-    colors = {'select': '#2ecc71', 'compress': '#3498db', 'write': '#e74c3c'}
+    strategies = strategy_names(df)
+    colors = {s: strategy_style(s, i)[0] for i, s in enumerate(strategies)}
+    fig, axes = plt.subplots(1, 3, figsize=(max(15, 2.5 * len(strategies)), 5))
     
     # Accuracy
     accuracy = df.groupby('strategy')['accuracy'].mean()
@@ -171,17 +220,14 @@ def plot_cumulative_accuracy(df, output_dir="lab4/results"):
     """Plot cumulative accuracy (success rate up to each step)."""
     fig, ax = plt.subplots(figsize=(12, 6))
     
-    strategies = ['select', 'compress', 'write']
-    colors = {'select': '#2ecc71', 'compress': '#3498db', 'write': '#e74c3c'}
-    markers = {'select': 'o', 'compress': 's', 'write': '^'}
-    
-    for strategy in strategies:
+    for i, strategy in enumerate(strategy_names(df)):
+        color, marker = strategy_style(strategy, i)
         strategy_data = df[df['strategy'] == strategy].sort_values('step')
         cumulative_accuracy = strategy_data['accuracy'].expanding().mean()
         
         ax.plot(strategy_data['step'], cumulative_accuracy, 
-                marker=markers[strategy], label=strategy.upper(), 
-                color=colors[strategy], linewidth=2, markersize=8)
+                marker=marker, label=strategy.upper(), 
+                color=color, linewidth=2, markersize=8)
     
     ax.set_xlabel('Step', fontsize=12, fontweight='bold')
     ax.set_ylabel('Cumulative Accuracy', fontsize=12, fontweight='bold')
@@ -237,7 +283,9 @@ def generate_analysis_report(df, results_data, output_dir="lab4/results"):
     report_lines.append("OVERALL PERFORMANCE SUMMARY")
     report_lines.append("="*80)
     
-    for strategy in ['select', 'compress', 'write']:
+    strategies = strategy_names(df)
+    
+    for strategy in strategies:
         strategy_data = df[df['strategy'] == strategy]
         
         total_correct = strategy_data['accuracy'].sum()
@@ -264,7 +312,7 @@ def generate_analysis_report(df, results_data, output_dir="lab4/results"):
         report_lines.append(f"  Question: {question}")
         report_lines.append(f"  Ground Truth: {ground_truth}")
         
-        for strategy in ['select', 'compress', 'write']:
+        for strategy in strategies:
             if strategy in step_result['strategies']:
                 s_data = step_result['strategies'][strategy]
                 status = "✓ CORRECT" if s_data.get('is_correct') else "✗ INCORRECT"
@@ -279,17 +327,17 @@ def generate_analysis_report(df, results_data, output_dir="lab4/results"):
     report_lines.append("="*80)
     
     # Calculate some insights
-    strategies_accuracy = {s: df[df['strategy'] == s]['accuracy'].mean() for s in ['select', 'compress', 'write']}
+    strategies_accuracy = {s: df[df['strategy'] == s]['accuracy'].mean() for s in strategies}
     best_strategy = max(strategies_accuracy, key=strategies_accuracy.get)
     
-    strategies_tokens = {s: df[df['strategy'] == s]['context_tokens'].mean() for s in ['select', 'compress', 'write']}
+    strategies_tokens = {s: df[df['strategy'] == s]['context_tokens'].mean() for s in strategies}
     most_efficient = min(strategies_tokens, key=strategies_tokens.get)
     
     report_lines.append(f"\n1. Best Overall Accuracy: {best_strategy.upper()} ({strategies_accuracy[best_strategy]*100:.1f}%)")
     report_lines.append(f"2. Most Context-Efficient: {most_efficient.upper()} ({strategies_tokens[most_efficient]:.0f} avg tokens)")
     
     # Look at accuracy degradation
-    for strategy in ['select', 'compress', 'write']:
+    for strategy in strategies:
         strategy_data = df[df['strategy'] == strategy].sort_values('step')
         first_half = strategy_data[strategy_data['step'] <= 5]['accuracy'].mean()
         second_half = strategy_data[strategy_data['step'] > 5]['accuracy'].mean()
@@ -308,23 +356,12 @@ def generate_analysis_report(df, results_data, output_dir="lab4/results"):
     report_lines.append("STRATEGY TRADE-OFFS")
     report_lines.append("="*80)
     
-    report_lines.append("\nSELECT (RAG-based retrieval):")
-    report_lines.append("  ✓ Retrieves only relevant context")
-    report_lines.append("  ✓ Good for focused questions")
-    report_lines.append("  ✗ Requires embedding infrastructure")
-    report_lines.append("  ✗ May miss connections between distant facts")
-    
-    report_lines.append("\nCOMPRESS (Summarization):")
-    report_lines.append("  ✓ Simple to implement")
-    report_lines.append("  ✓ Handles long histories")
-    report_lines.append("  ✗ May lose important details in summary")
-    report_lines.append("  ✗ Summary quality depends on LLM")
-    
-    report_lines.append("\nWRITE (External scratchpad):")
-    report_lines.append("  ✓ Maintains structured facts")
-    report_lines.append("  ✓ Good for accumulating knowledge")
-    report_lines.append("  ✗ Requires fact extraction step")
-    report_lines.append("  ✗ Fact quality depends on extraction accuracy")
+    for strategy in strategies:
+        if strategy in STRATEGY_TRADEOFFS:
+            title, points = STRATEGY_TRADEOFFS[strategy]
+            report_lines.append(f"\n{title}")
+            for point in points:
+                report_lines.append(f"  {point}")
     
     report_lines.append("\n" + "="*80)
     report_lines.append("END OF REPORT")
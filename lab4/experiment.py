@@ -7,6 +7,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pandas as pd
 from strategies import create_strategy
@@ -18,17 +19,37 @@ class StrategyBenchmark:
     Benchmark context management strategies over a multi-step scenario.
     """
     
-    def __init__(self, scenario, model_name="gpt-4o-mini"):
+    def __init__(self, scenario, model_name="gpt-4o-mini", select_retrieval="keyword", max_workers=None,
+                 hybrid_budget=None, tiered_block_size=None, isolate_shard_tokens=None):
+        """
+        Args:
+            scenario: Scenario dictionary (see generate_scenario.py)
+            model_name: LLM model to use
+            select_retrieval: SELECT retrieval mode, "keyword" or "dense"
+            max_workers: Strategies evaluated at once per step
+                         (default: all; 1 = one after another)
+            hybrid_budget: If set, also benchmark HYBRID with this context token budget
+            tiered_block_size: If set, also benchmark TIERED with episodic blocks of this many steps
+            isolate_shard_tokens: If set, also benchmark ISOLATE with shards of this many tokens
+        """
         self.scenario = scenario
         self.model_name = model_name
+        self.max_workers = max_workers
         self.results = []
         
         # Initialize strategies
         self.strategies = {
-            "select": create_strategy("select", model_name=model_name, top_k=3),
+            "select": create_strategy("select", model_name=model_name, top_k=3, retrieval=select_retrieval),
             "compress": create_strategy("compress", model_name=model_name, max_tokens=2000),
             "write": create_strategy("write", model_name=model_name)
         }
+        if hybrid_budget:
+            self.strategies["hybrid"] = create_strategy("hybrid", model_name=model_name, token_budget=hybrid_budget)
+        if tiered_block_size:
+            self.strategies["tiered"] = create_strategy("tiered", model_name=model_name, block_size=tiered_block_size)
+        if isolate_shard_tokens:
+            self.strategies["isolate"] = create_strategy("isolate", model_name=model_name,
+                                                         shard_tokens=isolate_shard_tokens)
     
     def evaluate_answer(self, answer, ground_truth, question):
         """
@@ -73,6 +94,66 @@ EXPLANATION: [brief explanation]"""
             "eval_response": eval_text
         }
     
+    def evaluate_strategy(self, strategy_name, history, question, ground_truth):
+        """
+        Answer one question with one strategy and judge the answer.
+        
+        Runs on a worker thread; only this strategy's state is touched, so
+        strategies of the same step can be evaluated concurrently.
+        
+        Returns:
+            Per-strategy result dict for step_results['strategies']
+        """
+        strategy = self.strategies[strategy_name]
+        
+        try:
+            start_time = time.time()
+            
+            # Get answer from strategy
+            result = strategy.answer_question(history, question)
+            answer = result['answer']
+            context_tokens = result['context_tokens']
+            answer_seconds = time.time() - start_time
+            
+            # Evaluate correctness
+            judge_start = time.time()
+            evaluation = self.evaluate_answer(answer, ground_truth, question)
+            judge_seconds = time.time() - judge_start
+            
+            # Strategies that adapt to judged answers (HYBRID source weights)
+            if hasattr(strategy, "record_feedback"):
+                strategy.record_feedback(evaluation['is_correct'])
+            
+            outcome = {
+                "answer": answer,
+                "is_correct": evaluation['is_correct'],
+                "explanation": evaluation['explanation'],
+                "context_tokens": context_tokens,
+                "time_seconds": round(answer_seconds + judge_seconds, 2),
+                "answer_seconds": round(answer_seconds, 2),
+                "judge_seconds": round(judge_seconds, 2)
+            }
+            
+            # Strategy-specific statistics (e.g. TIERED tier metrics, ISOLATE shard counts)
+            details = {key: value for key, value in result.items()
+                       if key not in ("answer", "context_tokens", "context_preview")}
+            if details:
+                outcome["details"] = details
+            
+            return outcome
+            
+        except Exception as e:
+            return {
+                "answer": None,
+                "is_correct": False,
+                "explanation": f"Error: {str(e)}",
+                "context_tokens": 0,
+                "time_seconds": 0,
+                "answer_seconds": 0,
+                "judge_seconds": 0,
+                "error": str(e)
+            }
+    
     def run_experiment(self, output_dir="lab4/results"):
         """
         Run the full experiment: evaluate all strategies at each step.
@@ -95,6 +176,10 @@ EXPLANATION: [brief explanation]"""
             question = self.scenario['questions'][step_idx]
             ground_truth = self.scenario['ground_truth'][step_idx]
             
+            # Long scenarios only ask a question every few steps
+            if question is None:
+                continue
+            
             print(f"\n{'='*80}")
             print(f"STEP {step_num}/{self.scenario['num_steps']}")
             print(f"{'='*80}")
@@ -111,52 +196,45 @@ EXPLANATION: [brief explanation]"""
                 "strategies": {}
             }
             
-            # Evaluate each strategy
-            for strategy_name, strategy in self.strategies.items():
+            # Evaluate all strategies concurrently; the step finishes before the
+            # next one starts, so each strategy still sees history in step order
+            step_start = time.time()
+            names = list(self.strategies.keys())
+            workers = self.max_workers or len(names)
+            
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=min(workers, len(names))) as executor:
+                    outcomes = list(executor.map(
+                        lambda name: self.evaluate_strategy(name, current_history, question, ground_truth),
+                        names
+                    ))
+            else:
+                outcomes = [self.evaluate_strategy(name, current_history, question, ground_truth) for name in names]
+            
+            step_results['step_seconds'] = round(time.time() - step_start, 2)
+            
+            for strategy_name, outcome in zip(names, outcomes):
+                step_results['strategies'][strategy_name] = outcome
                 print(f"\n  [{strategy_name.upper()}]")
                 
-                try:
-                    start_time = time.time()
-                    
-                    # Get answer from strategy
-                    result = strategy.answer_question(current_history, question)
-                    answer = result['answer']
-                    context_tokens = result['context_tokens']
-                    
-                    # Evaluate correctness
-                    evaluation = self.evaluate_answer(answer, ground_truth, question)
-                    
-                    elapsed = time.time() - start_time
-                    
-                    # Store results
-                    step_results['strategies'][strategy_name] = {
-                        "answer": answer,
-                        "is_correct": evaluation['is_correct'],
-                        "explanation": evaluation['explanation'],
-                        "context_tokens": context_tokens,
-                        "time_seconds": round(elapsed, 2)
-                    }
-                    
-                    # Print results
-                    status = "✓ CORRECT" if evaluation['is_correct'] else "✗ INCORRECT"
-                    print(f"    Answer: {answer}")
-                    print(f"    Status: {status}")
-                    print(f"    Context Tokens: {context_tokens}")
-                    print(f"    Time: {elapsed:.2f}s")
-                    
-                except Exception as e:
-                    print(f"    ERROR: {str(e)}")
-                    step_results['strategies'][strategy_name] = {
-                        "answer": None,
-                        "is_correct": False,
-                        "explanation": f"Error: {str(e)}",
-                        "context_tokens": 0,
-                        "time_seconds": 0,
-                        "error": str(e)
-                    }
+                if "error" in outcome:
+                    print(f"    ERROR: {outcome['error']}")
+                    continue
+                
+                # Print results
+                status = "✓ CORRECT" if outcome['is_correct'] else "✗ INCORRECT"
+                print(f"    Answer: {outcome['answer']}")
+                print(f"    Status: {status}")
+                print(f"    Context Tokens: {outcome['context_tokens']}")
+                print(f"    Time: {outcome['time_seconds']:.2f}s "
+                      f"(answer {outcome['answer_seconds']:.2f}s, judge {outcome['judge_seconds']:.2f}s)")
+            
+            print(f"\n  Step wall time: {step_results['step_seconds']:.2f}s")
             
             self.results.append(step_results)
         
+        self.close()
+        
         # Save results
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         results_file = os.path.join(output_dir, f"experiment_results_{timestamp}.json")
@@ -175,6 +253,12 @@ EXPLANATION: [brief explanation]"""
         
         return self.results, results_file
     
+    def close(self):
+        """Release strategy resources such as the TIERED archive (run_experiment calls this when done)."""
+        for strategy in self.strategies.values():
+            if hasattr(strategy, "close"):
+                strategy.close()
+    
     def create_summary_dataframe(self):
         """
         Create a DataFrame summarizing strategy performance over time.
@@ -184,7 +268,7 @@ EXPLANATION: [brief explanation]"""
         for step_result in self.results:
             step = step_result['step']
             
-            for strategy_name in ['select', 'compress', 'write']:
+            for strategy_name in self.strategies:
                 if strategy_name in step_result['strategies']:
                     strategy_data = step_result['strategies'][strategy_name]
                     
@@ -195,6 +279,8 @@ EXPLANATION: [brief explanation]"""
                         'accuracy': 1 if strategy_data.get('is_correct', False) else 0,
                         'context_tokens': strategy_data.get('context_tokens', 0),
                         'time_seconds': strategy_data.get('time_seconds', 0),
+                        'answer_seconds': strategy_data.get('answer_seconds', 0),
+                        'judge_seconds': strategy_data.get('judge_seconds', 0),
                         'answer': strategy_data.get('answer', ''),
                         'question': step_result['question']
                     })
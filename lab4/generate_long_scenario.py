@@ -0,0 +1,347 @@
+"""
+Generate long-horizon investigation scenarios for Lab 4 scaling experiments.
+
+generate_scenario.py writes a hand-written 10-step story, which is far too
+short for SELECT, COMPRESS and WRITE costs to diverge. This script composes
+scenarios of any length (1,000-100,000 steps) from:
+
+- tracked entities: people with a location, vehicle, employer and phone
+  number, each planted in the step where it is first observed
+- contradictions: later steps that correct an earlier observation; the
+  question's answer is always the latest value
+- routine steps: canvassing, paperwork and calls that mention entities and
+  places but carry no facts (distractors for retrieval and summaries)
+- questions: every `question_every` steps, about a fact planted at an
+  arbitrary earlier step, with the planting step and distance recorded
+
+Steps and questions are streamed to JSONL, so memory stays flat, and output
+depends only on the seed and parameters. load_long_scenario() turns a
+generated directory (or a prefix of it) into the scenario dict that
+StrategyBenchmark expects.
+
+Usage:
+    python generate_long_scenario.py --num-steps 2000 --question-every 50 --seed 42
+"""
+
+import argparse
+import json
+import os
+import random
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+FIRST_NAMES = [
+    "Alice", "Bruno", "Carmen", "Dmitri", "Elena", "Farid", "Grace", "Hiro",
+    "Ingrid", "Jonas", "Keiko", "Luis", "Marta", "Nikhil", "Olga", "Pavel",
+    "Quinn", "Rosa", "Samir", "Tessa", "Umar", "Vera", "Wes", "Xenia",
+    "Yusuf", "Zora"
+]
+
+LAST_NAMES = [
+    "Abbott", "Brandt", "Castillo", "Dorsey", "Ekwueme", "Fischer", "Gallo",
+    "Haddad", "Ivanova", "Jensen", "Kowalski", "Lindqvist", "Moreau", "Nakamura",
+    "Okafor", "Petrov", "Quintero", "Rossi", "Sandoval", "Takahashi", "Ulrich",
+    "Varga", "Whitfield", "Yilmaz", "Zielinski"
+]
+
+PLACES = [
+    "Harbor Warehouse", "Elm Street Pharmacy", "Central Library", "Riverside Motel",
+    "Union Station", "Northgate Mall", "Old Mill", "Pine Ridge Diner", "City Archive",
+    "Westside Gym", "Marina Docks", "Grand Hotel", "Bus Depot", "Eastview Clinic",
+    "Airport Parking", "Museum Annex", "Lakeside Park", "Printing Works",
+    "Cathedral Square", "Tannery Lane"
+]
+
+COLORS = ["red", "blue", "black", "white", "green", "silver", "grey", "yellow", "maroon", "bronze"]
+VEHICLES = ["sedan", "pickup truck", "motorcycle", "minivan", "hatchback", "station wagon", "scooter", "sport utility vehicle"]
+EMPLOYERS = [
+    "Brightwater Logistics", "Calder Insurance", "Dunmore Bank", "Everly Printing",
+    "Fairhaven Hospital", "Granite Security", "Halcyon Shipping", "Ironbridge Law",
+    "Juniper Catering", "Kestrel Couriers", "Lumen Labs", "Meridian Realty"
+]
+
+# attribute -> (observation template, correction template, question template)
+ATTRIBUTES = {
+    "location": (
+        "{name} was seen entering the {value}.",
+        "Correction: {name} was not at the {old}; a second camera shows {name} at the {value}.",
+        "Where was {name} last reported to be?"
+    ),
+    "vehicle": (
+        "{name} drives a {value}.",
+        "Correction: the registry lists {name}'s vehicle as a {value}, not a {old}.",
+        "What vehicle does {name} drive?"
+    ),
+    "employer": (
+        "{name} works at {value}.",
+        "Correction: {name} left {old} last month and now works at {value}.",
+        "Where does {name} work?"
+    ),
+    "phone": (
+        "{name}'s phone number ends in {value}.",
+        "Correction: {name}'s phone number ends in {value}; the earlier {old} was a typo.",
+        "What are the last four digits of {name}'s phone number?"
+    )
+}
+
+ROUTINE_TEMPLATES = [
+    ("Canvass neighborhood", "Canvassed the area around the {place}. Nobody recalled anything unusual."),
+    ("Review paperwork", "Reviewed {count} pages of case notes about the {place}. Nothing new was found."),
+    ("Follow-up call", "Called {name} for a follow-up. The call went to voicemail."),
+    ("Check surveillance", "Checked {count} hours of footage from the {place}. The footage was inconclusive."),
+    ("Team briefing", "Briefed the team on open leads, including {name} and the {place}."),
+    ("Await lab results", "Waited for lab results on samples from the {place}. Results are still pending.")
+]
+
+OBSERVATION_ACTIONS = {
+    "location": "Review camera footage",
+    "vehicle": "Check vehicle registry",
+    "employer": "Verify employment records",
+    "phone": "Pull phone records"
+}
+
+
+def person_name(index: int) -> str:
+    """Unique full name for a person index (first names cycle fastest)."""
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    suffix = index // (len(FIRST_NAMES) * len(LAST_NAMES))
+    return f"{first} {last}" + (f" {suffix + 1}" if suffix else "")
+
+
+def _attribute_value(attribute: str, rng: random.Random) -> str:
+    if attribute == "location":
+        return rng.choice(PLACES)
+    if attribute == "vehicle":
+        return f"{rng.choice(COLORS)} {rng.choice(VEHICLES)}"
+    if attribute == "employer":
+        return rng.choice(EMPLOYERS)
+    return f"{rng.randrange(10000):04d}"
+
+
+def _step_time(step: int, minutes_per_step: int) -> str:
+    minutes = 8 * 60 + (step - 1) * minutes_per_step
+    day, minute_of_day = divmod(minutes, 24 * 60)
+    hour, minute = divmod(minute_of_day, 60)
+    return f"Day {day + 1} {hour % 12 or 12}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+def iter_long_scenario(
+    num_steps: int,
+    seed: int = 42,
+    num_entities: int = 200,
+    fact_rate: float = 0.5,
+    contradiction_rate: float = 0.1,
+    question_every: int = 10,
+    minutes_per_step: int = 15
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield ("step", step) and ("question", question) records in step order.
+
+    Args:
+        num_steps: Number of steps
+        seed: Random seed
+        num_entities: People that facts are planted about
+        fact_rate: Fraction of steps that plant a new fact (until every
+                   entity attribute has been planted)
+        contradiction_rate: Fraction of steps that correct an earlier fact
+        question_every: Ask a question every this many steps (0 disables)
+        minutes_per_step: Simulated time between steps
+
+    Each question record has step (when it is asked), question, ground_truth,
+    entity, attribute, fact_step (step holding the current answer),
+    distance (step - fact_step) and contradicted (whether the fact was corrected).
+    """
+    rng = random.Random(seed)
+    names = [person_name(i) for i in range(num_entities)]
+    # (entity, attribute) -> {"value", "step", "contradicted"}
+    facts: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    fact_keys: List[Tuple[str, str]] = []
+    unplanted = [(name, attribute) for name in names for attribute in ATTRIBUTES]
+    rng.shuffle(unplanted)
+
+    for step in range(1, num_steps + 1):
+        draw = rng.random()
+
+        if draw < contradiction_rate and fact_keys:
+            key = rng.choice(fact_keys)
+            name, attribute = key
+            old = facts[key]["value"]
+            value = old
+            while value == old:
+                value = _attribute_value(attribute, rng)
+            facts[key] = {"value": value, "step": step, "contradicted": True}
+            kind = "contradiction"
+            action = OBSERVATION_ACTIONS[attribute]
+            observations = ATTRIBUTES[attribute][1].format(name=name, value=value, old=old)
+
+        elif draw < contradiction_rate + fact_rate and unplanted:
+            key = unplanted.pop()
+            name, attribute = key
+            value = _attribute_value(attribute, rng)
+            facts[key] = {"value": value, "step": step, "contradicted": False}
+            fact_keys.append(key)
+            kind = "fact"
+            action = OBSERVATION_ACTIONS[attribute]
+            observations = ATTRIBUTES[attribute][0].format(name=name, value=value)
+
+        else:
+            key = None
+            kind = "routine"
+            action, template = rng.choice(ROUTINE_TEMPLATES)
+            observations = template.format(
+                name=rng.choice(names), place=rng.choice(PLACES), count=rng.randint(2, 40)
+            )
+
+        record = {
+            "step": step,
+            "action": action,
+            "observations": observations,
+            "time": _step_time(step, minutes_per_step),
+            "kind": kind
+        }
+        if key is not None:
+            record.update(entity=key[0], attribute=key[1], value=facts[key]["value"])
+        yield "step", record
+
+        if question_every and step % question_every == 0 and fact_keys:
+            name, attribute = rng.choice(fact_keys)
+            fact = facts[(name, attribute)]
+            yield "question", {
+                "step": step,
+                "question": ATTRIBUTES[attribute][2].format(name=name),
+                "ground_truth": fact["value"],
+                "entity": name,
+                "attribute": attribute,
+                "fact_step": fact["step"],
+                "distance": step - fact["step"],
+                "contradicted": fact["contradicted"]
+            }
+
+
+def generate_long_scenario(output_dir: str, num_steps: int, seed: int = 42, **kwargs) -> Dict[str, Any]:
+    """
+    Write a long scenario to output_dir as steps.jsonl and questions.jsonl.
+
+    Args:
+        output_dir: Directory to write into (created if missing)
+        num_steps: Number of steps
+        seed: Random seed
+        **kwargs: Passed to iter_long_scenario
+
+    Returns:
+        Manifest with the parameters and per-kind step counts (also saved as manifest.json)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    counts = {"fact": 0, "contradiction": 0, "routine": 0}
+    num_questions = 0
+
+    with open(os.path.join(output_dir, "steps.jsonl"), 'w', encoding='utf-8') as steps_file, \
+            open(os.path.join(output_dir, "questions.jsonl"), 'w', encoding='utf-8') as questions_file:
+        for record_type, record in iter_long_scenario(num_steps, seed, **kwargs):
+            if record_type == "step":
+                steps_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                counts[record["kind"]] += 1
+            else:
+                questions_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                num_questions += 1
+
+    manifest = {
+        "seed": seed,
+        "num_steps": num_steps,
+        "num_questions": num_questions,
+        "parameters": kwargs,
+        "steps_by_kind": counts
+    }
+    with open(os.path.join(output_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def _iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_long_scenario(scenario_dir: str, limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Load a generated scenario in the format StrategyBenchmark expects.
+
+    Steps without a question get None in questions and ground_truth, and the
+    benchmark skips them (strategies catch up on the next question).
+
+    Args:
+        scenario_dir: Directory written by generate_long_scenario
+        limit: Only load the first `limit` steps
+
+    Returns:
+        Scenario dictionary; question metadata is kept under "question_details"
+    """
+    steps = []
+    for step in _iter_jsonl(os.path.join(scenario_dir, "steps.jsonl")):
+        if limit is not None and len(steps) >= limit:
+            break
+        steps.append(step)
+
+    questions: List[Optional[str]] = [None] * len(steps)
+    ground_truth: List[Optional[str]] = [None] * len(steps)
+    details = []
+    for question in _iter_jsonl(os.path.join(scenario_dir, "questions.jsonl")):
+        if question["step"] > len(steps):
+            break
+        questions[question["step"] - 1] = question["question"]
+        ground_truth[question["step"] - 1] = question["ground_truth"]
+        details.append(question)
+
+    return {
+        "scenario_type": "long_investigation",
+        "num_steps": len(steps),
+        "steps": steps,
+        "questions": questions,
+        "ground_truth": ground_truth,
+        "question_details": details,
+        "description": f"A {len(steps)}-step procedural investigation tracking people, places, vehicles and "
+                       f"employers, with corrections and questions about facts from earlier steps."
+    }
+
+
+def main():
+    """Generate a long scenario from the command line."""
+    parser = argparse.ArgumentParser(description="Generate a long-horizon Lab 4 scenario")
+    parser.add_argument("--num-steps", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--num-entities", type=int, default=200)
+    parser.add_argument("--fact-rate", type=float, default=0.5)
+    parser.add_argument("--contradiction-rate", type=float, default=0.1)
+    parser.add_argument("--question-every", type=int, default=10)
+    parser.add_argument("--output-dir", default=None,
+                        help="Defaults to lab4/data/long_<num-steps>")
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "data", f"long_{args.num_steps}"
+    )
+
+    print(f"Generating {args.num_steps:,} steps (seed {args.seed})...")
+    manifest = generate_long_scenario(
+        output_dir,
+        num_steps=args.num_steps,
+        seed=args.seed,
+        num_entities=args.num_entities,
+        fact_rate=args.fact_rate,
+        contradiction_rate=args.contradiction_rate,
+        question_every=args.question_every
+    )
+
+    print(f"✓ Generated {manifest['num_steps']:,} steps")
+    for kind, count in manifest["steps_by_kind"].items():
+        print(f"  - {kind.capitalize()}: {count:,}")
+    print(f"✓ Generated {manifest['num_questions']} questions")
+    print(f"✓ Saved to {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
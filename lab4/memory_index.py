@@ -0,0 +1,209 @@
+"""
+Incremental retrieval indexes over agent history for Lab 4.
+
+History grows by one step per turn, so the indexes here are append-only: a
+step is tokenized (or embedded) once when it arrives and never revisited.
+
+IncrementalBM25Index keeps term -> postings arrays that grow in place. A query
+only touches the postings of its own terms, so lookups stay sub-millisecond on
+histories of tens of thousands of steps.
+
+DenseStepIndex keeps normalized step embeddings in one growing matrix, so
+semantic search is one matrix-vector product and no step is re-embedded.
+"""
+
+import math
+import re
+from array import array
+from typing import Dict, Hashable, List, Tuple
+
+import numpy as np
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['.:\-][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from had has have he her him his how in is it "
+    "its of on or she that the their them they this to was were what when where which who "
+    "why with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into index terms, dropping stopwords."""
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+class IncrementalBM25Index:
+    """Append-only Okapi BM25 index."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize index.
+
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization strength
+        """
+        self.k1 = k1
+        self.b = b
+        self.ids: List[Hashable] = []
+        self.doc_lengths = array("f")
+        self.total_length = 0
+        # term -> (document positions, term frequencies), both growing in place
+        self.postings: Dict[str, Tuple[array, array]] = {}
+
+    def add(self, doc_id: Hashable, text: str) -> None:
+        """
+        Index one document. Its text is tokenized exactly once.
+
+        Args:
+            doc_id: Identifier returned by search
+            text: Document text
+        """
+        position = len(self.ids)
+        terms = tokenize(text)
+
+        counts: Dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+
+        for term, count in counts.items():
+            if term not in self.postings:
+                self.postings[term] = (array("i"), array("f"))
+            docs, freqs = self.postings[term]
+            docs.append(position)
+            freqs.append(count)
+
+        self.ids.append(doc_id)
+        self.doc_lengths.append(len(terms))
+        self.total_length += len(terms)
+
+    def search(self, query: str, k: int) -> List[Tuple[Hashable, float]]:
+        """
+        Return the k best-scoring documents for a query.
+
+        Args:
+            query: Query text
+            k: Number of results
+
+        Returns:
+            (doc_id, score) pairs, best first. Documents sharing no term with
+            the query are not returned.
+        """
+        num_docs = len(self.ids)
+        terms = [term for term in set(tokenize(query)) if term in self.postings]
+        if not num_docs or not terms or k <= 0:
+            return []
+
+        # Zero-copy views over the growing arrays (released before the next add)
+        doc_lengths = np.frombuffer(self.doc_lengths, dtype=np.float32)
+        avg_length = self.total_length / num_docs
+        matched_docs = []
+        matched_scores = []
+
+        for term in terms:
+            docs_buffer, freqs_buffer = self.postings[term]
+            docs = np.frombuffer(docs_buffer, dtype=np.int32)
+            freqs = np.frombuffer(freqs_buffer, dtype=np.float32)
+
+            idf = math.log(1 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_lengths[docs] / max(avg_length, 1e-9))
+            matched_docs.append(docs)
+            matched_scores.append(idf * freqs * (self.k1 + 1) / (freqs + norm))
+
+        docs = np.concatenate(matched_docs)
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(matched_scores))
+
+        if len(unique_docs) > k:
+            top = np.argpartition(-totals, k - 1)[:k]
+        else:
+            top = np.arange(len(unique_docs))
+        # Ties go to the earlier document
+        top = top[np.lexsort((unique_docs[top], -totals[top]))]
+
+        return [(self.ids[unique_docs[i]], float(totals[i])) for i in top]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class DenseStepIndex:
+    """
+    Append-only matrix of unit-normalized embeddings.
+
+    Rows live in one preallocated float32 matrix whose capacity doubles when
+    full, so appending is amortized O(dim) and a query is a single
+    matrix-vector product over the filled rows.
+    """
+
+    def __init__(self, initial_capacity: int = 64):
+        """
+        Initialize index.
+
+        Args:
+            initial_capacity: Rows allocated before the first doubling
+        """
+        self.initial_capacity = initial_capacity
+        self.ids: List[Hashable] = []
+        self.vectors = None
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """Scale rows to unit length (zero rows stay zero)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def add_batch(self, ids: List[Hashable], vectors: np.ndarray) -> None:
+        """
+        Append embeddings.
+
+        Args:
+            ids: Identifier per row
+            vectors: Array of shape (len(ids), dim)
+        """
+        if not len(ids):
+            return
+
+        vectors = self.normalize(vectors)
+        start = len(self.ids)
+        needed = start + len(ids)
+
+        if self.vectors is None:
+            capacity = max(self.initial_capacity, needed)
+            self.vectors = np.zeros((capacity, vectors.shape[1]), dtype=np.float32)
+        elif needed > len(self.vectors):
+            capacity = len(self.vectors)
+            while capacity < needed:
+                capacity *= 2
+            grown = np.zeros((capacity, self.vectors.shape[1]), dtype=np.float32)
+            grown[:start] = self.vectors[:start]
+            self.vectors = grown
+
+        self.vectors[start:needed] = vectors
+        self.ids.extend(ids)
+
+    def search(self, query_vector: np.ndarray, k: int) -> List[Tuple[Hashable, float]]:
+        """
+        Return the k rows with the highest cosine similarity to the query.
+
+        Returns:
+            (id, similarity) pairs, best first
+        """
+        num_rows = len(self.ids)
+        if not num_rows or k <= 0:
+            return []
+
+        scores = self.vectors[:num_rows] @ self.normalize(query_vector).ravel()
+        if num_rows > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(num_rows)
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return [(self.ids[i], float(scores[i])) for i in top]
+
+    def __len__(self) -> int:
+        return len(self.ids)
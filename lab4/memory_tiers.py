@@ -0,0 +1,249 @@
+"""
+Tiered agent memory for Lab 4: working, episodic and archival.
+
+The strategies in strategies.py keep their whole history in RAM. TieredMemory
+bounds what stays in memory regardless of scenario length:
+
+- working:  the most recently added or recalled steps, verbatim, in an LRU of
+            working_size entries
+- episodic: summaries of consecutive blocks of block_size steps; at most
+            episodic_size blocks stay in RAM (least recently used evicted)
+- archival: every step and every evicted block summary, written through to
+            SQLite on disk with a full-text index (FTS5, or an in-RAM BM25
+            index when the SQLite build has no FTS5)
+
+A lookup searches all three tiers. Archival hits are promoted into the working
+set and episodic hits are refreshed, so recalled material is cheap to reach
+on the next question. Each tier counts lookups, hits and time spent, so the
+cost of each level can be compared (see metrics(), cumulative or since a
+snapshot()).
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from lab4.memory_index import IncrementalBM25Index, tokenize
+
+
+TIERS = ("working", "episodic", "archival")
+
+
+def extractive_summary(texts: Sequence[str], max_chars: int = 400) -> str:
+    """Cheap default block summary: the first line of each step, truncated."""
+    summary = " | ".join(text.split("\n")[0] for text in texts)
+    return summary[:max_chars]
+
+
+def overlap_score(query_terms: set, terms: set) -> float:
+    """Fraction of query terms present in an item."""
+    return len(query_terms & terms) / len(query_terms) if query_terms else 0.0
+
+
+class TieredMemory:
+    """Three-tier memory with promotion, eviction and per-tier hit metrics."""
+
+    def __init__(self, path: Optional[str] = None, working_size: int = 8, block_size: int = 10,
+                 episodic_size: int = 32, summarize_fn: Optional[Callable[[Sequence[str]], str]] = None):
+        """
+        Initialize memory.
+
+        Args:
+            path: SQLite file for the archival tier (default: a temporary file,
+                  removed by close()). An existing archive at path is cleared,
+                  since step keys restart at 0.
+            working_size: Steps kept verbatim in RAM
+            block_size: Consecutive steps summarized into one episodic block
+            episodic_size: Block summaries kept in RAM
+            summarize_fn: Maps a block's step texts to a summary
+                          (default: extractive_summary)
+        """
+        self.working_size = working_size
+        self.block_size = block_size
+        self.episodic_size = episodic_size
+        self.summarize_fn = summarize_fn or extractive_summary
+
+        # key -> {"text", "terms", ...}; OrderedDict order is least recently used first
+        self.working: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.episodic: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.pending: List[Dict[str, Any]] = []
+        self.num_steps = 0
+        self.num_blocks = 0
+        self.metrics_by_tier = {tier: {"lookups": 0, "hits": 0, "seconds": 0.0} for tier in TIERS}
+
+        self._owns_path = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix=".db", prefix="lab4_archive_")
+            os.close(fd)
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("DROP TABLE IF EXISTS items_fts")
+        self._db.execute("DROP TABLE IF EXISTS items")
+        self._db.execute("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, kind TEXT, ref INTEGER, text TEXT)")
+        try:
+            self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(text, content='items', content_rowid='id')")
+            self._fallback_index = None
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: keep the archival index in RAM instead
+            self._fallback_index = IncrementalBM25Index()
+        self._db.commit()
+
+    def add_step(self, step_key: int, text: str) -> None:
+        """
+        Add a new step: archive it, put it in the working set, and fold every
+        block_size steps into an episodic summary.
+        """
+        item = {"key": step_key, "text": text, "terms": set(tokenize(text))}
+        self._archive("step", step_key, text)
+        self._touch_working(item)
+        self.num_steps += 1
+
+        self.pending.append(item)
+        if len(self.pending) >= self.block_size:
+            self._close_block()
+
+    def _archive(self, kind: str, ref: int, text: str) -> None:
+        cursor = self._db.execute("INSERT INTO items (kind, ref, text) VALUES (?, ?, ?)", (kind, ref, text))
+        if self._fallback_index is None:
+            self._db.execute("INSERT INTO items_fts (rowid, text) VALUES (?, ?)", (cursor.lastrowid, text))
+        else:
+            self._fallback_index.add(cursor.lastrowid, text)
+
+    def _touch_working(self, item: Dict[str, Any]) -> None:
+        self.working[item["key"]] = item
+        self.working.move_to_end(item["key"])
+        while len(self.working) > self.working_size:
+            self.working.popitem(last=False)
+
+    def _close_block(self) -> None:
+        block_id = self.num_blocks
+        summary = self.summarize_fn([item["text"] for item in self.pending])
+        self.episodic[block_id] = {
+            "key": block_id,
+            "text": summary,
+            "terms": set(tokenize(summary)),
+            "first_step": self.pending[0]["key"],
+            "last_step": self.pending[-1]["key"]
+        }
+        self.num_blocks += 1
+        self.pending = []
+
+        while len(self.episodic) > self.episodic_size:
+            _, evicted = self.episodic.popitem(last=False)
+            self._archive("block", evicted["key"], evicted["text"])
+
+    def _search_archive(self, query: str, k: int) -> List[Dict[str, Any]]:
+        terms = sorted(set(tokenize(query)))
+        if not terms or k <= 0:
+            return []
+
+        if self._fallback_index is None:
+            match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+            rows = self._db.execute(
+                "SELECT items.id, items.kind, items.ref, items.text, bm25(items_fts) FROM items_fts "
+                "JOIN items ON items.id = items_fts.rowid WHERE items_fts MATCH ? "
+                "ORDER BY bm25(items_fts) LIMIT ?",
+                (match, k)
+            ).fetchall()
+            # FTS5 bm25() is lower-is-better
+            return [{"kind": kind, "key": ref, "text": text, "score": -score} for _, kind, ref, text, score in rows]
+
+        hits = self._fallback_index.search(query, k)
+        results = []
+        for row_id, score in hits:
+            kind, ref, text = self._db.execute("SELECT kind, ref, text FROM items WHERE id = ?", (row_id,)).fetchone()
+            results.append({"kind": kind, "key": ref, "text": text, "score": score})
+        return results
+
+    def _record(self, tier: str, hit: bool, started: float) -> None:
+        metrics = self.metrics_by_tier[tier]
+        metrics["lookups"] += 1
+        metrics["hits"] += int(hit)
+        metrics["seconds"] += time.perf_counter() - started
+
+    def recall(self, query: str, k: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Look a query up in every tier.
+
+        Args:
+            query: Query text
+            k: Maximum items returned per tier
+
+        Returns:
+            dict tier -> matching items (dicts with key, text, score; episodic
+            items also carry first_step/last_step, archival items a kind of
+            "step" or "block"). Archival step hits are promoted into working
+            memory and episodic hits become most recently used.
+        """
+        # Archive writes are committed once per lookup rather than once per step
+        self._db.commit()
+        query_terms = set(tokenize(query))
+        results = {}
+
+        started = time.perf_counter()
+        scored = [(overlap_score(query_terms, item["terms"]), item) for item in self.working.values()]
+        results["working"] = [
+            dict(key=item["key"], text=item["text"], score=score)
+            for score, item in sorted(scored, key=lambda pair: pair[0], reverse=True)[:k] if score > 0
+        ]
+        self._record("working", bool(results["working"]), started)
+
+        started = time.perf_counter()
+        scored = [(overlap_score(query_terms, item["terms"]), item) for item in self.episodic.values()]
+        results["episodic"] = [
+            dict(key=item["key"], text=item["text"], score=score,
+                 first_step=item["first_step"], last_step=item["last_step"])
+            for score, item in sorted(scored, key=lambda pair: pair[0], reverse=True)[:k] if score > 0
+        ]
+        for item in results["episodic"]:
+            self.episodic.move_to_end(item["key"])
+        self._record("episodic", bool(results["episodic"]), started)
+
+        started = time.perf_counter()
+        in_working = set(self.working)
+        in_episodic = set(self.episodic)
+        results["archival"] = [
+            item for item in self._search_archive(query, k + len(in_working))
+            if not (item["kind"] == "step" and item["key"] in in_working)
+            and not (item["kind"] == "block" and item["key"] in in_episodic)
+        ][:k]
+        for item in results["archival"]:
+            if item["kind"] == "step":
+                self._touch_working({"key": item["key"], "text": item["text"], "terms": set(tokenize(item["text"]))})
+        self._record("archival", bool(results["archival"]), started)
+
+        return results
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Copy of the per-tier counters, for metrics(since=...)."""
+        return {tier: dict(values) for tier, values in self.metrics_by_tier.items()}
+
+    def metrics(self, since: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-tier lookups, hits, hit rate, seconds and current size.
+
+        Args:
+            since: A snapshot() taken earlier; lookups, hits and seconds are then
+                   the change since it (default: cumulative since creation)
+        """
+        sizes = {"working": len(self.working), "episodic": len(self.episodic), "archival": self.num_steps}
+        report = {}
+        for tier, values in self.metrics_by_tier.items():
+            values = dict(values)
+            if since is not None:
+                values = {key: value - since[tier][key] for key, value in values.items()}
+            report[tier] = dict(values, hit_rate=values["hits"] / values["lookups"] if values["lookups"] else 0.0,
+                                size=sizes[tier])
+        return report
+
+    def close(self) -> None:
+        """Close the archive (and delete it if it was a temporary file)."""
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
+            if self._owns_path and os.path.exists(self.path):
+                os.remove(self.path)
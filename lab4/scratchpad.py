@@ -0,0 +1,230 @@
+"""
+Deduplicated, indexed fact store for the Lab 4 WRITE strategy.
+
+WRITE extracts facts from every step, and the same fact ("The butler was in
+the library at 9pm") is often extracted again from later steps. The store
+keeps one record per normalized fact text and only adds the new step to that
+record's metadata, so memory grows with distinct facts, not with steps.
+
+Each fact carries the steps it was seen in, the entities it mentions and a
+time (parsed from the fact, else the step's time). Retrieval goes through an
+IncrementalBM25Index over fact texts plus an entity -> facts index, so a query
+never scans the whole scratchpad.
+
+With a path, records are also written to SQLite and reloaded on open, so a
+long run can resume with its scratchpad intact. The store also records which
+steps were processed, including steps that yielded no facts, so a resumed run
+does not extract them again.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from lab4.memory_index import IncrementalBM25Index
+
+
+ENTITY_PATTERN = re.compile(r"\b[A-Z][a-zA-Z'\-]+(?:\s+[A-Z][a-zA-Z'\-]+)*\b")
+TIME_PATTERN = re.compile(r"\b\d{1,2}:\d{2}(?:\s*[AaPp]\.?[Mm]\.?)?|\b\d{1,2}\s*[AaPp]\.?[Mm]\b\.?")
+BULLET_PATTERN = re.compile(r"^\s*(?:[-•*]|\d+[.)])\s*")
+
+# Capitalized words that start sentences rather than name things
+NON_ENTITIES = frozenset(
+    "A An The This That These Those He She They It His Her Their Its Step Time "
+    "Found Key Fact Facts No Yes Who What Where When Why How Which Did Does Do Is Was Were".split()
+)
+
+
+def normalize_fact(text: str) -> str:
+    """Lowercase, drop bullet markers and punctuation, and collapse whitespace."""
+    text = BULLET_PATTERN.sub("", text).lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def fact_hash(text: str) -> str:
+    """Hash of the normalized fact text, used as the dedupe key."""
+    return hashlib.sha1(normalize_fact(text).encode("utf-8")).hexdigest()
+
+
+def extract_entities(text: str) -> List[str]:
+    """Capitalized names in a fact, e.g. ["Sarah Chen", "Library"]."""
+    entities = []
+    text = TIME_PATTERN.sub(" ", BULLET_PATTERN.sub("", text))
+    for match in ENTITY_PATTERN.findall(text):
+        words = match.split()
+        while words and words[0] in NON_ENTITIES:
+            words = words[1:]
+        name = " ".join(words)
+        if name and name not in entities:
+            entities.append(name)
+    return entities
+
+
+def extract_time(text: str) -> Optional[str]:
+    """First clock time mentioned in a fact, if any."""
+    match = TIME_PATTERN.search(text)
+    return match.group(0).strip() if match else None
+
+
+class ScratchpadStore:
+    """Append-only fact store with dedupe, metadata, and indexed retrieval."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize store.
+
+        Args:
+            path: SQLite file backing the store; None keeps it in memory only
+        """
+        self.path = path
+        self.facts: List[Dict[str, Any]] = []
+        self.by_hash: Dict[str, int] = {}
+        self.by_entity: Dict[str, List[int]] = {}
+        self.processed_steps: Set[Any] = set()
+        self.index = IncrementalBM25Index()
+        self.duplicates = 0
+        self._db = None
+
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS facts ("
+                "id INTEGER PRIMARY KEY, hash TEXT UNIQUE, text TEXT, "
+                "steps TEXT, entities TEXT, time TEXT)"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS processed_steps (step TEXT PRIMARY KEY)")
+            self._db.commit()
+            for fact_id, text, steps, entities, time in self._db.execute(
+                "SELECT id, text, steps, entities, time FROM facts ORDER BY id"
+            ):
+                self._index_fact({
+                    "id": fact_id,
+                    "text": text,
+                    "steps": json.loads(steps),
+                    "entities": json.loads(entities),
+                    "time": time
+                })
+            # Stores written before processed_steps existed only know the steps of their facts
+            self.processed_steps.update(step for fact in self.facts for step in fact["steps"])
+            self.processed_steps.update(
+                json.loads(step) for (step,) in self._db.execute("SELECT step FROM processed_steps")
+            )
+
+    def _index_fact(self, fact: Dict[str, Any]) -> None:
+        self.facts.append(fact)
+        self.by_hash[fact_hash(fact["text"])] = fact["id"]
+        for entity in fact["entities"]:
+            self.by_entity.setdefault(entity.lower(), []).append(fact["id"])
+        self.index.add(fact["id"], fact["text"])
+
+    def add_facts(self, texts: Iterable[str], step: Any = None, time: Optional[str] = None) -> List[int]:
+        """
+        Add facts extracted from one step.
+
+        A fact whose normalized text is already stored is not added again; the
+        step is recorded on the existing fact instead. The step is marked as
+        processed even if it yielded no facts.
+
+        Args:
+            texts: Fact strings
+            step: Step the facts came from (must be JSON-serializable)
+            time: Step time, used when a fact mentions no time itself
+
+        Returns:
+            Ids of the newly added facts
+        """
+        added = []
+        updated = []
+        new_step = step is not None and step not in self.processed_steps
+        if new_step:
+            self.processed_steps.add(step)
+
+        for text in texts:
+            text = text.strip()
+            if not normalize_fact(text):
+                continue
+            key = fact_hash(text)
+
+            if key in self.by_hash:
+                fact = self.facts[self.by_hash[key]]
+                if step is not None and step not in fact["steps"]:
+                    fact["steps"].append(step)
+                    updated.append(fact)
+                self.duplicates += 1
+                continue
+
+            fact = {
+                "id": len(self.facts),
+                "text": text,
+                "steps": [step] if step is not None else [],
+                "entities": extract_entities(text),
+                "time": extract_time(text) or time
+            }
+            self._index_fact(fact)
+            added.append(fact["id"])
+
+        if self._db is not None and (added or updated or new_step):
+            self._db.executemany(
+                "INSERT INTO facts (id, hash, text, steps, entities, time) VALUES (?, ?, ?, ?, ?, ?)",
+                [(fact["id"], fact_hash(fact["text"]), fact["text"], json.dumps(fact["steps"]),
+                  json.dumps(fact["entities"]), fact["time"])
+                 for fact in (self.facts[i] for i in added)]
+            )
+            self._db.executemany(
+                "UPDATE facts SET steps = ? WHERE id = ?",
+                [(json.dumps(fact["steps"]), fact["id"]) for fact in updated]
+            )
+            if new_step:
+                self._db.execute("INSERT OR IGNORE INTO processed_steps (step) VALUES (?)", (json.dumps(step),))
+            self._db.commit()
+
+        return added
+
+    def search(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Return up to k facts relevant to a query.
+
+        BM25 matches come first, then other facts naming an entity from the
+        query (most recent first), then the most recent facts fill any gap.
+        """
+        if k <= 0 or not self.facts:
+            return []
+
+        selected: List[int] = []
+        seen = set()
+
+        def take(fact_ids):
+            for fact_id in fact_ids:
+                if len(selected) == k:
+                    return
+                if fact_id not in seen:
+                    seen.add(fact_id)
+                    selected.append(fact_id)
+
+        take(fact_id for fact_id, _ in self.index.search(query, k))
+        for entity in extract_entities(query):
+            take(reversed(self.by_entity.get(entity.lower(), [])))
+        take(range(len(self.facts) - 1, -1, -1))
+
+        return [self.facts[fact_id] for fact_id in selected]
+
+    def facts_for_entity(self, entity: str) -> List[Dict[str, Any]]:
+        """All facts mentioning an entity, oldest first."""
+        return [self.facts[i] for i in self.by_entity.get(entity.lower(), [])]
+
+    def facts_for_step(self, step: Any) -> List[Dict[str, Any]]:
+        """All facts seen in a step."""
+        return [fact for fact in self.facts if step in fact["steps"]]
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __len__(self) -> int:
+        return len(self.facts)
+
+    def __iter__(self):
+        return (fact["text"] for fact in self.facts)
@@ -1,27 +1,126 @@
 """
-Context management strategies: SELECT, COMPRESS, and WRITE.
+Context management strategies: SELECT, COMPRESS, WRITE, HYBRID, TIERED, and ISOLATE.
 """
 import sys
 import os
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from azure_openai_helper import llm_query, get_client
 import tiktoken
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+
+from lab4.memory_index import DenseStepIndex, IncrementalBM25Index
+from lab4.scratchpad import ScratchpadStore
+from lab4.memory_tiers import TieredMemory
+
+# SELECT retrieval modes: BM25 keyword matching or embedding similarity
+SELECT_RETRIEVAL_MODES = ("keyword", "dense")
+
+
+def format_step(step_data):
+    """Render one history step the way strategies place it in context."""
+    return f"Step {step_data['step']}: {step_data['action']}\n{step_data['observations']}\nTime: {step_data['time']}"
+
+
+def embed_texts(texts, batch_size=256):
+    """
+    Embed texts with the Azure OpenAI embedding deployment.
+    
+    The deployment name is read from AZURE_OPENAI_EMBEDDING_DEPLOYMENT
+    (default "text-embedding-3-small").
+    
+    Returns:
+        float32 array of shape (len(texts), dim)
+    """
+    client = get_client()
+    deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-3-small")
+    vectors = []
+    
+    for i in range(0, len(texts), batch_size):
+        response = client.embeddings.create(model=deployment, input=list(texts[i:i+batch_size]))
+        vectors.extend(item.embedding for item in response.data)
+    
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def parse_fact_lines(facts_text):
+    """Keep the bullet or numbered lines of an extraction response as facts."""
+    return [line.strip() for line in facts_text.split('\n') if line.strip() and (line.strip().startswith('-') or line.strip().startswith('•') or line.strip()[0].isdigit())]
+
+
+def parse_batched_facts(response_text, step_numbers):
+    """
+    Parse a batched extraction response into facts per step.
+    
+    Expects a JSON object {"steps": [{"step": 3, "facts": ["..."]}, ...]}
+    (optionally inside a ```json fence). Facts are returned as "- " bullets,
+    matching single-step extraction.
+    
+    Args:
+        response_text: Raw LLM response
+        step_numbers: Steps that were sent in the batch
+        
+    Returns:
+        dict mapping step number -> list of facts. Steps missing from the
+        response (or an unparseable response) are left out.
+    """
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", response_text.strip())
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return {}
+    
+    entries = data.get("steps", []) if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        return {}
+    
+    wanted = {str(step): step for step in step_numbers}
+    facts_by_step = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or str(entry.get("step")) not in wanted:
+            continue
+        facts = entry.get("facts", [])
+        if isinstance(facts, str):
+            facts = [facts]
+        facts_by_step[wanted[str(entry["step"])]] = [
+            fact if fact.startswith(('-', '•')) else f"- {fact}"
+            for fact in (str(fact).strip() for fact in facts) if fact
+        ]
+    
+    return facts_by_step
 
 
 class ContextStrategy:
-    """Base class for context management strategies."""
+    """
+    Base class for context management strategies.
+    
+    Token accounting is incremental: strategies count each step, fact or
+    summary once when it is created, and process_history sets
+    last_context_tokens to the cached counts of the parts it joined plus the
+    separator tokens between them. That equals encoding the joined context
+    unless a part starts or ends with whitespace the encoding merges with a
+    separator, which shifts the count by about one token per join.
+    answer_question only encodes the context when a strategy leaves it unset.
+    """
     
     def __init__(self, model_name="gpt-4o-mini"):
         self.model_name = model_name
         self.encoding = tiktoken.encoding_for_model("gpt-4")
+        self.separator_tokens = {separator: self.count_tokens(separator) for separator in ("\n", "\n\n")}
+        self.last_context_tokens = None
         
     def count_tokens(self, text):
         """Count tokens in text."""
         return len(self.encoding.encode(text))
     
+    def joined_tokens(self, part_tokens, separator="\n\n"):
+        """Tokens of parts joined by a separator: the parts' cached counts plus one separator count per join."""
+        return sum(part_tokens) + self.separator_tokens[separator] * max(len(part_tokens) - 1, 0)
+    
     def process_history(self, history, query):
         """
         Process history and prepare context for answering query.
@@ -47,6 +146,7 @@ class ContextStrategy:
         Returns:
             dict with answer, token_count, and context_used
         """
+        self.last_context_tokens = None
         context = self.process_history(history, query)
         
         prompt = f"""Based on the following information, answer the question concisely and accurately.
@@ -65,7 +165,7 @@ Answer (be brief and specific):"""
             max_tokens=150
         )
         
-        tokens_used = self.count_tokens(context)
+        tokens_used = self.last_context_tokens if self.last_context_tokens is not None else self.count_tokens(context)
         
         return {
             "answer": answer,
@@ -76,124 +176,291 @@ Answer (be brief and specific):"""
 
 class SelectStrategy(ContextStrategy):
     """
-    SELECT Strategy: Use keyword-based retrieval to get only relevant parts of history.
-    Note: This is a simplified version that uses keyword matching instead of embeddings.
+    SELECT Strategy: Retrieve only the history steps relevant to the question.
+    
+    Steps are indexed incrementally: each step is formatted once when it first
+    appears and either tokenized into a BM25 index ("keyword") or embedded
+    into a growing matrix ("dense"). Queries never rescan or re-embed history.
     """
     
-    def __init__(self, model_name="gpt-4o-mini", top_k=3):
+    def __init__(self, model_name="gpt-4o-mini", top_k=3, retrieval="keyword", embed_fn=None):
+        """
+        Args:
+            model_name: LLM model to use
+            top_k: Number of steps placed in context
+            retrieval: "keyword" (BM25) or "dense" (embedding cosine similarity)
+            embed_fn: Function mapping a list of texts to a float32 array;
+                      defaults to the Azure OpenAI embedding deployment
+        """
         super().__init__(model_name)
+        if retrieval not in SELECT_RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {retrieval}. Choose from {list(SELECT_RETRIEVAL_MODES)}")
+        
         self.top_k = top_k
+        self.retrieval = retrieval
+        self.embed_fn = embed_fn or embed_texts
+        self._reset_index()
+    
+    def _reset_index(self):
+        self.index = DenseStepIndex() if self.retrieval == "dense" else IncrementalBM25Index()
+        self.step_chunks = []
+        self.step_tokens = []
+    
+    def ingest_steps(self, history):
+        """
+        Index steps not seen before.
         
-    def calculate_relevance(self, text, query):
-        """Calculate relevance score based on keyword overlap."""
-        # Simple keyword-based relevance scoring
-        text_lower = text.lower()
-        query_words = query.lower().split()
+        History is expected to grow by appending; a shorter history means a new
+        run, so the index is rebuilt. In dense mode all new steps are embedded
+        with one batched call.
+        """
+        if len(history) < len(self.step_chunks):
+            self._reset_index()
         
-        # Count how many query words appear in text
-        score = sum(1 for word in query_words if len(word) > 3 and word in text_lower)
+        new_chunks = [format_step(step_data) for step_data in history[len(self.step_chunks):]]
+        self.add_steps(new_chunks, [self.count_tokens(chunk) for chunk in new_chunks])
+    
+    def sync_steps(self, step_texts, step_tokens):
+        """
+        Index steps another strategy has already formatted and counted.
         
-        # Boost score for exact phrases
-        if query.lower() in text_lower:
-            score += 5
+        step_texts and step_tokens are that strategy's full cached lists. If
+        they no longer extend what is indexed (a new run), the index is rebuilt.
+        """
+        indexed = len(self.step_chunks)
+        if indexed and (indexed > len(step_texts) or step_texts[0] != self.step_chunks[0]
+                        or step_texts[indexed - 1] != self.step_chunks[-1]):
+            self._reset_index()
         
-        return score
+        start = len(self.step_chunks)
+        self.add_steps(step_texts[start:], step_tokens[start:])
+    
+    def add_steps(self, chunks, tokens):
+        """Append formatted steps and their token counts to the index."""
+        if not chunks:
+            return
+        
+        start = len(self.step_chunks)
+        positions = list(range(start, start + len(chunks)))
+        if self.retrieval == "dense":
+            self.index.add_batch(positions, self.embed_fn(list(chunks)))
+        else:
+            for position, chunk in zip(positions, chunks):
+                self.index.add(position, chunk)
+        self.step_chunks.extend(chunks)
+        self.step_tokens.extend(tokens)
     
     def process_history(self, history, query):
         """
-        Retrieve top-k most relevant history items using keyword matching.
+        Retrieve top-k most relevant history items from the step index.
+        
+        If fewer than top_k steps share a term with the query (keyword mode),
+        the most recent steps fill the remaining slots.
         """
         if not history:
             return ""
         
-        # Create chunks from history with relevance scores
-        chunks_with_scores = []
-        for step_data in history:
-            chunk = f"Step {step_data['step']}: {step_data['action']}\n{step_data['observations']}\nTime: {step_data['time']}"
-            score = self.calculate_relevance(chunk, query)
-            chunks_with_scores.append((chunk, score))
+        self.ingest_steps(history)
         
-        # Sort by relevance score and take top-k
-        chunks_with_scores.sort(key=lambda x: x[1], reverse=True)
-        relevant_chunks = [chunk for chunk, score in chunks_with_scores[:self.top_k]]
+        if self.retrieval == "dense":
+            hits = self.index.search(self.embed_fn([query])[0], self.top_k)
+        else:
+            hits = self.index.search(query, self.top_k)
         
-        return "\n\n".join(relevant_chunks)
+        selected = [position for position, _ in hits]
+        for position in range(len(self.step_chunks) - 1, -1, -1):
+            if len(selected) >= self.top_k:
+                break
+            if position not in selected:
+                selected.append(position)
+        
+        self.last_context_tokens = self.joined_tokens([self.step_tokens[position] for position in selected])
+        return "\n\n".join(self.step_chunks[position] for position in selected)
 
 
 class CompressStrategy(ContextStrategy):
     """
     COMPRESS Strategy: Summarize history when it exceeds token threshold.
+    
+    Summarization is rolling: once the context would exceed max_tokens, only
+    steps that have not been summarized yet are merged into the running
+    summary, while the most recent keep_recent steps stay verbatim. When the
+    summary itself grows past summary_budget it is re-compacted. Each step is
+    formatted and token-counted once, so per-step cost does not grow with
+    history length.
     """
     
-    def __init__(self, model_name="gpt-4o-mini", max_tokens=2000):
+    def __init__(self, model_name="gpt-4o-mini", max_tokens=2000, keep_recent=2, summary_budget=None):
+        """
+        Args:
+            model_name: LLM model to use
+            max_tokens: Context size that triggers summarization
+            keep_recent: Most recent steps always kept verbatim
+            summary_budget: Summary size that triggers re-compaction
+                            (default max_tokens // 2)
+        """
         super().__init__(model_name)
         self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.summary_budget = summary_budget or max_tokens // 2
+        self.summary_header = "Summary of earlier steps:\n"
+        self.summary_header_tokens = self.count_tokens(self.summary_header)
+        self._reset()
+    
+    def _reset(self):
         self.compressed_history = None
+        self.summary_tokens = 0
         self.last_summarized_step = 0
+        self.step_texts = []
+        self.step_tokens = []
+        self.summarized_count = 0
+        self.raw_tokens = 0
+        self.summary_calls = 0
+    
+    def ingest_steps(self, history):
+        """
+        Format and count tokens for steps not seen before.
+        
+        History is expected to grow by appending; a shorter history, or one
+        whose first or last known step differs, means a new run, so all state
+        is reset.
+        """
+        seen = len(self.step_texts)
+        if seen and (len(history) < seen
+                     or format_step(history[0]) != self.step_texts[0]
+                     or format_step(history[seen - 1]) != self.step_texts[-1]):
+            self._reset()
+        
+        for step_data in history[len(self.step_texts):]:
+            text = format_step(step_data)
+            tokens = self.count_tokens(text)
+            self.step_texts.append(text)
+            self.step_tokens.append(tokens)
+            self.raw_tokens += tokens
+    
+    def context_tokens(self):
+        """Summary and unsummarized step tokens, from cached counts; the summarization trigger ignores headers and separators."""
+        return self.summary_tokens + self.raw_tokens
+    
+    def _merge_into_summary(self, end):
+        """Fold unsummarized steps up to position `end` into the running summary."""
+        new_steps = "\n\n".join(self.step_texts[self.summarized_count:end])
+        
+        summary_prompt = f"""Update the running summary of an investigation with the new steps below. Preserve all key facts, names, times, locations, and evidence from both the current summary and the new steps. Be specific and retain important details.
+
+Current Summary:
+{self.compressed_history or "(none yet)"}
+
+New Investigation Steps:
+{new_steps}
+
+Updated Summary:"""
+        
+        self.compressed_history = llm_query(
+            prompt=summary_prompt,
+            temperature=0,
+            max_tokens=800
+        )
+        self.summary_calls += 1
+        self.summary_tokens = self.count_tokens(self.compressed_history)
+        self.raw_tokens -= sum(self.step_tokens[self.summarized_count:end])
+        self.summarized_count = end
+    
+    def _recompact_summary(self):
+        """Condense the running summary back under summary_budget."""
+        target_words = int(self.summary_budget * 0.6)
         
+        compact_prompt = f"""Condense the following investigation summary to at most about {target_words} words. Keep every name, time, location, and piece of evidence; drop repetition and narrative filler.
+
+Summary:
+{self.compressed_history}
+
+Condensed Summary:"""
+        
+        self.compressed_history = llm_query(
+            prompt=compact_prompt,
+            temperature=0,
+            max_tokens=self.summary_budget
+        )
+        self.summary_calls += 1
+        self.summary_tokens = self.count_tokens(self.compressed_history)
+    
     def process_history(self, history, query):
         """
-        Compress history if it exceeds max_tokens, otherwise use full history.
+        Return the running summary plus unsummarized steps, compressing only when
+        the context exceeds max_tokens.
         """
         if not history:
             return ""
         
-        # Build full history text
-        full_history = []
-        for step_data in history:
-            full_history.append(
-                f"Step {step_data['step']}: {step_data['action']}\n"
-                f"{step_data['observations']}\n"
-                f"Time: {step_data['time']}"
-            )
-        
-        history_text = "\n\n".join(full_history)
-        token_count = self.count_tokens(history_text)
+        self.ingest_steps(history)
         
-        # If under threshold, return as is
-        if token_count <= self.max_tokens:
-            return history_text
+        # Summarize everything except the most recent steps, but only steps not yet summarized
+        merge_end = max(len(self.step_texts) - self.keep_recent, self.summarized_count)
+        if self.context_tokens() > self.max_tokens and merge_end > self.summarized_count:
+            self._merge_into_summary(merge_end)
+            self.last_summarized_step = history[merge_end - 1]['step']
+            
+            if self.summary_tokens > self.summary_budget:
+                self._recompact_summary()
         
-        # Need to compress - check if we need a new summary
-        current_step = history[-1]['step']
+        parts = []
+        if self.compressed_history:
+            parts.append(self.summary_header + self.compressed_history)
+        parts.extend(self.step_texts[self.summarized_count:])
         
-        if self.compressed_history is None or current_step > self.last_summarized_step:
-            # Generate new summary
-            summary_prompt = f"""Summarize the following investigation steps concisely, preserving all key facts, names, times, locations, and evidence. Be specific and retain important details.
-
-Investigation Steps:
-{history_text}
-
-Summary:"""
-            
-            self.compressed_history = llm_query(
-                prompt=summary_prompt,
-                temperature=0,
-                max_tokens=800
-            )
-            self.last_summarized_step = current_step
+        # Cached counts: header + summary, unsummarized steps, and one separator per join
+        summary_part = self.summary_header_tokens + self.summary_tokens if self.compressed_history else 0
+        self.last_context_tokens = (summary_part + self.raw_tokens
+                                    + self.separator_tokens["\n\n"] * max(len(parts) - 1, 0))
         
-        return self.compressed_history
+        return "\n\n".join(parts)
 
 
 class WriteStrategy(ContextStrategy):
     """
     WRITE Strategy: Extract key facts into external scratchpad and retrieve from there.
-    Note: This is a simplified version that uses keyword matching instead of embeddings.
+    
+    The scratchpad is a ScratchpadStore: repeated facts are stored once, and
+    retrieval uses its BM25 and entity indexes instead of scoring every fact.
+    
+    New steps are extracted together: up to batch_size steps share one
+    structured (JSON) extraction call, and batches run concurrently, so
+    catching up after a burst of steps costs about one round-trip. Facts are
+    added to the scratchpad in step order.
     """
     
-    def __init__(self, model_name="gpt-4o-mini"):
+    def __init__(self, model_name="gpt-4o-mini", batch_size=8, max_workers=4, top_k=10, scratchpad_path=None):
+        """
+        Args:
+            model_name: LLM model to use
+            batch_size: Steps per extraction call (1 = one call per step)
+            max_workers: Extraction calls in flight at once
+            top_k: Facts placed in context per question
+            scratchpad_path: SQLite file to persist the scratchpad (None = in memory)
+        """
         super().__init__(model_name)
-        self.scratchpad = []  # List of extracted facts
-        self.processed_steps = set()
-        
+        self.scratchpad = ScratchpadStore(scratchpad_path)  # Deduplicated extracted facts
+        # Shared with the store, so steps already in a persisted scratchpad are not extracted again
+        self.processed_steps = self.scratchpad.processed_steps
+        self.top_k = top_k
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+        self.facts_header = "Key Facts:\n"
+        self.facts_header_tokens = self.count_tokens(self.facts_header)
+        self.fact_tokens = {}  # fact id -> token count
+        
+    def fact_token_count(self, fact):
+        """Token count of a stored fact, counted once."""
+        if fact["id"] not in self.fact_tokens:
+            self.fact_tokens[fact["id"]] = self.count_tokens(fact["text"])
+        return self.fact_tokens[fact["id"]]
+    
     def extract_key_facts(self, step_data):
         """
         Extract key facts from a single step using LLM.
         """
-        step_text = f"""Step {step_data['step']}: {step_data['action']}
-{step_data['observations']}
-Time: {step_data['time']}"""
+        step_text = format_step(step_data)
         
         extract_prompt = f"""Extract key facts from this investigation step. List each fact as a separate bullet point. Include names, times, locations, actions, and evidence.
 
@@ -209,23 +476,69 @@ Key Facts (one per line, be specific):"""
         )
         
         # Parse facts (each line is a fact)
-        facts = [line.strip() for line in facts_text.split('\n') if line.strip() and (line.strip().startswith('-') or line.strip().startswith('•') or line.strip()[0].isdigit())]
-        
-        return facts
+        return parse_fact_lines(facts_text)
     
-    def calculate_relevance(self, fact, query):
-        """Calculate relevance score based on keyword overlap."""
-        fact_lower = fact.lower()
-        query_words = query.lower().split()
+    def extract_key_facts_batch(self, steps):
+        """
+        Extract key facts from several steps with one LLM call.
         
-        # Count how many query words appear in fact
-        score = sum(1 for word in query_words if len(word) > 3 and word in fact_lower)
+        Steps the model leaves out of its JSON answer are extracted one by one.
+        
+        Returns:
+            List of fact lists, aligned with steps
+        """
+        if len(steps) == 1:
+            return [self.extract_key_facts(steps[0])]
+        
+        steps_text = "\n\n".join(format_step(step_data) for step_data in steps)
+        
+        extract_prompt = f"""Extract key facts from each of these investigation steps. Include names, times, locations, actions, and evidence; be specific.
+
+Respond with JSON only, in this form:
+{{"steps": [{{"step": <step number>, "facts": ["fact", "..."]}}]}}
+
+Steps:
+{steps_text}
+
+JSON:"""
         
-        # Boost score for exact phrases
-        if query.lower() in fact_lower:
-            score += 5
+        response = llm_query(
+            prompt=extract_prompt,
+            temperature=0,
+            max_tokens=300 * len(steps)
+        )
         
-        return score
+        facts_by_step = parse_batched_facts(response, [step_data['step'] for step_data in steps])
+        return [
+            facts_by_step[step_data['step']] if step_data['step'] in facts_by_step
+            else self.extract_key_facts(step_data)
+            for step_data in steps
+        ]
+    
+    def ingest_steps(self, history):
+        """
+        Extract facts from steps not processed yet, batched and concurrently.
+        """
+        new_steps = []
+        queued = set()
+        for step_data in history:
+            if step_data['step'] not in self.processed_steps and step_data['step'] not in queued:
+                new_steps.append(step_data)
+                queued.add(step_data['step'])
+        
+        batches = [new_steps[i:i+self.batch_size] for i in range(0, len(new_steps), self.batch_size)]
+        if len(batches) > 1 and self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                batch_facts = list(executor.map(self.extract_key_facts_batch, batches))
+        else:
+            batch_facts = [self.extract_key_facts_batch(batch) for batch in batches]
+        
+        # executor.map keeps batch order, so facts land in step order
+        for batch, facts_per_step in zip(batches, batch_facts):
+            for step_data, facts in zip(batch, facts_per_step):
+                added = self.scratchpad.add_facts(facts, step=step_data['step'], time=step_data.get('time'))
+                for fact_id in added:
+                    self.fact_token_count(self.scratchpad.facts[fact_id])
     
     def process_history(self, history, query):
         """
@@ -234,27 +547,428 @@ Key Facts (one per line, be specific):"""
         if not history:
             return ""
         
-        # Process any new steps
-        for step_data in history:
-            step_num = step_data['step']
-            if step_num not in self.processed_steps:
-                facts = self.extract_key_facts(step_data)
-                self.scratchpad.extend(facts)
-                self.processed_steps.add(step_num)
-        
-        # Now retrieve relevant facts for the query using keyword matching
-        if not self.scratchpad:
+        self.ingest_steps(history)
+        
+        # Now retrieve relevant facts for the query from the scratchpad indexes
+        if not len(self.scratchpad):
+            return ""
+        
+        relevant = self.scratchpad.search(query, self.top_k)
+        self.last_context_tokens = self.facts_header_tokens + self.joined_tokens(
+            [self.fact_token_count(fact) for fact in relevant], separator="\n"
+        )
+        
+        return self.facts_header + "\n".join(fact["text"] for fact in relevant)
+
+
+class HybridStrategy(ContextStrategy):
+    """
+    HYBRID Strategy: Fill a fixed token budget from all memory sources.
+    
+    Candidates come from four sources: a window of recent steps, steps
+    retrieved for the question (BM25), the rolling COMPRESS summary and WRITE
+    scratchpad facts. Each candidate gets a utility (source weight x
+    relevance) and candidates are taken greedily by utility per token until
+    the budget is full, so prompt size stays constant as history grows.
+    
+    Source weights are measured online: record_feedback() after each judged
+    answer raises the weights of the sources that were in context when the
+    answer was correct and lowers them when it was wrong.
+    """
+    
+    SOURCES = ("recent", "retrieved", "summary", "facts")
+    
+    def __init__(self, model_name="gpt-4o-mini", token_budget=1500, recent_window=5, retrieve_k=10,
+                 fact_k=20, source_weights=None, learning_rate=0.1):
+        """
+        Args:
+            model_name: LLM model to use
+            token_budget: Maximum context tokens
+            recent_window: Most recent steps considered as candidates
+            retrieve_k: Steps retrieved per question as candidates
+            fact_k: Scratchpad facts retrieved per question as candidates
+            source_weights: Initial weight per source (see SOURCES)
+            learning_rate: Multiplicative step of the feedback update
+        """
+        super().__init__(model_name)
+        self.token_budget = token_budget
+        self.recent_window = recent_window
+        self.retrieve_k = retrieve_k
+        self.fact_k = fact_k
+        self.learning_rate = learning_rate
+        self.source_weights = {"recent": 1.0, "retrieved": 1.0, "summary": 0.6, "facts": 0.8}
+        self.source_weights.update(source_weights or {})
+        
+        # Sub-strategies own the per-source state; COMPRESS formats and counts each
+        # step once and the SELECT index is fed from its cached texts and counts
+        self.select = SelectStrategy(model_name, top_k=retrieve_k)
+        self.compress = CompressStrategy(model_name, max_tokens=token_budget, summary_budget=token_budget // 3)
+        self.write = WriteStrategy(model_name, top_k=fact_k)
+        
+        self.summary_header = self.compress.summary_header
+        self.facts_header = self.write.facts_header
+        self.header_tokens = {
+            "summary": self.compress.summary_header_tokens,
+            "facts": self.write.facts_header_tokens
+        }
+        self.last_allocation = {}
+    
+    def candidates(self, history, query):
+        """
+        Gather candidate context items with utility and token cost.
+        
+        Returns:
+            List of dicts with source, key, text, tokens and utility
+        """
+        self.compress.process_history(history, query)
+        self.select.sync_steps(self.compress.step_texts, self.compress.step_tokens)
+        self.write.ingest_steps(history)
+        
+        step_texts = self.compress.step_texts
+        step_tokens = self.compress.step_tokens
+        weights = self.source_weights
+        # Each item is charged the separator that joins it to the rest of the context
+        part_sep = self.separator_tokens["\n\n"]
+        fact_sep = self.separator_tokens["\n"]
+        items = {}
+        
+        def offer(item):
+            # A step offered by two sources is kept once, with the higher utility
+            if item["key"] not in items or items[item["key"]]["utility"] < item["utility"]:
+                items[item["key"]] = item
+        
+        for age, position in enumerate(range(len(step_texts) - 1, max(len(step_texts) - 1 - self.recent_window, -1), -1)):
+            offer({"source": "recent", "key": ("step", position), "text": step_texts[position],
+                   "tokens": step_tokens[position] + part_sep, "utility": weights["recent"] * 0.8 ** age})
+        
+        hits = self.select.index.search(query, self.retrieve_k)
+        if hits:
+            top_score = hits[0][1]
+            for position, score in hits:
+                offer({"source": "retrieved", "key": ("step", position), "text": step_texts[position],
+                       "tokens": step_tokens[position] + part_sep, "utility": weights["retrieved"] * score / top_score})
+        
+        if self.compress.compressed_history:
+            offer({"source": "summary", "key": ("summary",), "text": self.compress.compressed_history,
+                   "tokens": self.compress.summary_tokens + self.header_tokens["summary"] + part_sep,
+                   "utility": weights["summary"] * 2.0})
+        
+        for rank, fact in enumerate(self.write.scratchpad.search(query, self.fact_k)):
+            offer({"source": "facts", "key": ("fact", fact["id"]), "text": fact["text"],
+                   "tokens": self.write.fact_token_count(fact) + fact_sep, "utility": weights["facts"] / (1 + rank)})
+        
+        return list(items.values())
+    
+    def allocate(self, candidates):
+        """
+        Greedily pick candidates by utility per token within token_budget.
+        
+        The facts header (and the separator before the facts block) is charged
+        with the first fact taken.
+        """
+        chosen = []
+        used = 0
+        for item in sorted(candidates, key=lambda c: c["utility"] / max(c["tokens"], 1), reverse=True):
+            cost = item["tokens"]
+            if item["source"] == "facts" and not any(c["source"] == "facts" for c in chosen):
+                cost += self.header_tokens["facts"] + self.separator_tokens["\n\n"]
+            if used + cost <= self.token_budget:
+                chosen.append(item)
+                used += cost
+        return chosen, used
+    
+    def process_history(self, history, query):
+        """
+        Build a context of at most token_budget tokens from all sources.
+        
+        Order: summary, key facts, then steps in chronological order.
+        """
+        if not history:
+            return ""
+        
+        chosen, used = self.allocate(self.candidates(history, query))
+        self.last_allocation = {
+            source: sum(item["tokens"] for item in chosen if item["source"] == source)
+            for source in self.SOURCES
+        }
+        self.last_allocation["total"] = used
+        
+        parts = []
+        part_tokens = []
+        summary = [item for item in chosen if item["source"] == "summary"]
+        if summary:
+            parts.append(self.summary_header + summary[0]["text"])
+            part_tokens.append(self.header_tokens["summary"] + self.compress.summary_tokens)
+        
+        facts = [item for item in chosen if item["source"] == "facts"]
+        if facts:
+            parts.append(self.facts_header + "\n".join(item["text"] for item in facts))
+            part_tokens.append(self.header_tokens["facts"] + self.joined_tokens(
+                [item["tokens"] - self.separator_tokens["\n"] for item in facts], separator="\n"
+            ))
+        
+        steps = sorted((item for item in chosen if item["key"][0] == "step"), key=lambda item: item["key"][1])
+        parts.extend(item["text"] for item in steps)
+        part_tokens.extend(self.compress.step_tokens[item["key"][1]] for item in steps)
+        
+        self.last_context_tokens = self.joined_tokens(part_tokens)
+        return "\n\n".join(parts)
+    
+    def record_feedback(self, is_correct):
+        """
+        Update source weights from the judged correctness of the last answer.
+        
+        Only sources that contributed tokens to the last context are updated.
+        """
+        factor = 1 + self.learning_rate if is_correct else 1 - self.learning_rate
+        for source in self.SOURCES:
+            if self.last_allocation.get(source):
+                self.source_weights[source] = min(max(self.source_weights[source] * factor, 0.1), 10.0)
+
+
+class TieredStrategy(ContextStrategy):
+    """
+    TIERED Strategy: Assemble context from working, episodic and archival memory.
+    
+    Steps go into a TieredMemory as they arrive: recent steps stay verbatim in
+    a small working set, every block_size steps are summarized into an episodic
+    block, and everything is archived to SQLite with a full-text index. Each
+    question recalls from all tiers, so RAM use and assembly time stay bounded
+    however long the scenario runs.
+    """
+    
+    def __init__(self, model_name="gpt-4o-mini", working_size=8, block_size=10, episodic_size=32,
+                 recall_k=4, recent_steps=2, archive_path=None, llm_summaries=True):
+        """
+        Args:
+            model_name: LLM model to use
+            working_size: Steps kept verbatim in RAM
+            block_size: Steps per episodic summary block
+            episodic_size: Episodic blocks kept in RAM
+            recall_k: Items recalled per tier per question
+            recent_steps: Latest steps always placed in context
+            archive_path: SQLite file for the archival tier (default: temporary)
+            llm_summaries: Summarize blocks with the LLM (False = first line of each step)
+        """
+        super().__init__(model_name)
+        self.recall_k = recall_k
+        self.recent_steps = recent_steps
+        self.memory_options = {
+            "path": archive_path,
+            "working_size": working_size,
+            "block_size": block_size,
+            "episodic_size": episodic_size,
+            "summarize_fn": self.summarize_block if llm_summaries else None
+        }
+        self.memory = TieredMemory(**self.memory_options)
+        self.recent = []
+        self.step_tokens = []
+        self.block_tokens = {}  # block id -> summary token count
+    
+    def summarize_block(self, step_texts):
+        """Summarize one block of consecutive steps for the episodic tier."""
+        block_text = "\n\n".join(step_texts)
+        
+        summary_prompt = f"""Summarize the following investigation steps in a few sentences, preserving all names, times, locations, and evidence.
+
+Investigation Steps:
+{block_text}
+
+Summary:"""
+        
+        return llm_query(
+            prompt=summary_prompt,
+            temperature=0,
+            max_tokens=200
+        )
+    
+    def ingest_steps(self, history):
+        """Add steps not seen before; a shorter history starts a new memory."""
+        if len(history) < self.memory.num_steps:
+            self.memory.close()
+            self.memory = TieredMemory(**self.memory_options)
+            self.recent = []
+            self.step_tokens = []
+            self.block_tokens = {}
+        
+        for position in range(self.memory.num_steps, len(history)):
+            text = format_step(history[position])
+            self.memory.add_step(position, text)
+            self.step_tokens.append(self.count_tokens(text))
+            self.recent = (self.recent + [(position, text)])[-self.recent_steps:] if self.recent_steps else []
+    
+    def process_history(self, history, query):
+        """
+        Recall from every tier and order the result: episode summaries first,
+        then steps chronologically.
+        """
+        if not history:
+            return ""
+        
+        self.ingest_steps(history)
+        recalled = self.memory.recall(query, self.recall_k)
+        
+        blocks = sorted(recalled["episodic"], key=lambda block: block["first_step"])
+        labelled = [(f"Summary of steps {block['first_step'] + 1}-{block['last_step'] + 1}:\n", block) for block in blocks]
+        labelled += [("Archived summary:\n", item) for item in recalled["archival"] if item["kind"] == "block"]
+        
+        steps = dict(self.recent)
+        for item in recalled["working"] + [item for item in recalled["archival"] if item["kind"] == "step"]:
+            steps[item["key"]] = item["text"]
+        
+        # Summaries are counted once per block; only the short labels are encoded per question
+        part_tokens = []
+        for label, block in labelled:
+            if block["key"] not in self.block_tokens:
+                self.block_tokens[block["key"]] = self.count_tokens(block["text"])
+            part_tokens.append(self.count_tokens(label) + self.block_tokens[block["key"]])
+        part_tokens.extend(self.step_tokens[position] for position in sorted(steps))
+        self.last_context_tokens = self.joined_tokens(part_tokens)
+        
+        parts = [label + block["text"] for label, block in labelled] + [steps[position] for position in sorted(steps)]
+        return "\n\n".join(parts)
+    
+    def answer_question(self, history, query):
+        """
+        Answer and report tier_metrics for this answer only: the lookups, hits,
+        hit rate and seconds of its recall, plus each tier's current size.
+        """
+        # Ingest first so a reset to a new memory happens before the snapshot
+        self.ingest_steps(history)
+        before = self.memory.snapshot()
+        result = super().answer_question(history, query)
+        result["tier_metrics"] = self.memory.metrics(since=before)
+        return result
+    
+    def close(self):
+        """Close the archive; a temporary archive file is deleted."""
+        self.memory.close()
+    
+    def __del__(self):
+        if getattr(self, "memory", None) is not None:
+            self.memory.close()
+
+
+class IsolateStrategy(ContextStrategy):
+    """
+    ISOLATE Strategy: Map-reduce over history shards with isolated sub-queries.
+    
+    History is packed into consecutive shards of at most shard_tokens tokens.
+    Each shard is asked the question in its own small prompt, concurrently;
+    shards without the answer reply NOT FOUND. The remaining partial answers,
+    labelled with their step ranges, become the context of the final answer.
+    """
+    
+    NOT_FOUND = "NOT FOUND"
+    
+    def __init__(self, model_name="gpt-4o-mini", shard_tokens=1500, max_workers=8):
+        """
+        Args:
+            model_name: LLM model to use
+            shard_tokens: Maximum history tokens per shard
+            max_workers: Shard sub-queries in flight at once
+        """
+        super().__init__(model_name)
+        self.shard_tokens = shard_tokens
+        self.max_workers = max_workers
+        self._reset()
+    
+    def _reset(self):
+        self.step_texts = []
+        # Each shard: [first position, end position, tokens]; only the last one grows
+        self.shards = []
+        self.last_map = {}
+    
+    def ingest_steps(self, history):
+        """
+        Format, count and assign new steps to shards.
+        
+        Shards are packed in arrival order, so earlier shard boundaries never
+        move as history grows.
+        """
+        if len(history) < len(self.step_texts):
+            self._reset()
+        
+        for step_data in history[len(self.step_texts):]:
+            text = format_step(step_data)
+            tokens = self.count_tokens(text)
+            position = len(self.step_texts)
+            self.step_texts.append(text)
+            
+            if self.shards and self.shards[-1][2] + tokens <= self.shard_tokens:
+                self.shards[-1][1] = position + 1
+                self.shards[-1][2] += tokens
+            else:
+                self.shards.append([position, position + 1, tokens])
+    
+    def query_shard(self, shard, query):
+        """Ask the question of one shard in isolation."""
+        start, end, _ = shard
+        shard_text = "\n\n".join(self.step_texts[start:end])
+        
+        shard_prompt = f"""Answer the question using only the investigation steps below. If they do not contain the answer, reply exactly {self.NOT_FOUND}.
+
+Steps:
+{shard_text}
+
+Question: {query}
+
+Answer (be brief and specific):"""
+        
+        return llm_query(
+            prompt=shard_prompt,
+            temperature=0,
+            max_tokens=100
+        )
+    
+    def is_not_found(self, answer):
+        """
+        True if a shard had nothing to report.
+        
+        Only an empty answer or a reply of exactly NOT FOUND (any case, optional
+        trailing period) counts; answers that merely contain the phrase, like
+        "the weapon was not found at the scene", are kept.
+        """
+        return not answer or answer.strip().upper().rstrip(".") == self.NOT_FOUND
+    
+    def process_history(self, history, query):
+        """
+        Query every shard concurrently and return the partial answers as context.
+        """
+        if not history:
             return ""
         
-        # Score all facts
-        facts_with_scores = [(fact, self.calculate_relevance(fact, query)) for fact in self.scratchpad]
+        self.ingest_steps(history)
+        
+        start_time = time.time()
+        workers = max(1, min(self.max_workers, len(self.shards)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            partials = list(executor.map(lambda shard: self.query_shard(shard, query), self.shards))
+        
+        findings = [
+            f"[Steps {start + 1}-{end}] {answer.strip()}"
+            for (start, end, _), answer in zip(self.shards, partials)
+            if not self.is_not_found(answer)
+        ]
+        self.last_map = {
+            "num_shards": len(self.shards),
+            "shards_with_findings": len(findings),
+            "map_seconds": round(time.time() - start_time, 2),
+            "map_context_tokens": sum(shard[2] for shard in self.shards),
+            "max_shard_tokens": max(shard[2] for shard in self.shards)
+        }
         
-        # Sort by relevance and take top 10
-        facts_with_scores.sort(key=lambda x: x[1], reverse=True)
-        top_k = min(10, len(self.scratchpad))
-        relevant_facts = [fact for fact, score in facts_with_scores[:top_k]]
+        if not findings:
+            return "No part of the history contains information relevant to the question."
         
-        return "Key Facts:\n" + "\n".join(relevant_facts)
+        return ("Findings from separate parts of the history (later steps override earlier ones):\n"
+                + "\n".join(findings))
+    
+    def answer_question(self, history, query):
+        """Reduce the shard findings to one answer and report map statistics."""
+        result = super().answer_question(history, query)
+        result.update(self.last_map)
+        return result
 
 
 def create_strategy(strategy_name, model_name="gpt-4o-mini", **kwargs):
@@ -262,9 +976,10 @@ def create_strategy(strategy_name, model_name="gpt-4o-mini", **kwargs):
     Factory function to create strategy instances.
     
     Args:
-        strategy_name: "select", "compress", or "write"
+        strategy_name: "select", "compress", "write", "hybrid", "tiered", or "isolate"
         model_name: LLM model to use
         **kwargs: Additional strategy-specific parameters
+                  (e.g. create_strategy("select", retrieval="dense"))
         
     Returns:
         Strategy instance
@@ -272,7 +987,10 @@ def create_strategy(strategy_name, model_name="gpt-4o-mini", **kwargs):
     strategies = {
         "select": SelectStrategy,
         "compress": CompressStrategy,
-        "write": WriteStrategy
+        "write": WriteStrategy,
+        "hybrid": HybridStrategy,
+        "tiered": TieredStrategy,
+        "isolate": IsolateStrategy
     }
     
     if strategy_name.lower() not in strategies:
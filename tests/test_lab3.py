@@ -0,0 +1,661 @@
+"""
+Unit tests for Lab 3 retrieval components that run without API access.
+Run with: pytest tests/test_lab3.py -v
+"""
+
+import pytest
+
+
+class TestChunkStore:
+    """Test the persistent chunk store"""
+
+    def test_fixed_window_spans(self):
+        """Test that windows overlap and cover the whole document"""
+        from lab3.chunk_store import fixed_window_spans
+
+        assert fixed_window_spans(25, 10, 3) == [(0, 10), (7, 17), (14, 24), (21, 25)]
+        assert fixed_window_spans(0, 10, 3) == []
+
+    def test_store_roundtrip(self, tmp_path):
+        """Test that entries persist between store instances"""
+        from lab3.chunk_store import ChunkStore, content_hash
+
+        path = str(tmp_path / "chunks.json")
+        config = ChunkStore.config_key(500, 50, "cl100k_base")
+        key = ChunkStore.make_key(content_hash("some text"), config)
+
+        store = ChunkStore(path)
+        store.put(key, config, 2, [[0, 2, 0, 9]])
+        store.save()
+
+        reloaded = ChunkStore(path)
+        assert key in reloaded
+        assert reloaded.get(key)["spans"] == [[0, 2, 0, 9]]
+
+    def test_retain_only_prunes_same_config(self):
+        """Test that pruning leaves entries from other configurations alone"""
+        from lab3.chunk_store import ChunkStore
+
+        store = ChunkStore()
+        store.put("a:cfg1", "cfg1", 1, [])
+        store.put("b:cfg1", "cfg1", 1, [])
+        store.put("a:cfg2", "cfg2", 1, [])
+
+        removed = store.retain(["a:cfg1"], "cfg1")
+
+        assert removed == 1
+        assert "b:cfg1" not in store
+        assert "a:cfg2" in store
+
+
+class TestVectorIndex:
+    """Test the NumPy exact vector index"""
+
+    def test_search_returns_nearest_first(self):
+        """Test batched top-k search ordering"""
+        import numpy as np
+        from lab3.vector_index import NumpyIndex
+
+        index = NumpyIndex()
+        index.upsert(["x", "y", "xy"], np.array([[1, 0], [0, 1], [1, 1]]), ["h1", "h2", "h3"])
+
+        results = index.search(np.array([[1, 0.1], [0, 1]]), k=2)
+
+        assert [item_id for item_id, _ in results[0]] == ["x", "xy"]
+        assert [item_id for item_id, _ in results[1]] == ["y", "xy"]
+        assert results[1][0][1] == pytest.approx(1.0)
+
+    def test_upsert_replaces_and_delete_removes(self):
+        """Test that upserting an existing id overwrites it"""
+        import numpy as np
+        from lab3.vector_index import NumpyIndex
+
+        index = NumpyIndex()
+        index.upsert(["a", "b"], np.array([[1, 0], [0, 1]]), ["h1", "h2"])
+        index.upsert(["a"], np.array([[0, 1]]), ["h3"])
+        index.delete(["b"])
+
+        assert len(index) == 1
+        assert index.stored_hashes() == {"a": "h3"}
+        assert index.search(np.array([[0, 1]]), k=5)[0][0][0] == "a"
+
+    def test_rows_stay_aligned_across_batches(self):
+        """Test that ids added in one batch can be updated by a later batch"""
+        import numpy as np
+        from lab3.vector_index import NumpyIndex
+
+        index = NumpyIndex()
+        index.upsert(["a", "b", "c"], np.array([[1, 0], [0, 1], [1, 1]]), ["h1", "h2", "h3"])
+        index.upsert(["c", "d", "d"], np.array([[-1, 0], [1, 1], [0, -1]]), ["h4", "h5", "h6"])
+
+        assert len(index) == 4
+        assert [index.id_to_row[item_id] for item_id in "abcd"] == [0, 1, 2, 3]
+        assert index.search(np.array([[-1, 0], [0, -1]]), k=1) == [[("c", pytest.approx(1.0))],
+                                                                   [("d", pytest.approx(1.0))]]
+
+    def test_unknown_backend(self):
+        """Test that the factory rejects unknown backends"""
+        from lab3.vector_index import create_index
+
+        with pytest.raises(ValueError, match="Unknown index backend"):
+            create_index("faiss")
+
+
+class TestEmbeddingStore:
+    """Test the memory-mapped embedding cache"""
+
+    @pytest.mark.parametrize("dtype,tolerance", [("float32", 0.0), ("float16", 1e-3), ("int8", 2e-2)])
+    def test_roundtrip_after_reload(self, tmp_path, dtype, tolerance):
+        """Test that flushed embeddings are reloaded within quantization error"""
+        import numpy as np
+        from lab3.embedding_store import EmbeddingStore
+
+        vectors = np.random.RandomState(0).uniform(-1, 1, size=(4, 16)).astype(np.float32)
+        store = EmbeddingStore(str(tmp_path), "test-model", dtype=dtype)
+        store.add(["a", "b", "c", "d"], vectors)
+        store.flush()
+
+        reloaded = EmbeddingStore(str(tmp_path), "test-model", dtype=dtype)
+
+        assert len(reloaded) == 4
+        assert np.abs(reloaded.get(["c", "a"]) - vectors[[2, 0]]).max() <= tolerance
+
+    def test_cached_embedder_skips_known_texts(self, tmp_path):
+        """Test that only unseen texts reach the underlying embedder"""
+        import numpy as np
+        from lab3.embedding_store import CachedEmbedder, EmbeddingStore
+
+        class CountingEmbedder:
+            model_name = "test-model"
+            backend = "test"
+            seen = []
+
+            def embed(self, texts):
+                self.seen.extend(texts)
+                return np.ones((len(texts), 4), dtype=np.float32)
+
+        embedder = CountingEmbedder()
+        cached = CachedEmbedder(embedder, EmbeddingStore(str(tmp_path), "test-model"))
+        cached.embed(["one", "two", "one"])
+        cached.embed(["two", "three"])
+
+        assert embedder.seen == ["one", "two", "three"]
+        assert (cached.hits, cached.misses) == (2, 3)
+
+
+class TestBM25:
+    """Test lexical retrieval and rank fusion"""
+
+    def test_tokenize_keeps_versions_and_numbers(self):
+        """Test that fact-like tokens survive tokenization"""
+        from lab3.bm25 import tokenize
+
+        assert tokenize("What is TLS 1.3 and $7.25?") == ["tls", "1.3", "7.25"]
+
+    def test_exact_term_ranks_first(self):
+        """Test that the document containing the rare query term wins"""
+        from lab3.bm25 import BM25Index
+
+        index = BM25Index()
+        index.build(
+            ["a", "b", "c"],
+            ["kubernetes pods are deployable units", "pods of whales", "unrelated text"]
+        )
+
+        results = index.search("smallest deployable unit in kubernetes", k=5)
+
+        assert results[0][0] == "a"
+        assert "c" not in [item_id for item_id, _ in results]
+
+    def test_batch_matches_single_queries(self):
+        """Test that scores from one query in a batch do not leak into the next"""
+        from lab3.bm25 import BM25Index
+
+        index = BM25Index()
+        index.build(
+            ["a", "b", "c"],
+            ["kubernetes pods are deployable units", "pods of whales", "unrelated text"]
+        )
+        queries = ["kubernetes pods", "whales", "no match here", "pods", "unrelated whales"]
+
+        batch = index.search_batch(queries, k=2)
+
+        assert batch == [index.search(query, k=2) for query in queries]
+        assert batch[2] == []
+        assert [item_id for item_id, _ in batch[1]] == ["b"]
+
+    def test_reciprocal_rank_fusion(self):
+        """Test that items ranked well by both lists come first"""
+        from lab3.bm25 import reciprocal_rank_fusion
+
+        fused = reciprocal_rank_fusion(
+            [[("x", 0.9), ("y", 0.8)], [("y", 12.0), ("z", 3.0)]], k=2
+        )
+
+        assert [item_id for item_id, _ in fused] == ["y", "x"]
+
+    def test_recall_at_k(self):
+        """Test recall against relevant documents"""
+        from lab3.retrieval_eval import recall_at_k
+
+        assert recall_at_k([["d1", "d2"], ["d3"]], ["d2", "d4"]) == 0.5
+
+
+    def test_ranking_metrics(self):
+        """Test recall, MRR and nDCG at several cutoffs"""
+        import numpy as np
+        from lab3.retrieval_eval import first_relevant_ranks, ranking_metrics
+
+        ranks = first_relevant_ranks([["d1", "d2"], ["d3", "d4"], ["d5"]], ["d1", "d4", "d9"])
+        metrics = ranking_metrics(ranks, [1, 2])
+
+        assert list(ranks) == [1, 2, 0]
+        assert metrics[1]["recall"] == pytest.approx(1 / 3)
+        assert metrics[2]["recall"] == pytest.approx(2 / 3)
+        assert metrics[2]["mrr"] == pytest.approx((1 + 0.5) / 3)
+        assert metrics[2]["ndcg"] == pytest.approx((1 + 1 / np.log2(3)) / 3)
+
+
+class TestCorpusGenerator:
+    """Test the synthetic corpus generator"""
+
+    def test_seeded_output_is_deterministic(self, tmp_path):
+        """Test that the same seed writes identical files"""
+        from lab3.generate_corpus import generate_corpus
+
+        generate_corpus(str(tmp_path / "a"), num_documents=300, num_questions=20, seed=7, progress_every=0)
+        generate_corpus(str(tmp_path / "b"), num_documents=300, num_questions=20, seed=7, progress_every=0)
+
+        for name in ("documents.jsonl", "questions.jsonl"):
+            assert (tmp_path / "a" / name).read_text() == (tmp_path / "b" / name).read_text()
+
+    def test_counts_and_answers(self, tmp_path):
+        """Test document counts and that each answer appears in its relevant document"""
+        from lab3.generate_corpus import generate_corpus, load_corpus
+
+        manifest = generate_corpus(
+            str(tmp_path), num_documents=520, num_questions=50, distractor_ratio=0.2, progress_every=0
+        )
+        documents, questions = load_corpus(str(tmp_path))
+
+        assert len(documents) == manifest["num_documents"] == 520
+        assert manifest["documents_by_kind"] == {"base": 20, "fact": 400, "distractor": 100}
+        assert len({doc["id"] for doc in documents}) == 520
+        assert len([q for q in questions if q["id"].startswith("syn_")]) == 50
+
+        by_id = {doc["id"]: doc for doc in documents}
+        for question in questions:
+            if question["id"].startswith("syn_"):
+                assert question["expected_answer"] in by_id[question["relevant_doc"]]["content"]
+
+    def test_limit_keeps_questions_in_prefix(self, tmp_path):
+        """Test that loading a prefix drops questions about later documents"""
+        from lab3.generate_corpus import generate_corpus, load_corpus
+
+        generate_corpus(str(tmp_path), num_documents=1000, num_questions=100, progress_every=0)
+        documents, questions = load_corpus(str(tmp_path), limit=200)
+
+        doc_ids = {doc["id"] for doc in documents}
+        assert len(documents) == 200
+        assert questions and all(q["relevant_doc"] in doc_ids for q in questions)
+
+
+class TestContextPacker:
+    """Test token-budgeted context packing"""
+
+    @staticmethod
+    def _chunks(text, size, step, doc_id="doc"):
+        """Character-level chunks, treating one character as one token"""
+        return [
+            {
+                "chunk_id": f"{doc_id}_{start}", "doc_id": doc_id, "text": text[start:start + size],
+                "token_start": start, "token_end": min(start + size, len(text)),
+                "char_start": start, "char_end": min(start + size, len(text)), "score": 0.0
+            }
+            for start in range(0, len(text), step)
+        ]
+
+    def test_merges_overlapping_chunks(self):
+        """Test that overlapping chunks of one document become one span"""
+        from lab3.context_packer import pack_context
+
+        text = "abcdefghijklmnopqrstuvwxyz" * 2
+        chunks = self._chunks(text, 20, 15)
+        for chunk, score in zip(chunks, [0.9, 0.8, 0.1, 0.0]):
+            chunk["score"] = score
+
+        packed = pack_context(chunks[:2], token_budget=100, segment_overhead=5)
+
+        assert len(packed["segments"]) == 1
+        assert packed["segments"][0]["text"] == text[:35]
+        assert packed["tokens"] == 35 + 5
+        assert packed["segments"][0]["chunk_ids"] == ["doc_0", "doc_15"]
+
+    def test_drops_duplicates_and_truncates_tail(self):
+        """Test dedupe of covered chunks and truncation of the first chunk that does not fit"""
+        from lab3.context_packer import pack_context
+
+        a = {"chunk_id": "a", "text": "x" * 50, "token_count": 50, "score": 3.0}
+        copy = {"chunk_id": "copy", "text": "x" * 50, "token_count": 50, "score": 2.0}
+        b = {"chunk_id": "b", "text": "y" * 50, "token_count": 50, "score": 1.0}
+
+        packed = pack_context([b, copy, a], token_budget=80, segment_overhead=0)
+
+        assert [segment["chunk_ids"] for segment in packed["segments"]] == [["a"], ["b"]]
+        assert packed["duplicates"] == 1
+        assert packed["truncated"]
+        assert packed["tokens"] == 80
+        assert packed["segments"][1]["text"] == "y" * 30
+
+    def test_merge_that_does_not_fit_is_skipped(self):
+        """Test that a lower-scored chunk still fills the budget after a merge is rejected"""
+        from lab3.context_packer import pack_context
+
+        text = "0123456789" * 10
+        first, wide = self._chunks(text, 60, 40)[:2]
+        first["score"], wide["score"] = 3.0, 2.0
+        small = {"chunk_id": "small", "text": "s" * 20, "token_count": 20, "score": 1.0}
+
+        packed = pack_context([first, wide, small], token_budget=90, segment_overhead=0)
+
+        assert [segment["chunk_ids"] for segment in packed["segments"]] == [["doc_0"], ["small"]]
+        assert packed["tokens"] == 80
+        assert not packed["truncated"]
+
+    def test_contained_chunk_is_skipped(self):
+        """Test that a chunk inside an already selected span costs nothing"""
+        from lab3.context_packer import pack_context
+
+        text = "0123456789" * 5
+        outer = self._chunks(text, 40, 40)[0]
+        outer["score"] = 1.0
+        inner = dict(outer, chunk_id="inner", text=text[5:15], token_start=5, token_end=15,
+                     char_start=5, char_end=15, score=0.5)
+
+        packed = pack_context([outer, inner], token_budget=100, segment_overhead=0)
+
+        assert packed["tokens"] == 40
+        assert packed["duplicates"] == 1
+
+
+class TestReranker:
+    """Test the rerank stage with the lexical fallback"""
+
+    def test_lexical_overlap_prefers_query_phrasing(self):
+        """Test that passages covering more of the query score higher"""
+        from lab3.reranker import lexical_overlap_scores
+
+        scores = lexical_overlap_scores(
+            "federal minimum wage",
+            ["The federal minimum wage is $7.25.", "Minimum standards are federal.", "Unrelated text."]
+        )
+
+        assert scores[0] > scores[1] > scores[2] == 0
+
+    def test_rerank_batch_keeps_top_k(self):
+        """Test that reranking reorders candidates and keeps first-stage scores"""
+        from lab3.reranker import Reranker
+
+        reranker = Reranker(backend="lexical")
+        candidates = [[
+            {"chunk_id": "a", "text": "sleep and melatonin", "score": 0.9},
+            {"chunk_id": "b", "text": "copyright lasts 70 years after the author", "score": 0.5},
+            {"chunk_id": "c", "text": "patents last 20 years", "score": 0.4}
+        ]]
+
+        results = reranker.rerank_batch(["how long does copyright last"], candidates, k=2)
+
+        assert [chunk["chunk_id"] for chunk in results[0]] == ["b", "c"]
+        assert results[0][0]["retrieval_score"] == 0.5
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend is rejected"""
+        from lab3.reranker import Reranker
+
+        with pytest.raises(ValueError):
+            Reranker(backend="gpu")
+
+
+class TestChunkingStrategies:
+    """Test the structure-aware chunking strategies"""
+
+    def test_boundary_tokens(self):
+        """Test that sentence boundaries map to the token after the punctuation"""
+        from lab3.chunking import SENTENCE_BOUNDARY, boundary_tokens
+
+        text = "One two. Three four! Five."
+        # Word-level tokens: "One", " two.", " Three", " four!", " Five."
+        offsets = [0, 3, 8, 14, 20]
+
+        assert boundary_tokens(text, offsets, SENTENCE_BOUNDARY) == [2, 4]
+
+    def test_sentence_spans_keep_sentences_whole(self):
+        """Test that chunks end on sentence boundaries and respect chunk_size"""
+        from lab3.chunking import sentence_spans
+
+        # Sentences of 4, 3, 5 and 2 tokens
+        spans = sentence_spans(14, [4, 7, 12], chunk_size=8, overlap=0)
+
+        assert spans == [(0, 7), (7, 14)]
+
+    def test_sentence_overlap_repeats_whole_sentences(self):
+        """Test that overlap carries whole trailing sentences only"""
+        from lab3.chunking import sentence_spans
+
+        spans = sentence_spans(14, [4, 7, 12], chunk_size=8, overlap=3)
+
+        assert spans == [(0, 7), (4, 12), (12, 14)]
+
+    def test_long_sentence_is_windowed(self):
+        """Test that a sentence longer than a chunk is split into windows"""
+        from lab3.chunking import sentence_spans
+
+        assert sentence_spans(20, [], chunk_size=8) == [(0, 8), (8, 16), (16, 20)]
+
+    def test_recursive_prefers_paragraphs(self):
+        """Test that recursive splitting keeps paragraphs whole when they fit"""
+        from lab3.chunking import recursive_spans
+
+        paragraphs = [6]
+        sentences = [3, 6, 9]
+        spans = recursive_spans(12, [paragraphs, [], sentences, []], chunk_size=6)
+
+        assert spans == [(0, 6), (6, 12)]
+
+    def test_parent_child_nesting(self):
+        """Test that child spans lie inside their parent span"""
+        from lab3.chunking import parent_child_spans
+
+        spans = parent_child_spans(16, [4, 8, 12], chunk_size=8, child_size=4)
+
+        assert [span[2:] for span in spans] == [(0, 8), (0, 8), (8, 16), (8, 16)]
+        assert all(parent_start <= start < end <= parent_end
+                   for start, end, parent_start, parent_end in spans)
+
+
+class TestRAGSystem:
+    """Test incremental indexing in RAGSystem"""
+
+    def test_only_changed_chunks_are_reembedded(self):
+        """Test that unchanged chunks are skipped and a new embedding model re-embeds all"""
+        import numpy as np
+        from lab3.experiment import RAGSystem
+
+        class CountingEmbedder:
+            backend = "test"
+
+            def __init__(self, model_name):
+                self.model_name = model_name
+                self.seen = []
+
+            def embed(self, texts):
+                self.seen.extend(texts)
+                return np.ones((len(texts), 4), dtype=np.float32)
+
+            def flush(self):
+                pass
+
+        chunks = [
+            {"chunk_id": f"doc_{i}", "doc_id": "doc", "text": f"chunk text {i}", "chunk_index": i, "token_count": 3}
+            for i in range(3)
+        ]
+        rag = RAGSystem(backend="numpy", embedder=CountingEmbedder("model-a"))
+        rag.add_documents(chunks)
+        edited = chunks[:2] + [dict(chunks[2], text="edited chunk text")]
+        rag.add_documents(edited)
+        assert rag.embedder.seen == ["chunk text 0", "chunk text 1", "chunk text 2", "edited chunk text"]
+
+        rag.embedder = CountingEmbedder("model-b")
+        rag.add_documents(edited)
+        assert rag.embedder.seen == [chunk["text"] for chunk in edited]
+
+
+class TestFullContextLayouts:
+    """Test the inline and prefix full-context prompt layouts"""
+
+    DOCUMENTS = [
+        {"title": "Dosing", "content": "The adult dose is 500 mg."},
+        {"title": "Storage", "content": "Store below 25 C."}
+    ]
+
+    class CharEncoding:
+        """Offline stand-in for cl100k_base: one token per character."""
+
+        def encode(self, text):
+            return [ord(char) for char in text]
+
+        def encode_batch(self, texts):
+            return [self.encode(text) for text in texts]
+
+    @pytest.fixture
+    def experiment(self, monkeypatch):
+        import lab3.experiment as experiment
+
+        monkeypatch.setattr(experiment.tiktoken, "get_encoding", lambda name: self.CharEncoding())
+        return experiment
+
+    def test_prefix_layout_reuses_one_system_message(self, experiment, monkeypatch):
+        """Test that documents go in a shared system message and only the question varies"""
+        calls = []
+
+        def llm_query_timed(prompt, **kwargs):
+            calls.append(dict(kwargs, prompt=prompt))
+            cached = 1024 if len(calls) > 1 else 0
+            return {"text": "500 mg", "first_token_seconds": 0.2, "total_seconds": 0.5,
+                    "usage": {"prompt_tokens": 1500, "completion_tokens": 3, "cached_tokens": cached}}
+
+        monkeypatch.setattr(experiment, "llm_query_timed", llm_query_timed)
+        full = experiment.FullContextSystem(layout="prefix")
+        full.set_documents(self.DOCUMENTS)
+
+        first = full.query_with_full_context_timed("What is the adult dose?")
+        second = full.query_with_full_context_timed("How should it be stored?")
+
+        assert calls[0]["system_message"] is calls[1]["system_message"] is full.prefix
+        assert full.prefix.startswith(experiment.FULL_CONTEXT_INSTRUCTION)
+        assert "[Dosing]\nThe adult dose is 500 mg." in full.prefix
+        assert calls[1]["prompt"] == "Question: How should it be stored?\n\nAnswer:"
+        assert first["usage"]["cached_tokens"] == 0
+        assert second["usage"]["cached_tokens"] == 1024
+        assert second["latency"] == pytest.approx(sum(second["timings"].values()))
+
+    def test_inline_layout_sends_one_user_message(self, experiment, monkeypatch):
+        """Test that the default layout keeps documents and question in the user prompt"""
+        calls = []
+
+        def llm_query_timed(prompt, **kwargs):
+            calls.append(dict(kwargs, prompt=prompt))
+            return {"text": "500 mg", "first_token_seconds": 0.2, "total_seconds": 0.5, "usage": None}
+
+        monkeypatch.setattr(experiment, "llm_query_timed", llm_query_timed)
+        full = experiment.FullContextSystem()
+        full.set_documents(self.DOCUMENTS)
+
+        full.query_with_full_context_timed("What is the adult dose?")
+
+        assert calls[0]["system_message"] is None
+        assert calls[0]["prompt"] == f"{full.prefix}\n\nQuestion: What is the adult dose?\n\nAnswer:"
+
+    def test_cached_tokens_come_from_prompt_tokens_details(self, experiment, monkeypatch):
+        """Test the prefix layout end to end through a fake streaming client"""
+        from types import SimpleNamespace
+        from azure_openai_helper import llm_client
+
+        requests = []
+
+        def create(**kwargs):
+            requests.append(kwargs)
+            usage = SimpleNamespace(prompt_tokens=1500, completion_tokens=2,
+                                    prompt_tokens_details=SimpleNamespace(cached_tokens=1280))
+            return iter([
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="500 mg"))], usage=None),
+                SimpleNamespace(choices=[], usage=usage)
+            ])
+
+        class FakeAzureOpenAI:
+            def __init__(self, **kwargs):
+                self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+        monkeypatch.setattr(llm_client, "_load_configuration", lambda: {
+            'AZURE_OPENAI_ENDPOINT': "https://example.openai.azure.com/", 'AZURE_OPENAI_API_KEY': "key",
+            'AZURE_OPENAI_DEPLOYMENT_NAME': "deployment", 'AZURE_OPENAI_API_VERSION': "2024-09-01-preview",
+            'has_secondary_model': False
+        })
+        monkeypatch.setattr(llm_client, "AzureOpenAI", FakeAzureOpenAI)
+        full = experiment.FullContextSystem(layout="prefix")
+        full.set_documents(self.DOCUMENTS)
+
+        result = full.query_with_full_context_timed("What is the adult dose?")
+
+        assert [message["role"] for message in requests[0]["messages"]] == ["system", "user"]
+        assert requests[0]["messages"][0]["content"] == full.prefix
+        assert result["answer"] == "500 mg"
+        assert result["usage"] == {"prompt_tokens": 1500, "completion_tokens": 2, "cached_tokens": 1280}
+
+
+class TestCompareModesBatch:
+    """Test batched retrieval and ordered concurrent evaluation with stubbed LLM calls"""
+
+    TOPICS = ["apple", "river", "stone", "cloud"]
+
+    class TopicEmbedder:
+        """One-hot embedding of the topic word a text mentions; logs each embed call."""
+
+        model_name = "topic"
+        backend = "test"
+
+        def __init__(self, topics):
+            self.topics = topics
+            self.calls = []
+
+        def embed(self, texts):
+            import numpy as np
+
+            self.calls.append(list(texts))
+            vectors = np.full((len(texts), len(self.topics)), 0.01, dtype=np.float32)
+            for row, text in enumerate(texts):
+                for column, topic in enumerate(self.topics):
+                    if topic in text.lower():
+                        vectors[row, column] = 1.0
+            return vectors
+
+        def flush(self):
+            pass
+
+    def test_prefetched_results_come_back_in_question_order(self, monkeypatch):
+        """Test one batched embed for all questions and results in question order"""
+        import re
+        import time
+        import lab3.experiment as experiment
+        from lab3.experiment import RAGSystem, compare_modes_batch
+
+        questions = [
+            {"id": f"q{i}", "question": f"What about the {topic}?", "expected_answer": topic, "relevant_doc": f"doc{i}"}
+            for i, topic in enumerate(self.TOPICS)
+        ]
+        # Earlier questions answer more slowly, so calls finish out of order
+        delays = {q["question"]: 0.02 * (len(questions) - i) for i, q in enumerate(questions)}
+
+        def llm_query_timed(prompt, **kwargs):
+            question = re.search(r"Question: (.*)", prompt).group(1)
+            time.sleep(delays[question])
+            return {"text": f"answer to {question}", "first_token_seconds": 0.1, "total_seconds": 0.3,
+                    "usage": None}
+
+        class StubFullContext:
+            context_tokens = 1000
+
+            def query_with_full_context_timed(self, query):
+                return {"answer": f"full answer to {query}", "latency": 1.0,
+                        "timings": {"llm_first_token": 1.0}, "usage": None}
+
+        monkeypatch.setattr(experiment, "llm_query_timed", llm_query_timed)
+
+        chunks = [
+            {"chunk_id": f"doc{i}_0", "doc_id": f"doc{i}", "text": f"Facts about the {topic}.",
+             "chunk_index": 0, "token_count": 5}
+            for i, topic in enumerate(self.TOPICS)
+        ]
+        embedder = self.TopicEmbedder(self.TOPICS)
+        rag = RAGSystem(backend="numpy", embedder=embedder)
+        rag.add_documents(chunks)
+        embedder.calls = []
+
+        rag.prefetch([q["question"] for q in questions], k=1, mode="dense")
+        results = compare_modes_batch(questions, rag, StubFullContext(), k=1, retrieval_mode="dense", max_workers=8)
+
+        assert embedder.calls == [[q["question"] for q in questions]]
+        assert [r["question_id"] for r in results] == ["q0", "q1", "q2", "q3"]
+        for question, result in zip(questions, results):
+            assert result["relevant_doc"] == question["relevant_doc"]
+            assert result["rag_answer"] == f"answer to {question['question']}"
+            assert result["full_answer"] == f"full answer to {question['question']}"
+            assert [chunk["doc_id"] for chunk in result["rag_retrieved_chunks"]] == [question["relevant_doc"]]
+            assert result["rag_correct"] and result["full_correct"]
+            assert result["full_context_tokens"] == 1000
+            for stage in ("embed_query", "index_search"):
+                assert result["rag_timings"][stage] == pytest.approx(rag.last_prefetch_timings[stage] / len(questions))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
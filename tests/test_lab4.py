@@ -0,0 +1,841 @@
+"""
+Unit tests for Lab 4 memory components that run without API access.
+Run with: pytest tests/test_lab4.py -v
+
+Strategy tests replace the tiktoken encoding with a one-token-per-character
+encoding (so counts add up exactly across joins) and llm_query with a stub.
+"""
+
+import pytest
+
+
+class CharEncoding:
+    """Offline stand-in for a tiktoken encoding: one token per character."""
+
+    def encode(self, text):
+        return [ord(char) for char in text]
+
+
+@pytest.fixture
+def strategies(monkeypatch):
+    """lab4.strategies with an offline encoding and an llm_query stub that must be set per test."""
+    import lab4.strategies as strategies_module
+
+    monkeypatch.setattr(strategies_module.tiktoken, "encoding_for_model", lambda name: CharEncoding())
+
+    def no_llm(**kwargs):
+        raise AssertionError("llm_query was not stubbed for this test")
+
+    monkeypatch.setattr(strategies_module, "llm_query", no_llm)
+    return strategies_module
+
+
+def stub_llm(prompt, **kwargs):
+    """llm_query stand-in: JSON facts for batched extraction, short fixed text otherwise."""
+    import json
+    import re
+
+    if "Respond with JSON only" in prompt:
+        steps = [int(number) for number in re.findall(r"^Step (\d+):", prompt, re.MULTILINE)]
+        return json.dumps({"steps": [{"step": step, "facts": [f"Lead {step} was checked"]} for step in steps]})
+    if "Key Facts (one per line" in prompt:
+        step = re.search(r"^Step (\d+):", prompt, re.MULTILINE).group(1)
+        return f"- Lead {step} was checked"
+    if prompt.rstrip().endswith(("Updated Summary:", "Condensed Summary:")):
+        return "Leads were checked at the harbor."
+    return "stub answer"
+
+
+def make_steps(count, start=1):
+    """History steps in the scenario format."""
+    return [
+        {"step": i, "action": f"Check lead {i}", "observations": f"Observation number {i} at the harbor.",
+         "time": f"Day 1 {i}:00 PM"}
+        for i in range(start, start + count)
+    ]
+
+
+class TestIncrementalBM25Index:
+    """Test the append-only BM25 index used by SELECT"""
+
+    def test_ranks_matching_steps_first(self):
+        """Test that steps sharing rare query terms rank highest"""
+        from lab4.memory_index import IncrementalBM25Index
+
+        index = IncrementalBM25Index()
+        index.add("s1", "Interviewed the butler in the library at 9pm")
+        index.add("s2", "Found muddy footprints near the greenhouse")
+        index.add("s3", "The gardener owns boots matching the footprints")
+
+        results = index.search("Who left the footprints near the greenhouse?", k=2)
+
+        assert [doc_id for doc_id, _ in results] == ["s2", "s3"]
+        assert results[0][1] > results[1][1] > 0
+
+    def test_results_update_as_steps_arrive(self):
+        """Test that documents added after a search are found by the next search"""
+        from lab4.memory_index import IncrementalBM25Index
+
+        index = IncrementalBM25Index()
+        index.add(0, "Checked the kitchen")
+        assert index.search("poison vial", k=3) == []
+
+        index.add(1, "Discovered a poison vial under the sink")
+        assert [doc_id for doc_id, _ in index.search("poison vial", k=3)] == [1]
+        assert len(index) == 2
+
+    def test_stopword_only_query(self):
+        """Test that a query without index terms returns nothing"""
+        from lab4.memory_index import IncrementalBM25Index
+
+        index = IncrementalBM25Index()
+        index.add(0, "Butler seen leaving")
+
+        assert index.search("who was it", k=3) == []
+
+
+class TestDenseStepIndex:
+    """Test the growing embedding matrix used by dense SELECT"""
+
+    def test_capacity_doubles(self):
+        """Test that appending past capacity doubles the matrix and keeps rows"""
+        import numpy as np
+        from lab4.memory_index import DenseStepIndex
+
+        index = DenseStepIndex(initial_capacity=2)
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(5, 4)).astype(np.float32)
+
+        index.add_batch([0, 1], vectors[:2])
+        assert index.vectors.shape == (2, 4)
+        index.add_batch([2], vectors[2:3])
+        assert index.vectors.shape == (4, 4)
+        index.add_batch([3, 4], vectors[3:])
+        assert index.vectors.shape == (8, 4)
+
+        assert len(index) == 5
+        np.testing.assert_allclose(index.vectors[:5], DenseStepIndex.normalize(vectors), rtol=1e-6)
+
+    def test_search_matches_cosine_similarity(self):
+        """Test that results are ranked by cosine similarity"""
+        import numpy as np
+        from sklearn.metrics.pairwise import cosine_similarity
+        from lab4.memory_index import DenseStepIndex
+
+        rng = np.random.default_rng(1)
+        vectors = rng.normal(size=(50, 8)).astype(np.float32)
+        query = rng.normal(size=8).astype(np.float32)
+
+        index = DenseStepIndex()
+        index.add_batch(list(range(50)), vectors)
+        results = index.search(query, k=5)
+
+        expected = cosine_similarity(query[None], vectors)[0]
+        assert [i for i, _ in results] == list(np.argsort(-expected)[:5])
+        assert results[0][1] == pytest.approx(expected.max(), rel=1e-5)
+
+
+class TestBatchedFactParsing:
+    """Test parsing of batched WRITE extraction responses"""
+
+    def test_parses_fenced_json_per_step(self):
+        """Test that facts are grouped by step and formatted as bullets"""
+        from lab4.strategies import parse_batched_facts
+
+        response = """```json
+{"steps": [{"step": 2, "facts": ["Butler seen at 9pm", "- Door was locked"]},
+           {"step": 3, "facts": "Footprints by the greenhouse"}]}
+```"""
+
+        facts = parse_batched_facts(response, [2, 3])
+
+        assert facts == {
+            2: ["- Butler seen at 9pm", "- Door was locked"],
+            3: ["- Footprints by the greenhouse"]
+        }
+
+    def test_missing_and_unparseable_steps_are_left_out(self):
+        """Test that only steps present in valid JSON are returned"""
+        from lab4.strategies import parse_batched_facts
+
+        response = '{"steps": [{"step": "4", "facts": ["Alibi confirmed"]}, {"step": 9, "facts": ["x"]}]}'
+
+        assert parse_batched_facts(response, [4, 5]) == {4: ["- Alibi confirmed"]}
+        assert parse_batched_facts("- not json", [4]) == {}
+
+
+class TestCompressStrategy:
+    """Test rolling summarization in COMPRESS"""
+
+    @staticmethod
+    def recording_llm(calls, summary="Leads were checked at the harbor.", condensed="Harbor leads."):
+        """Stub that records summarizer prompts and returns fixed summaries."""
+        def llm(prompt, **kwargs):
+            calls.append(prompt)
+            return condensed if prompt.rstrip().endswith("Condensed Summary:") else summary
+        return llm
+
+    @staticmethod
+    def new_steps_section(prompt):
+        return prompt.split("New Investigation Steps:")[1]
+
+    def test_only_unsummarized_steps_are_merged(self, strategies, monkeypatch):
+        """Test that each merge sends only the steps after the last merge point"""
+        import re
+
+        calls = []
+        monkeypatch.setattr(strategies, "llm_query", self.recording_llm(calls))
+        compress = strategies.create_strategy("compress", max_tokens=300, keep_recent=2)
+        history = make_steps(12)
+
+        for end in range(1, len(history) + 1):
+            compress.process_history(history[:end], "What was seen?")
+
+        merges = [self.new_steps_section(prompt) for prompt in calls]
+        assert len(merges) > 1
+        merged_steps = [int(number) for merge in merges for number in re.findall(r"^Step (\d+):", merge, re.MULTILINE)]
+        assert merged_steps == list(range(1, compress.summarized_count + 1))
+        assert "Leads were checked at the harbor." in calls[1]
+
+    def test_recent_steps_stay_verbatim(self, strategies, monkeypatch):
+        """Test that the last keep_recent steps are never summarized"""
+        calls = []
+        monkeypatch.setattr(strategies, "llm_query", self.recording_llm(calls))
+        compress = strategies.create_strategy("compress", max_tokens=100, keep_recent=3)
+        history = make_steps(10)
+
+        context = compress.process_history(history, "What was seen?")
+
+        assert compress.summarized_count == 7
+        assert compress.last_summarized_step == 7
+        assert context.startswith(compress.summary_header)
+        for step_data in history[-3:]:
+            assert strategies.format_step(step_data) in context
+        assert "Step 8:" not in self.new_steps_section(calls[0])
+
+    def test_summary_is_recompacted_past_budget(self, strategies, monkeypatch):
+        """Test that a summary longer than summary_budget is condensed"""
+        calls = []
+        monkeypatch.setattr(strategies, "llm_query", self.recording_llm(calls))
+        compress = strategies.create_strategy("compress", max_tokens=300, keep_recent=2, summary_budget=20)
+
+        compress.process_history(make_steps(8), "What was seen?")
+
+        assert len(calls) == 2 and calls[1].rstrip().endswith("Condensed Summary:")
+        assert compress.compressed_history == "Harbor leads."
+        assert compress.summary_tokens == len("Harbor leads.")
+
+        calls.clear()
+        roomy = strategies.create_strategy("compress", max_tokens=300, keep_recent=2, summary_budget=100)
+        roomy.process_history(make_steps(8), "What was seen?")
+        assert len(calls) == 1
+
+    def test_shorter_or_different_history_resets(self, strategies, monkeypatch):
+        """Test that a new run does not reuse the previous summary or steps"""
+        calls = []
+        monkeypatch.setattr(strategies, "llm_query", self.recording_llm(calls))
+        compress = strategies.create_strategy("compress", max_tokens=300, keep_recent=2)
+        compress.process_history(make_steps(8), "What was seen?")
+        assert compress.compressed_history
+
+        context = compress.process_history(make_steps(2), "What was seen?")
+        assert compress.compressed_history is None and compress.summarized_count == 0
+        assert context == "\n\n".join(strategies.format_step(step_data) for step_data in make_steps(2))
+
+        other_case = [dict(step_data, observations="A bicycle was stolen.") for step_data in make_steps(3)]
+        context = compress.process_history(other_case, "What was stolen?")
+        assert compress.step_texts == [strategies.format_step(step_data) for step_data in other_case]
+        assert compress.raw_tokens == len(context) - 2 * len("\n\n")
+
+
+class TestWriteStrategy:
+    """Test batched WRITE extraction with a stubbed llm_query"""
+
+    @staticmethod
+    def recording_llm(calls, batch_response):
+        """llm_query stub that logs each call's kind and step numbers."""
+        import re
+
+        def llm(prompt, **kwargs):
+            steps = [int(number) for number in re.findall(r"^Step (\d+):", prompt, re.MULTILINE)]
+            if "Respond with JSON only" in prompt:
+                calls.append(("batch", steps))
+                return batch_response(steps)
+            calls.append(("single", steps))
+            return stub_llm(prompt)
+
+        return llm
+
+    def test_malformed_json_falls_back_to_single_steps(self, strategies, monkeypatch):
+        """Test that every step of a batch with an unparseable answer is extracted alone"""
+        calls = []
+        monkeypatch.setattr(strategies, "llm_query", self.recording_llm(calls, lambda steps: '{"steps": [{"step": 1,'))
+        write = strategies.create_strategy("write", batch_size=3, max_workers=1)
+
+        write.ingest_steps(make_steps(3))
+
+        assert calls == [("batch", [1, 2, 3]), ("single", [1]), ("single", [2]), ("single", [3])]
+        assert [fact["steps"] for fact in write.scratchpad.facts] == [[1], [2], [3]]
+
+    def test_steps_missing_from_answer_are_extracted_alone(self, strategies, monkeypatch):
+        """Test that only the steps left out of the JSON answer get single-step calls"""
+        import json
+
+        calls = []
+
+        def partial(steps):
+            return json.dumps({"steps": [{"step": step, "facts": [f"Batch fact {step}"]} for step in steps[::2]]})
+
+        monkeypatch.setattr(strategies, "llm_query", self.recording_llm(calls, partial))
+        write = strategies.create_strategy("write", batch_size=4, max_workers=1)
+
+        write.ingest_steps(make_steps(4))
+
+        assert calls == [("batch", [1, 2, 3, 4]), ("single", [2]), ("single", [4])]
+        assert list(write.scratchpad) == ["- Batch fact 1", "- Lead 2 was checked", "- Batch fact 3",
+                                          "- Lead 4 was checked"]
+
+    def test_reopened_scratchpad_skips_steps_without_facts(self, strategies, monkeypatch, tmp_path):
+        """Test that steps that yielded no facts are not extracted again after a reopen"""
+        import json
+
+        calls = []
+
+        def odd_steps_only(steps):
+            return json.dumps({"steps": [{"step": step, "facts": [f"Fact {step}"] if step % 2 else []}
+                                         for step in steps]})
+
+        monkeypatch.setattr(strategies, "llm_query", self.recording_llm(calls, odd_steps_only))
+        path = str(tmp_path / "scratchpad.db")
+        write = strategies.create_strategy("write", batch_size=4, max_workers=1, scratchpad_path=path)
+        write.ingest_steps(make_steps(4))
+        write.scratchpad.close()
+
+        reopened = strategies.create_strategy("write", batch_size=4, max_workers=1, scratchpad_path=path)
+        assert reopened.processed_steps == {1, 2, 3, 4}
+        reopened.ingest_steps(make_steps(6))
+        reopened.scratchpad.close()
+
+        assert calls == [("batch", [1, 2, 3, 4]), ("batch", [5, 6])]
+        assert list(reopened.scratchpad) == ["- Fact 1", "- Fact 3", "- Fact 5"]
+
+    def test_facts_keep_step_order_when_batches_finish_out_of_order(self, strategies, monkeypatch):
+        """Test that a slow first batch does not let later steps' facts jump ahead"""
+        import threading
+
+        last_batch_done = threading.Event()
+        calls = []
+
+        def batch_response(steps):
+            if 1 in steps:
+                # The first batch finishes only after the last one has
+                assert last_batch_done.wait(timeout=5)
+            response = stub_llm("Respond with JSON only\n" + "\n".join(f"Step {step}: x" for step in steps))
+            if 5 in steps:
+                last_batch_done.set()
+            return response
+
+        monkeypatch.setattr(strategies, "llm_query", self.recording_llm(calls, batch_response))
+        write = strategies.create_strategy("write", batch_size=2, max_workers=3)
+
+        write.ingest_steps(make_steps(6))
+
+        assert sorted(steps for _, steps in calls) == [[1, 2], [3, 4], [5, 6]]
+        assert [fact["steps"] for fact in write.scratchpad.facts] == [[1], [2], [3], [4], [5], [6]]
+        assert write.processed_steps == {1, 2, 3, 4, 5, 6}
+
+
+class TestScratchpadStore:
+    """Test the deduplicated fact store used by WRITE"""
+
+    def test_duplicates_are_stored_once(self):
+        """Test that facts equal after normalization share one record"""
+        from lab4.scratchpad import ScratchpadStore
+
+        store = ScratchpadStore()
+        store.add_facts(["- Sarah Chen was in the library at 9:15 PM"], step=1, time="9:30 PM")
+        added = store.add_facts(["• sarah chen was in the library at 9:15 pm.", "- Door was locked"], step=4)
+
+        assert len(store) == 2
+        assert added == [1]
+        assert store.duplicates == 1
+        fact = store.facts[0]
+        assert fact["steps"] == [1, 4]
+        assert fact["entities"] == ["Sarah Chen"]
+        assert fact["time"] == "9:15 PM"
+        assert store.facts[1]["time"] is None
+
+    def test_search_ranks_matches_then_fills_with_recent(self):
+        """Test that matching facts come first and recent facts fill the rest"""
+        from lab4.scratchpad import ScratchpadStore
+
+        store = ScratchpadStore()
+        store.add_facts(["- Gardener owns muddy boots"], step=1)
+        store.add_facts(["- Butler polished the silver"], step=2)
+        store.add_facts(["- Cook left at 8pm"], step=3)
+
+        results = store.search("Whose boots were muddy?", k=2)
+
+        assert [fact["text"] for fact in results] == ["- Gardener owns muddy boots", "- Cook left at 8pm"]
+        assert [fact["text"] for fact in store.facts_for_entity("gardener")] == ["- Gardener owns muddy boots"]
+
+    def test_sqlite_store_reloads(self, tmp_path):
+        """Test that a persisted scratchpad is restored with its metadata"""
+        from lab4.scratchpad import ScratchpadStore
+
+        path = str(tmp_path / "scratchpad.db")
+        store = ScratchpadStore(path)
+        store.add_facts(["- Knife found in the study"], step=2, time="10:00 PM")
+        store.add_facts(["- knife found in the study"], step=5)
+        store.close()
+
+        reloaded = ScratchpadStore(path)
+
+        assert len(reloaded) == 1
+        assert reloaded.facts[0]["steps"] == [2, 5]
+        assert reloaded.facts[0]["time"] == "10:00 PM"
+        assert reloaded.search("study knife", k=1)[0]["text"] == "- Knife found in the study"
+        reloaded.close()
+
+
+class TestLongScenario:
+    """Test the procedural long-horizon scenario generator"""
+
+    def test_questions_answer_latest_planted_value(self):
+        """Test that each question's answer is the latest value stated at fact_step"""
+        from lab4.generate_long_scenario import iter_long_scenario
+
+        steps = {}
+        questions = []
+        for record_type, record in iter_long_scenario(600, seed=7, num_entities=30, question_every=20):
+            if record_type == "step":
+                steps[record["step"]] = record
+            else:
+                questions.append(record)
+
+        assert len(steps) == 600
+        assert len(questions) == 30
+        assert any(question["contradicted"] for question in questions)
+        for question in questions:
+            source = steps[question["fact_step"]]
+            assert question["fact_step"] <= question["step"]
+            assert (source["entity"], source["attribute"]) == (question["entity"], question["attribute"])
+            assert source["value"] == question["ground_truth"]
+            assert question["ground_truth"] in source["observations"]
+            later = [
+                steps[s] for s in range(question["fact_step"] + 1, question["step"] + 1)
+                if steps[s].get("entity") == question["entity"]
+                and steps[s].get("attribute") == question["attribute"]
+            ]
+            assert not later
+
+    def test_generated_scenario_loads_with_limit(self, tmp_path):
+        """Test that the JSONL output is deterministic and loads as a benchmark scenario"""
+        from lab4.generate_long_scenario import generate_long_scenario, load_long_scenario
+
+        first = generate_long_scenario(str(tmp_path / "a"), num_steps=120, seed=3, question_every=10)
+        generate_long_scenario(str(tmp_path / "b"), num_steps=120, seed=3, question_every=10)
+
+        assert (tmp_path / "a" / "steps.jsonl").read_text() == (tmp_path / "b" / "steps.jsonl").read_text()
+        assert sum(first["steps_by_kind"].values()) == 120
+
+        scenario = load_long_scenario(str(tmp_path / "a"), limit=55)
+
+        assert scenario["num_steps"] == len(scenario["steps"]) == len(scenario["questions"]) == 55
+        assert [i + 1 for i, q in enumerate(scenario["questions"]) if q is not None] == [10, 20, 30, 40, 50]
+        assert len(scenario["question_details"]) == 5
+
+
+class TestTieredMemory:
+    """Test the working/episodic/archival memory tiers"""
+
+    def test_tiers_stay_bounded(self, tmp_path):
+        """Test that working and episodic tiers evict while the archive keeps everything"""
+        from lab4.memory_tiers import TieredMemory
+
+        memory = TieredMemory(str(tmp_path / "archive.db"), working_size=3, block_size=4, episodic_size=2)
+        for i in range(20):
+            memory.add_step(i, f"Step {i + 1}: Routine check of dock {i}")
+
+        assert list(memory.working) == [17, 18, 19]
+        assert list(memory.episodic) == [3, 4]
+        assert memory.episodic[4]["first_step"] == 16 and memory.episodic[4]["last_step"] == 19
+        assert memory.metrics()["archival"]["size"] == 20
+        memory.close()
+
+    def test_archival_hits_are_promoted(self, tmp_path):
+        """Test that an old step is found on disk, promoted, then hit in working memory"""
+        from lab4.memory_tiers import TieredMemory
+
+        memory = TieredMemory(str(tmp_path / "archive.db"), working_size=2, block_size=100)
+        memory.add_step(0, "Step 1: Knife found under the greenhouse bench")
+        for i in range(1, 10):
+            memory.add_step(i, f"Step {i + 1}: Canvassed the harbor")
+
+        first = memory.recall("Where was the knife found?", k=2)
+        assert [item["key"] for item in first["archival"]] == [0]
+        assert first["working"] == []
+        assert 0 in memory.working
+
+        second = memory.recall("Where was the knife found?", k=2)
+        assert [item["key"] for item in second["working"]] == [0]
+        assert second["archival"] == []
+
+        metrics = memory.metrics()
+        assert metrics["working"]["hits"] == 1 and metrics["working"]["lookups"] == 2
+        assert metrics["archival"]["hit_rate"] == 0.5
+        memory.close()
+
+
+class TestTieredStrategy:
+    """Test TIERED context assembly over TieredMemory"""
+
+    def test_shorter_history_starts_a_new_run(self, strategies, monkeypatch, tmp_path):
+        """Test that a reset clears recent steps, token counts and the archive"""
+        monkeypatch.setattr(strategies, "llm_query", lambda **kwargs: "stub answer")
+        tiered = strategies.create_strategy("tiered", llm_summaries=False, block_size=4,
+                                            archive_path=str(tmp_path / "archive.db"))
+
+        first = tiered.answer_question(make_steps(10), "What was seen at the harbor?")
+        assert first["tier_metrics"]["archival"]["size"] == 10
+
+        history = [{"step": 1, "action": "New case", "observations": "A bicycle was stolen.", "time": "9:00 AM"}]
+        context = tiered.process_history(history, "What was stolen?")
+        assert context == strategies.format_step(history[0])
+        assert tiered.last_context_tokens == len(context)
+        assert tiered.memory.recall("observation harbor", k=5)["archival"] == []
+
+        result = tiered.answer_question(history + make_steps(2, start=2), "What was stolen?")
+        assert result["tier_metrics"]["archival"]["size"] == 3
+        assert set(result["tier_metrics"]) == {"working", "episodic", "archival"}
+        tiered.memory.close()
+
+    def test_tier_metrics_cover_one_answer(self, strategies, monkeypatch, tmp_path):
+        """Test that tier_metrics are per-answer deltas while memory.metrics() stays cumulative"""
+        monkeypatch.setattr(strategies, "llm_query", lambda **kwargs: "stub answer")
+        tiered = strategies.create_strategy("tiered", llm_summaries=False, block_size=4,
+                                            archive_path=str(tmp_path / "archive.db"))
+        history = make_steps(10)
+
+        first = tiered.answer_question(history, "What was seen at the harbor?")
+        second = tiered.answer_question(history, "Which bicycle was stolen?")
+
+        for result in (first, second):
+            assert all(metrics["lookups"] == 1 for metrics in result["tier_metrics"].values())
+        assert second["tier_metrics"]["working"]["hits"] == 0
+        assert second["tier_metrics"]["working"]["hit_rate"] == 0.0
+        assert tiered.memory.metrics()["working"]["lookups"] == 2
+        assert tiered.memory.metrics()["working"]["hits"] == first["tier_metrics"]["working"]["hits"] == 1
+        tiered.memory.close()
+
+
+class TestContextTokenCounts:
+    """Test that cached context token counts match encoding the context"""
+
+    @pytest.mark.parametrize("name,options", [
+        ("select", {"top_k": 3}),
+        ("compress", {"max_tokens": 300, "keep_recent": 2}),
+        ("write", {"top_k": 5, "batch_size": 4}),
+        ("hybrid", {"token_budget": 400}),
+    ])
+    def test_cached_count_matches_encoding(self, strategies, monkeypatch, name, options):
+        """Test last_context_tokens against len(encode(context)) as history grows"""
+        monkeypatch.setattr(strategies, "llm_query", stub_llm)
+        strategy = strategies.create_strategy(name, **options)
+        history = make_steps(12)
+
+        for end in (1, 2, 5, 8, 12):
+            context = strategy.process_history(history[:end], f"What was seen at lead {end}?")
+            assert strategy.last_context_tokens == len(CharEncoding().encode(context))
+
+        result = strategy.answer_question(history, "What was seen at lead 3?")
+        assert result["context_tokens"] == strategy.last_context_tokens
+
+
+class TestHybridStrategy:
+    """Test HYBRID budget allocation and source weighting"""
+
+    def test_context_stays_within_budget(self, strategies, monkeypatch):
+        """Test that the assembled context never exceeds the token budget as history grows"""
+        monkeypatch.setattr(strategies, "llm_query", stub_llm)
+        hybrid = strategies.create_strategy("hybrid", token_budget=400, recent_window=3, retrieve_k=4)
+
+        history = make_steps(30)
+        for end in range(1, len(history) + 1):
+            context = hybrid.process_history(history[:end], f"What was seen at lead {end // 2 + 1}?")
+            assert hybrid.last_context_tokens == len(context) <= 400
+            assert hybrid.last_allocation["total"] <= 400
+
+    def test_step_from_two_sources_is_counted_once(self, strategies, monkeypatch):
+        """Test that a recent step that is also retrieved appears and is charged once"""
+        monkeypatch.setattr(strategies, "llm_query", stub_llm)
+        hybrid = strategies.create_strategy("hybrid", token_budget=2000, recent_window=3, retrieve_k=5)
+        history = make_steps(6)
+
+        candidates = hybrid.candidates(history, "What was observed at lead 6?")
+        keys = [item["key"] for item in candidates]
+        assert len(keys) == len(set(keys))
+        assert ("step", 5) in keys
+
+        context = hybrid.process_history(history, "What was observed at lead 6?")
+        assert context.count("Step 6:") == 1
+        assert hybrid.last_context_tokens == len(context)
+
+    def test_select_index_reuses_compress_counts(self, strategies, monkeypatch):
+        """Test that the SELECT index is fed from COMPRESS's cached steps and rebuilt on a new run"""
+        monkeypatch.setattr(strategies, "llm_query", stub_llm)
+        hybrid = strategies.create_strategy("hybrid", token_budget=2000)
+
+        def no_count(text):
+            raise AssertionError("SELECT counted a step COMPRESS already counted")
+
+        monkeypatch.setattr(hybrid.select, "count_tokens", no_count)
+        history = make_steps(6)
+        for end in (2, 6):
+            hybrid.process_history(history[:end], "What was observed at lead 2?")
+        assert hybrid.select.step_chunks == hybrid.compress.step_texts
+        assert hybrid.select.step_tokens == hybrid.compress.step_tokens
+        assert len(hybrid.select.index) == 6
+
+        other_case = [dict(step_data, observations="A bicycle was stolen.") for step_data in make_steps(3)]
+        hybrid.process_history(other_case, "What was stolen?")
+        assert hybrid.select.step_chunks == [strategies.format_step(step_data) for step_data in other_case]
+        assert len(hybrid.select.index) == 3
+
+    def test_feedback_moves_weights_of_used_sources(self, strategies, monkeypatch):
+        """Test that record_feedback raises or lowers only the sources in the last context"""
+        monkeypatch.setattr(strategies, "llm_query", stub_llm)
+        hybrid = strategies.create_strategy("hybrid", token_budget=2000, learning_rate=0.5)
+        hybrid.process_history(make_steps(4), "What was observed at lead 2?")
+        used = [source for source in hybrid.SOURCES if hybrid.last_allocation[source]]
+        unused = [source for source in hybrid.SOURCES if not hybrid.last_allocation[source]]
+        assert "recent" in used and "summary" in unused
+
+        before = dict(hybrid.source_weights)
+        hybrid.record_feedback(True)
+        for source in used:
+            assert hybrid.source_weights[source] == pytest.approx(before[source] * 1.5)
+        for source in unused:
+            assert hybrid.source_weights[source] == before[source]
+
+        hybrid.record_feedback(False)
+        hybrid.record_feedback(False)
+        assert hybrid.source_weights["recent"] == pytest.approx(before["recent"] * 1.5 * 0.5 * 0.5)
+
+
+class TestIsolateStrategy:
+    """Test ISOLATE sharding and map-step filtering"""
+
+    def test_shard_boundaries_are_stable(self, strategies):
+        """Test that shards already filled keep their boundaries as history grows"""
+        isolate = strategies.create_strategy("isolate", shard_tokens=200)
+        history = make_steps(40)
+
+        isolate.ingest_steps(history[:9])
+        closed = [list(shard) for shard in isolate.shards[:-1]]
+        assert closed
+
+        isolate.ingest_steps(history)
+        assert isolate.shards[:len(closed)] == closed
+        assert [shard[0] for shard in isolate.shards[1:]] == [shard[1] for shard in isolate.shards[:-1]]
+        assert isolate.shards[-1][1] == len(history)
+        assert all(shard[2] <= 200 for shard in isolate.shards)
+
+    def test_not_found_shards_are_dropped(self, strategies, monkeypatch):
+        """Test that only shards with findings reach the final context"""
+        def shard_llm(prompt, **kwargs):
+            if "reply exactly NOT FOUND" in prompt:
+                return "Lead 7 was checked." if "Step 7:" in prompt else "Not found."
+            return "stub answer"
+
+        monkeypatch.setattr(strategies, "llm_query", shard_llm)
+        isolate = strategies.create_strategy("isolate", shard_tokens=200, max_workers=2)
+
+        result = isolate.answer_question(make_steps(12), "When was lead 7 checked?")
+
+        assert result["num_shards"] > 1
+        assert result["shards_with_findings"] == 1
+        assert "Lead 7 was checked." in result["context_preview"]
+        assert "Not found" not in result["context_preview"]
+
+    def test_answer_mentioning_not_found_is_kept(self, strategies, monkeypatch):
+        """Test that a real finding containing "not found" reaches the reduce step"""
+        finding = "The weapon was not found at the scene; it was in the garage."
+        reduce_prompts = []
+
+        def shard_llm(prompt, **kwargs):
+            if "reply exactly NOT FOUND" in prompt:
+                if "Step 7:" in prompt:
+                    return finding
+                return None if "Step 1:" in prompt else " not found "
+            reduce_prompts.append(prompt)
+            return "In the garage."
+
+        monkeypatch.setattr(strategies, "llm_query", shard_llm)
+        isolate = strategies.create_strategy("isolate", shard_tokens=200, max_workers=2)
+
+        result = isolate.answer_question(make_steps(12), "Where was the weapon?")
+
+        assert result["num_shards"] > 2
+        assert result["shards_with_findings"] == 1
+        assert len(reduce_prompts) == 1 and finding in reduce_prompts[0]
+        assert isolate.is_not_found("NOT FOUND.") and isolate.is_not_found("")
+
+
+class TestAnalyzeResults:
+    """Test that analysis follows the strategies present in a results file"""
+
+    def test_report_and_plots_cover_every_strategy(self, tmp_path):
+        """Test that strategies beyond select/compress/write are analyzed and plotted"""
+        from lab4 import analyze_results
+
+        names = ["select", "hybrid", "isolate", "custom"]
+        results_data = {
+            "scenario": "detective", "model": "stub", "num_steps": 2,
+            "results": [
+                {"step": step, "question": f"Q{step}", "ground_truth": f"A{step}",
+                 "strategies": {name: {"is_correct": (step + i) % 2 == 0, "answer": "a",
+                                       "context_tokens": 100 * (i + 1), "time_seconds": 1.0}
+                                for i, name in enumerate(names)}}
+                for step in (1, 2)
+            ]
+        }
+
+        df = analyze_results.results_to_dataframe(results_data)
+        assert analyze_results.strategy_names(df) == names
+
+        analyze_results.plot_accuracy_over_time(df, str(tmp_path))
+        analyze_results.plot_context_tokens_over_time(df, str(tmp_path))
+        analyze_results.plot_overall_comparison(df, str(tmp_path))
+        analyze_results.plot_cumulative_accuracy(df, str(tmp_path))
+        analyze_results.plot_heatmap_accuracy(df, str(tmp_path))
+        report = analyze_results.generate_analysis_report(df, results_data, str(tmp_path))
+
+        assert len(list(tmp_path.glob("*.png"))) == 5
+        for name in names:
+            assert f"{name.upper()} Strategy:" in report
+        assert "HYBRID (" in report and "ISOLATE (" in report
+        assert "COMPRESS (" not in report
+
+
+class TestStrategyBenchmark:
+    """Test concurrent per-step evaluation in StrategyBenchmark with stub strategies"""
+
+    class StubStrategy:
+        """Answers with the history length it saw; optionally slow or failing."""
+
+        def __init__(self, name, delay=0.0, fail_at=None):
+            self.name = name
+            self.delay = delay
+            self.fail_at = fail_at
+            self.seen = []
+
+        def answer_question(self, history, query):
+            import time
+
+            time.sleep(self.delay)
+            self.seen.append(len(history))
+            if len(history) == self.fail_at:
+                raise RuntimeError(f"{self.name} failed")
+            return {"answer": f"{self.name} saw {len(history)} steps", "context_tokens": 10 * len(history)}
+
+    @pytest.fixture
+    def benchmark_module(self, monkeypatch):
+        """lab4/experiment.py imported the way run_lab.py runs it, with a stub judge."""
+        import importlib
+        import os
+
+        monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(__file__)), "lab4"))
+        module = importlib.import_module("experiment")
+        monkeypatch.setattr(module, "llm_query", lambda **kwargs: "CORRECT: YES\nEXPLANATION: stub")
+        return module
+
+    @staticmethod
+    def scenario():
+        steps = make_steps(5)
+        return {
+            "scenario_type": "stub", "description": "Stub scenario", "num_steps": len(steps), "steps": steps,
+            "questions": ["Q1", None, "Q3", "Q4", None],
+            "ground_truth": ["A1", None, "A3", "A4", None]
+        }
+
+    def run(self, module, monkeypatch, tmp_path, max_workers, fail_at=None):
+        # Earlier strategies are slower, so concurrent runs finish out of order
+        stubs = {
+            "select": self.StubStrategy("select", delay=0.03),
+            "compress": self.StubStrategy("compress", delay=0.02, fail_at=fail_at),
+            "write": self.StubStrategy("write")
+        }
+        monkeypatch.setattr(module, "create_strategy", lambda name, **kwargs: stubs[name])
+        benchmark = module.StrategyBenchmark(self.scenario(), model_name="stub", max_workers=max_workers)
+        results, _ = benchmark.run_experiment(output_dir=str(tmp_path))
+        return results, stubs
+
+    @staticmethod
+    def without_timings(results):
+        timing_keys = {"time_seconds", "answer_seconds", "judge_seconds"}
+        return [
+            {"step": step["step"], "strategies": {
+                name: {key: value for key, value in outcome.items() if key not in timing_keys}
+                for name, outcome in step["strategies"].items()
+            }}
+            for step in results
+        ]
+
+    def test_step_order_is_kept(self, benchmark_module, monkeypatch, tmp_path):
+        """Test that every strategy sees the steps in order and results keep strategy order"""
+        results, stubs = self.run(benchmark_module, monkeypatch, tmp_path, max_workers=None)
+
+        assert [step["step"] for step in results] == [1, 3, 4]
+        for step in results:
+            assert list(step["strategies"]) == ["select", "compress", "write"]
+            for name, outcome in step["strategies"].items():
+                assert outcome["answer"] == f"{name} saw {step['step']} steps"
+        assert all(stub.seen == [1, 3, 4] for stub in stubs.values())
+
+    def test_serial_run_matches_concurrent_run(self, benchmark_module, monkeypatch, tmp_path):
+        """Test that max_workers=1 gives the same results as the concurrent default"""
+        concurrent, _ = self.run(benchmark_module, monkeypatch, tmp_path / "concurrent", max_workers=None)
+        serial, _ = self.run(benchmark_module, monkeypatch, tmp_path / "serial", max_workers=1)
+
+        assert self.without_timings(serial) == self.without_timings(concurrent)
+
+    def test_strategy_error_is_reported(self, benchmark_module, monkeypatch, tmp_path):
+        """Test that an exception in one strategy is recorded for that step only"""
+        results, stubs = self.run(benchmark_module, monkeypatch, tmp_path, max_workers=None, fail_at=3)
+
+        failed = results[1]["strategies"]["compress"]
+        assert failed["error"] == "compress failed"
+        assert failed["is_correct"] is False
+        assert all("error" not in outcome for name, outcome in results[1]["strategies"].items() if name != "compress")
+        assert results[2]["strategies"]["compress"]["is_correct"] is True
+        assert stubs["compress"].seen == [1, 3, 4]
+
+    def test_tiered_metrics_are_stored_under_details(self, benchmark_module, strategies, monkeypatch, tmp_path):
+        """Test that tiered_block_size adds TIERED, its tier metrics reach the results and its archive is closed"""
+        import os
+
+        monkeypatch.setattr(strategies, "llm_query", lambda **kwargs: "stub answer")
+        stubs = {name: self.StubStrategy(name) for name in ("select", "compress", "write")}
+
+        def create(name, **kwargs):
+            if name == "tiered":
+                return strategies.create_strategy(name, llm_summaries=False, **kwargs)
+            return stubs[name]
+
+        monkeypatch.setattr(benchmark_module, "create_strategy", create)
+        benchmark = benchmark_module.StrategyBenchmark(self.scenario(), model_name="stub", tiered_block_size=2)
+        memory = benchmark.strategies["tiered"].memory
+        assert memory.block_size == 2
+
+        results, _ = benchmark.run_experiment(output_dir=str(tmp_path))
+
+        assert memory._db is None and not os.path.exists(memory.path)
+
+        details = results[-1]["strategies"]["tiered"]["details"]
+        assert set(details["tier_metrics"]) == {"working", "episodic", "archival"}
+        assert details["tier_metrics"]["archival"]["size"] == 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,173 @@
+"""
+Offline tests for the Azure OpenAI helper
+Run with: pytest tests/test_llm_client.py -v
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+
+CONFIG = {
+    'AZURE_OPENAI_ENDPOINT': "https://example.openai.azure.com/",
+    'AZURE_OPENAI_API_KEY': "key",
+    'AZURE_OPENAI_DEPLOYMENT_NAME': "primary-deployment",
+    'AZURE_OPENAI_API_VERSION': "2024-02-15-preview",
+    'has_secondary_model': False,
+}
+
+
+class FakeClock:
+    """Stands in for time.time(); the fake stream advances it per chunk."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def time(self):
+        return self.now
+
+
+def content_chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+
+
+def usage_chunk(prompt_tokens, completion_tokens, details=None):
+    usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                            prompt_tokens_details=details)
+    return SimpleNamespace(choices=[], usage=usage)
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """
+    Patch llm_client to use a fake streaming client and clock.
+
+    Set fake_api.chunks to the stream, as (seconds_before_chunk, chunk) pairs.
+    Each create() call's kwargs are appended to fake_api.calls.
+    """
+    from openai import BadRequestError
+    from azure_openai_helper import llm_client
+
+    class StreamOptionsRejected(BadRequestError):
+        """A 400 response without building a real HTTP response object."""
+
+        def __init__(self, message):
+            Exception.__init__(self, message)
+
+    clock = FakeClock()
+    state = SimpleNamespace(clock=clock, chunks=[], calls=[], reject_stream_options=False)
+
+    def create(**kwargs):
+        state.calls.append(kwargs)
+        if state.reject_stream_options and "stream_options" in kwargs:
+            raise StreamOptionsRejected("Unrecognized request argument supplied: stream_options")
+
+        def stream():
+            for delay, chunk in state.chunks:
+                clock.now += delay
+                yield chunk
+        return stream()
+
+    class FakeAzureOpenAI:
+        def __init__(self, **kwargs):
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+    monkeypatch.setattr(llm_client, "_load_configuration", lambda: dict(CONFIG))
+    monkeypatch.setattr(llm_client, "AzureOpenAI", FakeAzureOpenAI)
+    monkeypatch.setattr(llm_client, "time", clock)
+    monkeypatch.setattr(llm_client, "_STREAM_OPTIONS_UNSUPPORTED", set())
+    return state
+
+
+class TestLLMQueryTimed:
+    """Test streaming timing and usage with a fake client"""
+
+    def test_first_token_and_total_time(self, fake_api):
+        """TTFT ends at the first content chunk, total time at the end of the stream"""
+        from azure_openai_helper import llm_query_timed
+
+        fake_api.chunks = [
+            (0.5, content_chunk(None)),
+            (1.0, content_chunk("Hello")),
+            (0.25, content_chunk(", world")),
+            (0.25, usage_chunk(1200, 3, SimpleNamespace(cached_tokens=1024))),
+        ]
+
+        result = llm_query_timed("Say hello", temperature=0.0, max_tokens=10)
+
+        assert result["text"] == "Hello, world"
+        assert result["first_token_seconds"] == pytest.approx(1.5)
+        assert result["total_seconds"] == pytest.approx(2.0)
+        assert result["usage"] == {"prompt_tokens": 1200, "completion_tokens": 3, "cached_tokens": 1024}
+
+        call = fake_api.calls[0]
+        assert call["stream"] is True
+        assert call["stream_options"] == {"include_usage": True}
+        assert call["model"] == "primary-deployment"
+        assert call["max_tokens"] == 10
+
+    def test_cached_tokens_default_to_zero(self, fake_api):
+        """Usage without prompt_tokens_details reports zero cached tokens"""
+        from azure_openai_helper import llm_query_timed
+
+        fake_api.chunks = [(0.1, content_chunk("Hi")), (0.1, usage_chunk(50, 1))]
+
+        result = llm_query_timed("Say hi")
+
+        assert result["usage"] == {"prompt_tokens": 50, "completion_tokens": 1, "cached_tokens": 0}
+
+    def test_empty_stream(self, fake_api):
+        """Without content chunks TTFT equals total time and usage is None"""
+        from azure_openai_helper import llm_query_timed
+
+        fake_api.chunks = [(0.3, content_chunk(None))]
+
+        result = llm_query_timed("Say nothing")
+
+        assert result["text"] == ""
+        assert result["first_token_seconds"] == result["total_seconds"] == pytest.approx(0.3)
+        assert result["usage"] is None
+
+    def test_retries_without_stream_options(self, fake_api):
+        """An API version that rejects stream_options still returns the text"""
+        from azure_openai_helper import llm_query_timed
+
+        fake_api.reject_stream_options = True
+        fake_api.chunks = [(0.2, content_chunk("Hi"))]
+
+        result = llm_query_timed("Say hi")
+
+        assert len(fake_api.calls) == 2
+        assert "stream_options" not in fake_api.calls[1]
+        assert result["text"] == "Hi"
+        assert result["usage"] is None
+
+    def test_rejected_stream_options_are_not_sent_again(self, fake_api):
+        """After one rejection, later calls to the deployment skip stream_options"""
+        from azure_openai_helper import llm_query_timed
+
+        fake_api.reject_stream_options = True
+        fake_api.chunks = [(0.2, content_chunk("Hi"))]
+
+        llm_query_timed("Say hi")
+        result = llm_query_timed("Say hi again")
+
+        assert len(fake_api.calls) == 3
+        assert "stream_options" not in fake_api.calls[2]
+        assert result["text"] == "Hi"
+        assert result["first_token_seconds"] == pytest.approx(0.2)
+
+    def test_invalid_arguments(self, fake_api):
+        """Argument validation is shared with llm_query"""
+        from azure_openai_helper import llm_query, llm_query_timed
+
+        for query in (llm_query, llm_query_timed):
+            with pytest.raises(ValueError):
+                query("  ")
+            with pytest.raises(ValueError):
+                query("Hi", temperature=3.0)
+        assert fake_api.calls == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])